@@ -43,7 +43,7 @@ class ItemViewSet(ModelViewSet, TreeSortMixin):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in (
             "partial_update",
@@ -284,7 +284,7 @@ class ListOfSpeakersViewSet(
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("manage_speaker",):
             result = has_perm(self.request.user, "agenda.can_see_list_of_speakers")
@@ -372,7 +372,7 @@ class ListOfSpeakersViewSet(
 
             # Send new speaker via autoupdate because users without permission
             # to see users may not have it but can get it now.
-            inform_changed_data(user, disable_history=True)
+            inform_changed_data(user, disable_history=True, force=True)
 
         # Set 'marked' for the speaker
         elif request.method == "PATCH":
@@ -0,0 +1,35 @@
+"""
+ASGI entrypoint. Configures Django and then runs the application. Requests to
+/system/ are handled by the built-in autoupdate server, all other requests by
+Django.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
+
+from .utils.main import setup_django_settings_module
+from .utils.startup import run_startup_hooks
+
+
+# Loads the openslides setting. You can use your own settings by setting the
+# environment variable DJANGO_SETTINGS_MODULE
+setup_django_settings_module(local_installation=True)
+django_application = WsgiToAsgi(get_wsgi_application())
+run_startup_hooks()
+
+from .utils import autoupdate_server  # noqa: E402 isort:skip (needs the django setup)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    elif scope["type"] == "http" and scope["path"].startswith("/system/"):
+        await autoupdate_server.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -43,7 +43,7 @@ class AssignmentViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             # Everybody is allowed to see the metadata.
@@ -103,7 +103,7 @@ class AssignmentViewSet(ModelViewSet):
         assignment.add_candidate(request.user)
         # Send new candidate via autoupdate because users without permission
         # to see users may not have it but can get it now.
-        inform_changed_data([request.user])
+        inform_changed_data([request.user], force=True)
         return "You were nominated successfully."
 
     def withdraw_self(self, request, assignment):
@@ -169,7 +169,7 @@ class AssignmentViewSet(ModelViewSet):
         assignment.add_candidate(user)
         # Send new candidate via autoupdate because users without permission
         # to see users may not have it but can get it now.
-        inform_changed_data(user)
+        inform_changed_data(user, force=True)
         return Response(
             {"detail": "User {0} was nominated successfully.", "args": [str(user)]}
         )
@@ -22,19 +22,44 @@ class ChatGroupAccessPermissions(BaseAccessPermissions):
             data = full_data
         else:
             for full in full_data:
-                read_groups = full.get("read_groups_id", [])
-                write_groups = full.get("write_groups_id", [])
-                if await async_in_some_groups(
-                    user_id, read_groups
-                ) or await async_in_some_groups(user_id, write_groups):
+                if await self.async_in_read_or_write_groups(user_id, full):
                     data.append(full)
         return data
 
+    async def async_in_read_or_write_groups(
+        self, user_id: int, full: Dict[str, Any]
+    ) -> bool:
+        """
+        Returns True, if the user is in a read group or a write group of the element.
+        """
+        groups = full.get("read_groups_id", []) + full.get("write_groups_id", [])
+        return await async_in_some_groups(user_id, groups)
+
 
 class ChatMessageAccessPermissions(ChatGroupAccessPermissions):
     """
     Access permissions container for ChatMessage and ChatMessageViewSet.
-    It does exaclty the same as ChatGroupAccessPermissions
+    The messages have the same permissions as their ChatGroup.
     """
 
-    pass
+    async def get_restricted_data(
+        self, full_data: List[Dict[str, Any]], user_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Like ChatGroupAccessPermissions, but all messages of one chat group share the
+        read and write groups. So the groups are only checked once per chat group.
+        """
+        data: List[Dict[str, Any]] = []
+        if await async_has_perm(user_id, "chat.can_manage"):
+            data = full_data
+        else:
+            can_see_chatgroup: Dict[int, bool] = {}
+            for full in full_data:
+                chatgroup_id = full["chatgroup_id"]
+                if chatgroup_id not in can_see_chatgroup:
+                    can_see_chatgroup[
+                        chatgroup_id
+                    ] = await self.async_in_read_or_write_groups(user_id, full)
+                if can_see_chatgroup[chatgroup_id]:
+                    data.append(full)
+        return data
@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.db import models
+from django.db import connections, models
 
 from openslides.utils.manager import BaseManager
 
@@ -56,16 +56,55 @@ class ChatMessageManager(BaseManager):
     Customized model manager to support our get_prefetched_queryset method.
     """
 
-    def get_prefetched_queryset(self, *args, **kwargs):
-        """"""
+    cache_window = getattr(settings, "CHAT_MESSAGE_CACHE_WINDOW", 0)
+    """
+    Amount of the newest messages per chat group, which are held in the cache. Older
+    messages can be loaded from the database via the history route. 0 keeps all
+    messages.
+    """
+
+    def get_prefetched_queryset(self, ids=None):
+        """
+        Returns the queryset with all related chat groups prefetched. If no ids are
+        given and a cache window is configured, only the messages within the window
+        are returned.
+        """
+        if ids is None and self.cache_window:
+            ids = self.get_window_ids()
+        if ids is not None and not ids:
+            return self.none()
         return (
             super()
-            .get_prefetched_queryset(*args, **kwargs)
+            .get_prefetched_queryset(ids=ids)
             .prefetch_related(
                 "chatgroup", "chatgroup__read_groups", "chatgroup__write_groups"
             )
         )
 
+    def get_window_ids(self, chatgroup_id=None):
+        """
+        Returns the ids of the newest cache_window messages of every chat group or
+        only of the given one. All chat groups are handled with one query.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        table = quote_name(opts.db_table)
+        pk = quote_name(opts.pk.column)
+        chatgroup = quote_name(opts.get_field("chatgroup").column)
+        where = f"WHERE {chatgroup} = %s" if chatgroup_id is not None else ""
+        params = [chatgroup_id] if chatgroup_id is not None else []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {pk} FROM ("
+                f"SELECT {pk}, ROW_NUMBER() OVER "
+                f"(PARTITION BY {chatgroup} ORDER BY {pk} DESC) AS row_number "
+                f"FROM {table} {where}"
+                ") AS messages WHERE row_number <= %s;",
+                params + [self.cache_window],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
 
 class ChatMessage(RESTModelMixin, models.Model):
     """"""
@@ -1,12 +1,15 @@
+from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from rest_framework.utils.serializer_helpers import ReturnDict
 
 from openslides.utils.auth import has_perm
 from openslides.utils.autoupdate import (
+    AutoupdateElement,
     disable_history,
     inform_changed_data,
     inform_deleted_data,
+    inform_elements,
 )
 from openslides.utils.rest_api import (
     CreateModelMixin,
@@ -16,7 +19,9 @@ from openslides.utils.rest_api import (
     ModelViewSet,
     Response,
     RetrieveModelMixin,
+    ValidationError,
     detail_route,
+    list_route,
     status,
 )
 
@@ -42,7 +47,7 @@ class ChatGroupViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = True
         else:
             result = has_perm(self.request.user, "chat.can_manage")
@@ -53,7 +58,13 @@ class ChatGroupViewSet(ModelViewSet):
         response = super().update(*args, **kwargs)
         # Update all affected chatmessages to update their `read_groups_id`  and
         # `write_groups_id` field, which is taken from the updated chatgroup.
-        inform_changed_data(ChatMessage.objects.filter(chatgroup=self.get_object()))
+        # Messages outside of the cache window must not be added to the cache.
+        messages = ChatMessage.objects.filter(chatgroup=self.get_object())
+        if ChatMessage.objects.cache_window:
+            messages = messages.filter(
+                pk__in=ChatMessage.objects.get_window_ids(self.get_object().pk)
+            )
+        inform_changed_data(messages)
         return response
 
     @detail_route(methods=["POST"])
@@ -79,7 +90,8 @@ class ChatMessageViewSet(
     """
     API endpoint for chat groups.
 
-    There are the following views: metadata, list, retrieve, create
+    There are the following views: metadata, list, retrieve, create, destroy
+    and history.
     """
 
     access_permissions = ChatMessageAccessPermissions()
@@ -105,6 +117,22 @@ class ChatMessageViewSet(
         chatmessage = ChatMessage(**validated_data)
         chatmessage.save(disable_history=True)
 
+        if ChatMessage.objects.cache_window:
+            # The oldest message of the window drops out of the cache. It can still
+            # be loaded with the history route.
+            messages = chatmessage.chatgroup.messages.order_by("-pk")
+            window = ChatMessage.objects.cache_window
+            dropped_ids = messages.values_list("pk", flat=True)[window:][:1]
+            inform_elements(
+                AutoupdateElement(
+                    id=id,
+                    collection_string=ChatMessage.get_collection_string(),
+                    full_data=None,
+                    disable_history=True,
+                )
+                for id in dropped_ids
+            )
+
         return Response(
             ReturnDict(id=chatmessage.id, serializer=serializer),
             status=status.HTTP_201_CREATED,
@@ -119,4 +147,58 @@ class ChatMessageViewSet(
 
         disable_history()
 
-        return super().destroy(request, *args, **kwargs)
+        chatmessage = self.get_object()
+        response = super().destroy(request, *args, **kwargs)
+
+        if ChatMessage.objects.cache_window:
+            # If the message was in the cache window, the next older message
+            # moves into the window and has to be added to the cache.
+            messages = ChatMessage.objects.filter(
+                chatgroup_id=chatmessage.chatgroup_id
+            ).order_by("-pk")
+            # The message at the last position of the window.
+            offset = ChatMessage.objects.cache_window - 1
+            for id in messages.values_list("pk", flat=True)[offset:][:1]:
+                if id < chatmessage.pk:
+                    inform_changed_data(messages.get(pk=id), disable_history=True)
+
+        return response
+
+    @list_route(methods=["get"])
+    def history(self, request):
+        """
+        Returns the messages of one chat group from the database, newest first. This
+        is used to load messages, which are not in the cache anymore. Query params:
+        chatgroup_id: The chat group (required)
+        before_id: Only return messages with a smaller id (optional)
+        limit: The maximum amount of messages (optional, defaults to 100)
+        """
+        try:
+            chatgroup_id = int(request.query_params["chatgroup_id"])
+            before_id = request.query_params.get("before_id")
+            before_id = int(before_id) if before_id is not None else None
+            limit = int(request.query_params.get("limit", 100))
+        except KeyError:
+            raise ValidationError({"detail": "chatgroup_id is required."})
+        except ValueError:
+            raise ValidationError(
+                {"detail": "chatgroup_id, before_id and limit must be integers."}
+            )
+        if limit < 1 or limit > 1000:
+            raise ValidationError({"detail": "limit must be between 1 and 1000."})
+
+        messages = (
+            ChatMessage.objects.filter(chatgroup_id=chatgroup_id)
+            .select_related("chatgroup")
+            .prefetch_related("chatgroup__read_groups", "chatgroup__write_groups")
+            .order_by("-pk")
+        )
+        if before_id is not None:
+            messages = messages.filter(pk__lt=before_id)
+        full_data = [message.get_full_data() for message in messages[:limit]]
+
+        # All messages belong to the same chat group, so this is one check.
+        restricted_data = async_to_sync(ChatMessage.restrict_elements)(
+            request.user.pk or 0, full_data
+        )
+        return Response(restricted_data)
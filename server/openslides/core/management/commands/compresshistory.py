@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from openslides.core.models import History
+
+
+class Command(BaseCommand):
+    """
+    Command to convert the history into keyframes and diffs.
+    """
+
+    help = "Saves the history data as keyframes and diffs to them."
+
+    def handle(self, *args, **options):
+        element_ids = list(
+            History.objects.order_by().values_list("element_id", flat=True).distinct()
+        )
+        for i, element_id in enumerate(element_ids):
+            with transaction.atomic():
+                History.objects.compress(element_id)
+            if (i + 1) % 1000 == 0:
+                self.stdout.write(f"{i + 1}/{len(element_ids)} elements...")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"History of {len(element_ids)} elements successfully compressed."
+            )
+        )
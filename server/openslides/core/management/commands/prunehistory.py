@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from openslides.core.models import History
+
+
+class Command(BaseCommand):
+    """
+    Command to delete the history, that is older than the retention.
+    """
+
+    help = (
+        "Deletes history entries older than HISTORY_RETENTION_DAYS or "
+        "HISTORY_RETENTION_DAYS_PER_COLLECTION."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Amount of entries checked in one transaction. Default: 500.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for i, chunk_deleted in enumerate(
+            History.objects.prune(chunk_size=options["chunk_size"])
+        ):
+            deleted += chunk_deleted
+            if (i + 1) % 100 == 0:
+                self.stdout.write(f"{deleted} entries deleted...")
+        self.stdout.write(
+            self.style.SUCCESS(f"{deleted} history entries successfully deleted.")
+        )
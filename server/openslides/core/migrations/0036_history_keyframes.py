@@ -0,0 +1,50 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:07
+
+import django.db.models.deletion
+import jsonfield.encoder
+import jsonfield.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0035_autopilot_permission"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="historydata",
+            name="full_data",
+            field=jsonfield.fields.JSONField(
+                dump_kwargs={
+                    "cls": jsonfield.encoder.JSONEncoder,
+                    "separators": (",", ":"),
+                },
+                load_kwargs={},
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="historydata",
+            name="diff",
+            field=jsonfield.fields.JSONField(
+                dump_kwargs={
+                    "cls": jsonfield.encoder.JSONEncoder,
+                    "separators": (",", ":"),
+                },
+                load_kwargs={},
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="historydata",
+            name="keyframe",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="diffs",
+                to="core.HistoryData",
+            ),
+        ),
+    ]
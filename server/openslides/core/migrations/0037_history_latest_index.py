@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0036_history_keyframes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="history",
+            index=models.Index(
+                fields=["element_id", "-now", "-id"], name="core_history_latest_idx"
+            ),
+        ),
+    ]
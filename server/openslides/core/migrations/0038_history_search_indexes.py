@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0037_history_latest_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="history",
+            index=models.Index(
+                fields=["user", "-now", "-id"], name="core_history_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="history",
+            index=models.Index(fields=["-now", "-id"], name="core_history_now_idx"),
+        ),
+    ]
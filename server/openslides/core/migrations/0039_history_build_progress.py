@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0038_history_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoryBuildProgress",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("collection", models.CharField(default="", max_length=255)),
+                ("last_id", models.IntegerField(default=0)),
+            ],
+            options={
+                "default_permissions": (),
+            },
+        ),
+    ]
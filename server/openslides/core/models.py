@@ -1,17 +1,24 @@
-from typing import Iterable
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 from django.db import models, transaction
+from django.db.models import Count, Max, Q, Value
+from django.db.models.functions import StrIndex, Substr
 from django.utils.timezone import now
 from jsonfield import JSONField
 
+from openslides.utils import logging
 from openslides.utils.autoupdate import AutoupdateElement
-from openslides.utils.cache import element_cache, get_element_id
+from openslides.utils.cache import element_cache, get_element_id, get_element_patch
 from openslides.utils.locking import locking
 from openslides.utils.manager import BaseManager
 from openslides.utils.models import SET_NULL_AND_AUTOUPDATE, RESTModelMixin
-from openslides.utils.postgres import is_postgres
+from openslides.utils.postgres import copy_instances, get_next_ids, is_postgres
+from openslides.utils.utils import split_element_id
 
 from .access_permissions import (
     ConfigAccessPermissions,
@@ -23,6 +30,9 @@ from .access_permissions import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 class ProjectorManager(BaseManager):
     """
     Customized model manager to support our get_prefetched_queryset method.
@@ -246,15 +256,102 @@ class Countdown(RESTModelMixin, models.Model):
         self.save(skip_autoupdate=skip_autoupdate)
 
 
+HISTORY_KEYFRAME_INTERVAL = getattr(settings, "HISTORY_KEYFRAME_INTERVAL", 10)
+HISTORY_BUILD_CHUNK_SIZE = getattr(settings, "HISTORY_BUILD_CHUNK_SIZE", 500)
+HISTORY_RETENTION_DAYS = getattr(settings, "HISTORY_RETENTION_DAYS", None)
+HISTORY_RETENTION_DAYS_PER_COLLECTION = getattr(
+    settings, "HISTORY_RETENTION_DAYS_PER_COLLECTION", {}
+)
+
+
+def get_retention_cutoff(collection: str, reference: datetime) -> Optional[datetime]:
+    """
+    Returns the time before which the history of the collection can be pruned
+    or None, if it is kept forever.
+    """
+    days = HISTORY_RETENTION_DAYS_PER_COLLECTION.get(collection, HISTORY_RETENTION_DAYS)
+    return None if days is None else reference - timedelta(days=days)
+
+
 class HistoryData(models.Model):
     """
     Django model to save the history of OpenSlides.
 
     This is not a RESTModel. It is not cachable and can only be reached by a
     special viewset.
+
+    The data is either a keyframe with the full_data of the element or a diff
+    to a keyframe of the same element. Use get_full_data() to get the data.
     """
 
-    full_data = JSONField()
+    full_data = JSONField(null=True)
+
+    keyframe = models.ForeignKey(
+        "self", null=True, on_delete=models.CASCADE, related_name="diffs"
+    )
+
+    diff = JSONField(null=True)
+
+    class Meta:
+        default_permissions = ()
+
+    def get_full_data(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the full_data of the element. Diffs are applied to the full_data
+        of their keyframe.
+        """
+        if self.keyframe is None:
+            return self.full_data
+        full_data = {
+            key: value
+            for key, value in self.keyframe.full_data.items()
+            if key not in self.diff["removed"]
+        }
+        full_data.update(self.diff["changed"])
+        return full_data
+
+    def set_full_data(
+        self,
+        full_data: Optional[Dict[str, Any]],
+        keyframe: Optional["HistoryData"] = None,
+        diffs: int = 0,
+    ) -> None:
+        """
+        Sets the full_data as diff to the given keyframe, which already has the
+        given amount of diffs.
+
+        A keyframe is used instead, if there is no keyframe, the element or the
+        keyframe is deleted, the keyframe has HISTORY_KEYFRAME_INTERVAL - 1 diffs
+        or the diff is not smaller than the full_data.
+        """
+        if (
+            keyframe is not None
+            and keyframe.full_data
+            and full_data
+            and diffs < HISTORY_KEYFRAME_INTERVAL - 1
+        ):
+            patch = get_element_patch(keyframe.full_data, full_data, 0)
+            diff = {"changed": patch["changed"], "removed": patch["removed"]}
+            if len(json.dumps(diff)) < len(json.dumps(full_data)):
+                self.keyframe = keyframe
+                self.diff = diff
+                self.full_data = None
+                return
+
+        self.keyframe = None
+        self.diff = None
+        self.full_data = full_data
+
+
+class HistoryBuildProgress(models.Model):
+    """
+    Progress of the history build. There is only an entry, while the history is
+    built. It contains the collection and the id of the last written element.
+    """
+
+    collection = models.CharField(max_length=255, default="")
+
+    last_id = models.IntegerField(default=0)
 
     class Meta:
         default_permissions = ()
@@ -265,60 +362,349 @@ class HistoryManager(BaseManager):
     Customized model manager for the history model.
     """
 
-    def add_elements(self, elements: Iterable[AutoupdateElement]):
+    def add_elements(
+        self,
+        elements: Iterable[AutoupdateElement],
+        history_time: Optional[datetime] = None,
+    ) -> List["History"]:
         """
         Method to add elements to the history. This does not trigger autoupdate.
         """
-        history_time = now()
-        elements = [
-            element for element in elements if not element.get("disable_history", False)
-        ]
+        return self.add_changes([(history_time or now(), elements)])
+
+    def add_changes(
+        self, changes: Iterable[Tuple[datetime, Iterable[AutoupdateElement]]]
+    ) -> List["History"]:
+        """
+        Adds the elements of many changes with their time to the history in one
+        transaction. The order of the changes is kept.
+        """
+        elements: List[AutoupdateElement] = []
+        history_times: List[datetime] = []
+        for history_time, change_elements in changes:
+            for element in change_elements:
+                if not element.get("disable_history", False):
+                    elements.append(element)
+                    history_times.append(history_time)
 
         with transaction.atomic():
+            history_data = self.get_history_data(elements)
+            history_entries = [
+                self.model(
+                    element_id=get_element_id(
+                        element["collection_string"], element["id"]
+                    ),
+                    now=history_time,
+                    information=element.get("information", []),
+                    user_id=element.get("user_id"),
+                )
+                for element, history_time in zip(elements, history_times)
+            ]
             if is_postgres():
-                return self._add_elements_postgres(elements, history_time)
+                self._add_elements_postgres(history_data, history_entries)
+            else:
+                self._add_elements_other_dbs(history_data, history_entries)
+        return history_entries
+
+    def get_history_data(self, elements: List[AutoupdateElement]) -> List[HistoryData]:
+        """
+        Returns unsaved history data for the elements. Their full_data is saved
+        as diff to the current keyframe of the element, if possible.
+        """
+        keyframes = self.get_keyframes(
+            [
+                get_element_id(element["collection_string"], element["id"])
+                for element in elements
+            ]
+        )
+        history_data = []
+        for element in elements:
+            element_id = get_element_id(element["collection_string"], element["id"])
+            keyframe, diffs = keyframes.get(element_id, (None, 0))
+            data = HistoryData()
+            data.set_full_data(element.get("full_data"), keyframe, diffs)
+            if data.keyframe is None:
+                keyframes[element_id] = (data, 0)
             else:
-                return self._add_elements_other_dbs(elements, history_time)
+                keyframes[element_id] = (data.keyframe, diffs + 1)
+            history_data.append(data)
+        return history_data
+
+    def get_keyframes(
+        self, element_ids: List[str]
+    ) -> Dict[str, Tuple[HistoryData, int]]:
+        """
+        Returns the keyframe of the latest history entry and the amount of its
+        diffs for all elements with history.
+        """
+        keyframes: Dict[str, Tuple[HistoryData, int]] = {}
+        element_ids = list(set(element_ids))
+        # Some databases have a limit of query parameters.
+        for i in range(0, len(element_ids), 500):
+            latest_ids = (
+                self.filter(element_id__in=element_ids[i : i + 500])  # noqa: E203
+                .values("element_id")
+                .annotate(latest_id=Max("id"))
+                .values("latest_id")
+            )
+            for instance in (
+                self.filter(pk__in=latest_ids)
+                .select_related("full_data__keyframe")
+                .annotate(
+                    diffs=Count("full_data__diffs"),
+                    keyframe_diffs=Count("full_data__keyframe__diffs"),
+                )
+            ):
+                if instance.full_data.keyframe is None:
+                    keyframes[instance.element_id] = (
+                        instance.full_data,
+                        instance.diffs,
+                    )
+                else:
+                    keyframes[instance.element_id] = (
+                        instance.full_data.keyframe,
+                        instance.keyframe_diffs,
+                    )
+        return keyframes
+
+    def _add_elements_postgres(self, history_data, history_entries):
+        """
+        Postgres writes all rows with COPY. The ids are taken from the id sequences
+        beforehand, so the diffs and the History entries can refer to them.
+        """
+        for data, id in zip(
+            history_data, get_next_ids(HistoryData._meta.db_table, len(history_data))
+        ):
+            data.id = id
+        for data in history_data:
+            if data.keyframe is not None:
+                data.keyframe_id = data.keyframe.pk
+        copy_instances(HistoryData, history_data)
+
+        for instance, data, id in zip(
+            history_entries,
+            history_data,
+            get_next_ids(self.model._meta.db_table, len(history_entries)),
+        ):
+            instance.id = id
+            instance.full_data_id = data.id
+        copy_instances(self.model, history_entries)
+
+    def _add_elements_other_dbs(self, history_data, history_entries):
+        for instance, data in zip(history_entries, history_data):
+            # HistoryData is not a root rest element so there is no autoupdate and not history saving here.
+            if data.keyframe is not None:
+                data.keyframe_id = data.keyframe.pk
+            data.save()
+            instance.full_data_id = data.id
+            instance.save()
 
-    def _add_elements_postgres(self, elements, history_time):
+    def compress(self, element_id: str) -> None:
         """
-        Postgres supports returning ids from bulk requests, so after doing `bulk_create`
-        every HistoryData has an id. This can be used to bulk_create History-Models in a
-        second step.
+        Saves the history data of the element as keyframes and diffs to them.
+        Existing keyframes and diffs are recalculated.
         """
-        history_data = [
-            HistoryData(full_data=element.get("full_data")) for element in elements
+        instances = list(
+            self.filter(element_id=element_id)
+            .select_related("full_data__keyframe")
+            .order_by("id")
+        )
+        all_full_data = [instance.full_data.get_full_data() for instance in instances]
+        keyframe: Optional[HistoryData] = None
+        diffs = 0
+        for instance, full_data in zip(instances, all_full_data):
+            history_data = instance.full_data
+            history_data.set_full_data(full_data, keyframe, diffs)
+            if history_data.keyframe is None:
+                keyframe = history_data
+                diffs = 0
+            else:
+                diffs += 1
+            history_data.save()
+
+    def get_latest(self, until: Optional[datetime] = None) -> models.QuerySet:
+        """
+        Returns the latest history entry of every element, that was saved until
+        (including) the given time. The entries are ordered by collection.
+
+        Postgres picks the entries with DISTINCT ON, other databases use the
+        highest id of every element.
+        """
+        queryset = self.all()
+        if until is not None:
+            queryset = queryset.filter(now__lte=until)
+        if is_postgres():
+            latest_ids = (
+                queryset.order_by("element_id", "-now", "-id")
+                .distinct("element_id")
+                .values("id")
+            )
+        else:
+            latest_ids = (
+                queryset.values("element_id")
+                .annotate(latest_id=Max("id"))
+                .values("latest_id")
+            )
+        return (
+            self.filter(pk__in=latest_ids)
+            .annotate(
+                collection=Substr(
+                    "element_id",
+                    1,
+                    StrIndex("element_id", Value(":")) - 1,
+                    output_field=models.CharField(),
+                )
+            )
+            .order_by("collection")
+            .select_related("full_data__keyframe")
+        )
+
+    def search(
+        self,
+        element_id: Optional[str] = None,
+        collection: Optional[str] = None,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[Tuple[datetime, int]] = None,
+    ) -> models.QuerySet:
+        """
+        Returns all history entries with information, newest first.
+
+        All arguments are optional filters. since and until are including. before
+        is the time and the id of the last entry of the previous page. Only older
+        entries are returned (keyset pagination), so every page uses the indexes.
+        """
+        queryset = self.exclude(information=[])
+        if element_id is not None:
+            queryset = queryset.filter(element_id=element_id)
+        if collection is not None:
+            queryset = queryset.filter(element_id__startswith=f"{collection}:")
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        if since is not None:
+            queryset = queryset.filter(now__gte=since)
+        if until is not None:
+            queryset = queryset.filter(now__lte=until)
+        if before is not None:
+            before_now, before_id = before
+            queryset = queryset.filter(
+                Q(now__lt=before_now) | Q(now=before_now, id__lt=before_id)
+            )
+        return queryset.order_by("-now", "-id")
+
+    def prune(self, chunk_size: int = 500) -> Iterator[int]:
+        """
+        Deletes the history entries, that are older than the retention of their
+        collection. Yields the amount of deleted entries for every chunk.
+
+        The entries are processed from the newest to the oldest in chunks. Every
+        chunk is deleted in its own transaction, so the tables are not locked for
+        long. The latest entry of every element before the cutoff is kept, so the
+        element can still be reconstructed after the cutoff. Keyframes are kept as
+        long as there are diffs to them.
+        """
+        reference = now()
+        all_days = [
+            days
+            for days in (
+                HISTORY_RETENTION_DAYS,
+                *HISTORY_RETENTION_DAYS_PER_COLLECTION.values(),
+            )
+            if days is not None
         ]
-        HistoryData.objects.bulk_create(history_data)
-
-        history_entries = [
-            self.model(
-                element_id=get_element_id(element["collection_string"], element["id"]),
-                now=history_time,
-                information=element.get("information", []),
-                user_id=element.get("user_id"),
-                full_data_id=hd.id,
+        if not all_days:
+            return
+        queryset = self.filter(now__lt=reference - timedelta(days=min(all_days)))
+
+        before_id = None
+        while True:
+            chunk_queryset = queryset
+            if before_id is not None:
+                chunk_queryset = queryset.filter(id__lt=before_id)
+            chunk = list(
+                chunk_queryset.order_by("-id").values(
+                    "id", "element_id", "now", "full_data_id"
+                )[:chunk_size]
+            )
+            if not chunk:
+                return
+            before_id = chunk[-1]["id"]
+            with transaction.atomic():
+                deleted = self._prune_chunk(chunk, reference)
+            yield deleted
+
+    def _prune_chunk(self, chunk: List[Dict[str, Any]], reference: datetime) -> int:
+        entries_by_cutoff: Dict[datetime, List[Dict[str, Any]]] = defaultdict(list)
+        for entry in chunk:
+            collection, _ = split_element_id(entry["element_id"])
+            cutoff = get_retention_cutoff(collection, reference)
+            if cutoff is not None and entry["now"] < cutoff:
+                entries_by_cutoff[cutoff].append(entry)
+
+        # Keep the latest entry of every element before the cutoff, if the
+        # element was not deleted.
+        kept_ids: Set[int] = set()
+        for cutoff, entries in entries_by_cutoff.items():
+            latest_ids = (
+                self.filter(
+                    element_id__in=set(entry["element_id"] for entry in entries),
+                    now__lt=cutoff,
+                )
+                .values("element_id")
+                .annotate(latest_id=Max("id"))
+                .values("latest_id")
             )
-            for element, hd in zip(elements, history_data)
+            kept_ids.update(
+                self.filter(pk__in=latest_ids)
+                .exclude(
+                    full_data__full_data__isnull=True,
+                    full_data__keyframe__isnull=True,
+                )
+                .values_list("id", flat=True)
+            )
+        entries = [
+            entry
+            for entries in entries_by_cutoff.values()
+            for entry in entries
+            if entry["id"] not in kept_ids
         ]
-        self.bulk_create(history_entries)
-        return history_entries
 
-    def _add_elements_other_dbs(self, elements, history_time):
-        history_entries = []
-        for element in elements:
-            # HistoryData is not a root rest element so there is no autoupdate and not history saving here.
-            data = HistoryData.objects.create(full_data=element.get("full_data"))
-            instance = self.model(
-                element_id=get_element_id(element["collection_string"], element["id"]),
-                now=history_time,
-                information=element.get("information", []),
-                user_id=element.get("user_id"),
-                full_data=data,
+        # Keep keyframes with diffs, that are not deleted.
+        ids = [entry["id"] for entry in entries]
+        keyframe_ids = set(
+            HistoryData.objects.filter(
+                keyframe_id__in=[entry["full_data_id"] for entry in entries]
             )
-            instance.save()
-            history_entries.append(instance)
-        return history_entries
+            .exclude(history__id__in=ids)
+            .values_list("keyframe_id", flat=True)
+        )
+        entries = [
+            entry for entry in entries if entry["full_data_id"] not in keyframe_ids
+        ]
+
+        self.filter(pk__in=[entry["id"] for entry in entries]).delete()
+        HistoryData.objects.filter(
+            pk__in=[entry["full_data_id"] for entry in entries]
+        ).delete()
+        return len(entries)
+
+    def clear(self, chunk_size: int = 500) -> None:
+        """
+        Deletes the whole history in chunks from the newest to the oldest entry.
+        Every chunk is deleted in its own transaction.
+        """
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    HistoryData.objects.order_by("-id").values_list("id", flat=True)[
+                        :chunk_size
+                    ]
+                )
+                if not ids:
+                    return
+                self.filter(full_data_id__in=ids).delete()
+                HistoryData.objects.filter(pk__in=ids).delete()
 
     def build_history(self):
         """
@@ -327,24 +713,109 @@ class HistoryManager(BaseManager):
         async_to_sync(self.async_build_history)()
 
     async def async_build_history(self):
+        """
+        Adds all elements of the cache to the history, if the history is empty.
+
+        The collections are loaded one by one and their elements are written in
+        chunks of HISTORY_BUILD_CHUNK_SIZE elements ordered by id. Every chunk is
+        written in its own transaction together with the build progress. So an
+        interrupted build is resumed after the last written chunk on the next
+        start.
+        """
         lock_name = "build_cache"
         if await locking.set(lock_name):
             try:
-                if self.all().count() == 0:
-                    elements = []
-                    all_full_data = await element_cache.get_all_data_list()
-                    for collection_string, data in all_full_data.items():
-                        for full_data in data:
-                            elements.append(
-                                AutoupdateElement(
-                                    id=full_data["id"],
-                                    collection_string=collection_string,
-                                    full_data=full_data,
-                                )
+                progress = await sync_to_async(self.get_build_progress)()  # type: ignore
+                if progress is None:
+                    logger.info("History build skipped: The history is not empty")
+                    return
+                add_build_chunk: Any = sync_to_async(self.add_build_chunk)
+                collections = sorted(element_cache.cachables.keys())
+                for index, collection in enumerate(collections):
+                    if collection < progress.collection:
+                        continue
+                    last_id = (
+                        progress.last_id if collection == progress.collection else 0
+                    )
+                    ids = [
+                        id
+                        for id in await element_cache.get_collection_ids(collection)
+                        if id > last_id
+                    ]
+                    added = 0
+                    for i in range(0, len(ids), HISTORY_BUILD_CHUNK_SIZE):
+                        chunk_ids = ids[i : i + HISTORY_BUILD_CHUNK_SIZE]  # noqa: E203
+                        elements = [
+                            AutoupdateElement(
+                                id=full_data["id"],
+                                collection_string=collection,
+                                full_data=full_data,
                             )
-                    self.add_elements(elements)
+                            for full_data in await element_cache.get_elements_data(
+                                collection, chunk_ids
+                            )
+                        ]
+                        added += await add_build_chunk(
+                            elements, collection, chunk_ids[-1]
+                        )
+                    if ids:
+                        logger.info(
+                            f"History of {collection} built: {added} elements added "
+                            f"({index + 1}/{len(collections)} collections)"
+                        )
+                await sync_to_async(  # type: ignore
+                    HistoryBuildProgress.objects.all().delete
+                )()
             finally:
                 await locking.delete(lock_name)
+        else:
+            logger.info(f"History build skipped: The lock {lock_name} is held")
+
+    def get_build_progress(self) -> Optional[HistoryBuildProgress]:
+        """
+        Returns the progress of the history build. A new build is started, if the
+        history is empty. Returns None, if there is nothing to build.
+        """
+        with transaction.atomic():
+            progress = HistoryBuildProgress.objects.first()
+            if progress is None and not self.exists():
+                progress = HistoryBuildProgress.objects.create()
+            return progress
+
+    def add_build_chunk(
+        self, elements: List[AutoupdateElement], collection: str, last_id: int
+    ) -> int:
+        """
+        Adds the elements to the history and saves the progress of the build in
+        one transaction. Returns the amount of added elements.
+        """
+        with transaction.atomic():
+            added = self.add_missing_elements(elements)
+            HistoryBuildProgress.objects.update(collection=collection, last_id=last_id)
+        return added
+
+    def add_missing_elements(self, elements: List[AutoupdateElement]) -> int:
+        """
+        Adds the elements, that have no history, to the history. Returns the
+        amount of added elements.
+        """
+        existing_element_ids = set(
+            self.filter(
+                element_id__in=[
+                    get_element_id(element["collection_string"], element["id"])
+                    for element in elements
+                ]
+            ).values_list("element_id", flat=True)
+        )
+        elements = [
+            element
+            for element in elements
+            if get_element_id(element["collection_string"], element["id"])
+            not in existing_element_ids
+        ]
+        if elements:
+            self.add_elements(elements)
+        return len(elements)
 
 
 class History(models.Model):
@@ -372,3 +843,10 @@ class History(models.Model):
     class Meta:
         default_permissions = ()
         permissions = (("can_see_history", "Can see history"),)
+        indexes = [
+            models.Index(
+                fields=["element_id", "-now", "-id"], name="core_history_latest_idx"
+            ),
+            models.Index(fields=["user", "-now", "-id"], name="core_history_user_idx"),
+            models.Index(fields=["-now", "-id"], name="core_history_now_idx"),
+        ]
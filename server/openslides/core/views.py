@@ -1,23 +1,24 @@
 import datetime
+import json
 import os
-from collections import defaultdict
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.contrib.staticfiles import finders
 from django.contrib.staticfiles.views import serve
+from django.db import close_old_connections, transaction
 from django.db.models import F
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.utils.timezone import now
 from django.views import static
 from django.views.generic.base import View
-
-from openslides.utils.utils import split_element_id
+from rest_framework import status
 
 from .. import __license__ as license, __url__ as url, __version__ as version
 from ..users.models import User
-from ..utils import views as utils_views
+from ..utils import logging, views as utils_views
 from ..utils.arguments import arguments
 from ..utils.auth import GROUP_ADMIN_PK, anonymous_is_enabled, has_perm, in_some_groups
 from ..utils.autoupdate import inform_changed_data
@@ -54,7 +55,7 @@ from .models import (
     ConfigStore,
     Countdown,
     History,
-    HistoryData,
+    HistoryBuildProgress,
     ProjectionDefault,
     Projector,
     ProjectorMessage,
@@ -63,6 +64,11 @@ from .models import (
 from .serializers import elements_array_validator, elements_validator
 
 
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
 # Special Django views
 
 
@@ -122,7 +128,7 @@ class ProjectorViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             result = has_perm(self.request.user, "core.can_see_projector")
@@ -365,7 +371,7 @@ class ProjectionDefaultViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSe
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         else:
             result = False
@@ -387,7 +393,7 @@ class TagViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             # Every authenticated user can see the metadata.
@@ -418,7 +424,7 @@ class ConfigViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("partial_update", "update"):
             result = self.check_config_permission(self.kwargs["pk"])
@@ -541,7 +547,7 @@ class ProjectorMessageViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create"):
             result = has_perm(
@@ -571,7 +577,7 @@ class CountdownViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create", "partial_update", "update", "destroy"):
             result = has_perm(self.request.user, "core.can_manage_projector")
@@ -648,6 +654,18 @@ class HistoryInformationView(utils_views.APIView):
 
         /?type=element&value=motions%2Fmotion%3A42 if your search for motion 42
 
+        /?type=search&collection=motions%2Fmotion&user_id=1&from=1600000000
+            for all changes of motions by user 1 since the given timestamp
+
+    The search type returns the entries page by page. Query params (all
+    optional):
+    element_id: The element id
+    collection: The collection string
+    user_id: The id of the user, who made the change
+    from, to: UNIX timestamps (including)
+    limit: The maximum amount of entries (defaults to 100)
+    cursor: The next_cursor of the previous page
+
     Use DELETE to clear the history.
     """
 
@@ -660,47 +678,126 @@ class HistoryInformationView(utils_views.APIView):
         if not has_perm(self.request.user, "core.can_see_history"):
             self.permission_denied(self.request)
         type = self.request.query_params.get("type")
-        value = self.request.query_params.get("value")
-        if type not in ("element"):
-            raise ValidationError(
-                {"detail": "Invalid input. Type should be 'element' or 'text'."}
-            )
-        # We currently just support searching by element id.
-        data = self.get_data_element_search(value)
-        return data
+        if type == "element":
+            return self.get_data_element_search(self.request.query_params.get("value"))
+        if type == "search":
+            return self.get_data_search(self.request.query_params)
+        raise ValidationError(
+            {"detail": "Invalid input. Type should be 'element' or 'search'."}
+        )
 
     def get_data_element_search(self, value):
         """
         Retrieves history information for element search.
         """
-        data = []
-        for instance in History.objects.filter(element_id=value).order_by("-now"):
-            if instance.information:
-                data.append(
-                    {
-                        "element_id": instance.element_id,
-                        "timestamp": instance.now.timestamp(),
-                        "information": instance.information,
-                        "user_id": instance.user.pk if instance.user else None,
-                    }
-                )
-        return data
+        return [
+            self.serialize_entry(entry)
+            for entry in History.objects.search(element_id=value).values(
+                "id", "element_id", "now", "information", "user_id"
+            )
+        ]
+
+    def get_data_search(self, query_params):
+        """
+        Retrieves one page of history information. The response contains the
+        entries and the cursor for the next page, which is None on the last page.
+        """
+        try:
+            user_id = query_params.get("user_id")
+            user_id = int(user_id) if user_id is not None else None
+            since = self.parse_timestamp(query_params.get("from"))
+            until = self.parse_timestamp(query_params.get("to"))
+            before = self.parse_cursor(query_params.get("cursor"))
+            limit = int(query_params.get("limit", 100))
+        except ValueError:
+            raise ValidationError(
+                {
+                    "detail": "user_id and limit must be integers, from and to "
+                    "timestamps and cursor a value returned as next_cursor."
+                }
+            )
+        if limit < 1 or limit > 1000:
+            raise ValidationError({"detail": "limit must be between 1 and 1000."})
+
+        entries = list(
+            History.objects.search(
+                element_id=query_params.get("element_id"),
+                collection=query_params.get("collection"),
+                user_id=user_id,
+                since=since,
+                until=until,
+                before=before,
+            ).values("id", "element_id", "now", "information", "user_id")[: limit + 1]
+        )
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = self.get_cursor(entries[-1])
+        return {
+            "results": [self.serialize_entry(entry) for entry in entries],
+            "next_cursor": next_cursor,
+        }
+
+    def serialize_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "element_id": entry["element_id"],
+            "timestamp": entry["now"].timestamp(),
+            "information": entry["information"],
+            "user_id": entry["user_id"],
+        }
+
+    def parse_timestamp(self, value: Optional[str]) -> Optional[datetime.datetime]:
+        if value is None:
+            return None
+        return datetime.datetime.fromtimestamp(float(value), tz=datetime.timezone.utc)
+
+    def get_cursor(self, entry: Dict[str, Any]) -> str:
+        """
+        Returns the cursor for the entries after the given one. The time is
+        encoded in microseconds, so it can be restored exactly.
+        """
+        microseconds = (entry["now"] - EPOCH) // datetime.timedelta(microseconds=1)
+        return f"{microseconds}:{entry['id']}"
+
+    def parse_cursor(
+        self, cursor: Optional[str]
+    ) -> Optional[Tuple[datetime.datetime, int]]:
+        if cursor is None:
+            return None
+        microseconds, id = cursor.split(":")
+        return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(id)
 
     def delete(self, request, *args, **kwargs):
         """
-        Deletes and rebuilds the history.
+        Deletes the history and rebuilds it in the background.
         """
         # Check permission
         if not in_some_groups(request.user.pk or 0, [GROUP_ADMIN_PK]):
             self.permission_denied(request)
 
-        # Delete history data and history (via CASCADE)
-        HistoryData.objects.all().delete()
+        with transaction.atomic():
+            History.objects.clear()
+            # A new build starts with an empty progress. If it is interrupted, it
+            # is resumed on the next start.
+            HistoryBuildProgress.objects.all().delete()
+            HistoryBuildProgress.objects.create()
+        threading.Thread(
+            target=self.rebuild_history, name="history-rebuild", daemon=True
+        ).start()
 
-        # Rebuild history.
-        History.objects.build_history()
+        return Response(
+            {"detail": "History was deleted and is rebuilt in the background."},
+            status=status.HTTP_202_ACCEPTED,
+        )
 
-        return Response({"detail": "History was deleted and rebuild successfully."})
+    @staticmethod
+    def rebuild_history() -> None:
+        try:
+            History.objects.build_history()
+        except Exception:
+            logger.exception("Error rebuilding the history")
+        finally:
+            close_old_connections()
 
 
 class HistoryDataView(utils_views.APIView):
@@ -709,14 +806,17 @@ class HistoryDataView(utils_views.APIView):
 
     Use query paramter timestamp (UNIX timestamp) to get all elements from begin
     until (including) this timestamp.
+
+    The response is streamed collection by collection.
     """
 
     http_method_names = ["get"]
 
-    def get_context_data(self, **context):
+    def get(self, request, *args, **kwargs):
         """
-        Checks if user is in admin group. If yes, all history data until
-        (including) timestamp are collected to build a valid dataset for the client.
+        Checks if user is in admin group. If yes, the latest history data of all
+        elements until (including) timestamp are sent to build a valid dataset
+        for the client.
         """
         if not in_some_groups(self.request.user.pk or 0, [GROUP_ADMIN_PK]):
             self.permission_denied(self.request)
@@ -726,39 +826,64 @@ class HistoryDataView(utils_views.APIView):
             raise ValidationError(
                 {"detail": "Invalid input. Timestamp should be an integer."}
             )
-        queryset = History.objects.select_related("full_data")
-        if timestamp:
-            queryset = queryset.filter(
-                now__lte=datetime.datetime.fromtimestamp(timestamp)
-            )
-
-        # collection <--> id <--> full_data
-        dataset: Dict[str, Dict[int, Any]] = defaultdict(dict)
-        for instance in queryset:
-            collection, id = split_element_id(instance.element_id)
-            full_data = instance.full_data.full_data
-            if full_data:
-                dataset[collection][id] = full_data
-            elif id in dataset[collection]:
-                del dataset[collection][id]
-
-        # Ensure, that newer configs than the requested timepoint are also
-        # included, so the client is happy and doesn't miss any config variables.
-        all_current_config_keys = set(config.config_variables.keys())
-        all_old_config_keys = set(
-            map(lambda config: config["key"], dataset["core/config"].values())
+        until = datetime.datetime.fromtimestamp(timestamp) if timestamp else None
+        return StreamingHttpResponse(
+            self.stream_dataset(until), content_type="application/json"
         )
-        missing_keys = all_current_config_keys - all_old_config_keys
-        if missing_keys:
-            config_full_data = async_to_sync(element_cache.get_collection_data)(
-                "core/config"
-            )
-            key_to_id = config.get_key_to_id()
-            for key in missing_keys:
-                id = key_to_id[key]
-                dataset["core/config"][id] = config_full_data[id]
 
-        return {
-            collection: list(dataset[collection].values())
-            for collection in dataset.keys()
-        }
+    def stream_dataset(self, until: Optional[datetime.datetime]) -> Iterable[str]:
+        """
+        Yields the dataset as json object. Each collection is a part of the
+        response.
+        """
+        yield "{"
+        for index, (collection, elements) in enumerate(self.get_dataset(until)):
+            if index:
+                yield ","
+            yield f"{json.dumps(collection)}:{json.dumps(elements)}"
+        yield "}"
+
+    def get_dataset(
+        self, until: Optional[datetime.datetime]
+    ) -> Iterable[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Yields the collections with all elements, that existed at the given time.
+
+        Only one collection is held in the memory.
+        """
+        collections: Set[str] = set()
+        collection = None
+        elements: List[Dict[str, Any]] = []
+        for instance in History.objects.get_latest(until).iterator():
+            if instance.collection != collection:
+                if collection is not None:
+                    yield self.get_collection(collection, elements)
+                collection = instance.collection
+                collections.add(collection)
+                elements = []
+            full_data = instance.full_data.get_full_data()
+            if full_data:
+                elements.append(full_data)
+        if collection is not None:
+            yield self.get_collection(collection, elements)
+        if "core/config" not in collections:
+            yield self.get_collection("core/config", [])
+
+    def get_collection(
+        self, collection: str, elements: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Ensure, that newer configs than the requested timepoint are also
+        included, so the client is happy and doesn't miss any config variables.
+        """
+        if collection == "core/config":
+            all_old_config_keys = set(element["key"] for element in elements)
+            missing_keys = set(config.config_variables.keys()) - all_old_config_keys
+            if missing_keys:
+                config_full_data = async_to_sync(element_cache.get_collection_data)(
+                    "core/config"
+                )
+                key_to_id = config.get_key_to_id()
+                for key in missing_keys:
+                    elements.append(config_full_data[key_to_id[key]])
+        return collection, elements
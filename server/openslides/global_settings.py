@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict
 
 from openslides.utils.plugins import collect_plugins
 
@@ -134,5 +135,16 @@ PASSWORD_HASHERS = [
 MEDIA_URL = "/media/"
 
 
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK: Dict[str, Any] = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "openslides.utils.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+}
+
+
 # Enable updating the last_login field for users on every login.
 ENABLE_LAST_LOGIN_FIELD = False
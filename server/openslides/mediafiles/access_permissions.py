@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from ..utils.access_permissions import BaseAccessPermissions
 from ..utils.auth import async_has_perm, async_in_some_groups, async_is_superadmin
@@ -25,13 +25,22 @@ class MediafileAccessPermissions(BaseAccessPermissions):
         if await async_is_superadmin(user_id):
             return full_data
 
+        # Many mediafiles share the same access groups, so the group check is
+        # done only once per distinct list of groups.
+        in_some_groups_cache: Dict[Tuple[int, ...], bool] = {}
         data = []
         for full in full_data:
             access_groups = full["inherited_access_groups_id"]
-            if (isinstance(access_groups, bool) and access_groups) or (
-                isinstance(access_groups, list)
-                and await async_in_some_groups(user_id, access_groups)
-            ):
+            if isinstance(access_groups, bool):
+                can_see = access_groups
+            else:
+                key = tuple(access_groups)
+                if key not in in_some_groups_cache:
+                    in_some_groups_cache[key] = await async_in_some_groups(
+                        user_id, access_groups
+                    )
+                can_see = in_some_groups_cache[key]
+            if can_see:
                 data.append(full)
 
         return data
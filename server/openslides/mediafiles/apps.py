@@ -9,10 +9,17 @@ class MediafilesAppConfig(AppConfig):
 
     def ready(self):
         # Import all required stuff.
+        from django.db.models.signals import m2m_changed, pre_delete
+
         from openslides.core.signals import permission_change
+        from openslides.utils.auth import get_group_model
         from openslides.utils.rest_api import router
         from . import serializers  # noqa
-        from .signals import get_permission_change_data
+        from .signals import (
+            get_permission_change_data,
+            remove_deleted_group_from_mediafiles,
+            update_inherited_access_groups,
+        )
         from .views import MediafileViewSet
 
         # Validate, that the media_url is correct formatted:
@@ -28,6 +35,16 @@ class MediafilesAppConfig(AppConfig):
             get_permission_change_data,
             dispatch_uid="mediafiles_get_permission_change_data",
         )
+        m2m_changed.connect(
+            update_inherited_access_groups,
+            sender=self.get_model("Mediafile").access_groups.through,
+            dispatch_uid="mediafiles_update_inherited_access_groups",
+        )
+        pre_delete.connect(
+            remove_deleted_group_from_mediafiles,
+            sender=get_group_model(),
+            dispatch_uid="mediafiles_remove_deleted_group_from_mediafiles",
+        )
 
         # Register viewsets.
         router.register(
@@ -0,0 +1,78 @@
+# Generated by Django 2.2.15 on 2026-10-19 12:00
+
+import jsonfield.fields
+from django.db import migrations, models
+
+
+def get_inherited_access_groups_id(parent_access_groups, own_access_groups):
+    """
+    Combines the inherited access groups of the parent with the own access groups
+    of a mediafile. This is a copy of the helper in the models, so this migration
+    does not change, if the models change.
+    """
+    if len(own_access_groups) == 0:
+        return parent_access_groups  # We do not have restrictions, copy from parent.
+    if isinstance(parent_access_groups, bool):
+        return own_access_groups if parent_access_groups else False
+    access_groups = [id for id in parent_access_groups if id in own_access_groups]
+    return access_groups or False
+
+
+def calculate_inherited_fields(apps, schema_editor):
+    """
+    Calculates the path and the inherited access groups of all mediafiles. The
+    tree is traversed from the root, so every parent is calculated before its
+    children.
+    """
+    Mediafile = apps.get_model("mediafiles", "Mediafile")
+
+    mediafiles = []
+    queue = [
+        (mediafile, "", True)
+        for mediafile in Mediafile.objects.filter(parent=None).prefetch_related(
+            "access_groups"
+        )
+    ]
+    while queue:
+        mediafile, parent_path, parent_access_groups = queue.pop()
+        name = (
+            (mediafile.title + "/")
+            if mediafile.is_directory
+            else mediafile.original_filename
+        )
+        mediafile.path = parent_path + name
+
+        own_access_groups = [group.id for group in mediafile.access_groups.all()]
+        access_groups = get_inherited_access_groups_id(
+            parent_access_groups, own_access_groups
+        )
+        mediafile.inherited_access_groups_id = access_groups
+        mediafiles.append(mediafile)
+
+        for child in mediafile.children.prefetch_related("access_groups"):
+            queue.append((child, mediafile.path, access_groups))
+
+    Mediafile.objects.bulk_update(mediafiles, ["path", "inherited_access_groups_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mediafiles", "0008_external_storage_2"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediafile",
+            name="path",
+            field=models.TextField(db_index=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="mediafile",
+            name="inherited_access_groups_id",
+            field=jsonfield.fields.JSONField(default=True, editable=False),
+        ),
+        migrations.RunPython(
+            calculate_inherited_fields, reverse_code=migrations.RunPython.noop
+        ),
+    ]
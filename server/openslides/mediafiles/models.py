@@ -11,6 +11,7 @@ from openslides.utils.manager import BaseManager
 
 from ..agenda.mixins import ListOfSpeakersMixin
 from ..core.config import config
+from ..utils.autoupdate import inform_changed_data
 from ..utils.models import RESTModelMixin
 from ..utils.rest_api import ValidationError
 from .access_permissions import MediafileAccessPermissions
@@ -37,7 +38,7 @@ class MediafileManager(BaseManager):
         return (
             super()
             .get_prefetched_queryset(*args, **kwargs)
-            .prefetch_related("lists_of_speakers", "parent", "access_groups")
+            .prefetch_related("lists_of_speakers", "access_groups")
         )
 
     def delete(self, *args, **kwargs):
@@ -102,6 +103,22 @@ class Mediafile(RESTModelMixin, ListOfSpeakersMixin, models.Model):
 
     access_groups = models.ManyToManyField(settings.AUTH_GROUP_MODEL, blank=True)
 
+    path = models.TextField(db_index=True, default="", editable=False)
+    """
+    The full path of this mediafile including all parent directories. It is
+    calculated from the parent on every save, see update_inherited_fields.
+    Files are looked up by their path, so it is indexed.
+    """
+
+    inherited_access_groups_id = JSONField(default=True, editable=False)
+    """
+    The effective access groups of this mediafile. They are calculated from the own
+    access groups and the (already calculated) ones of the parent on every save:
+    True: all groups
+    False: no permissions
+    List[int]: Groups with permissions
+    """
+
     class Meta:
         """
         Meta class for the mediafile model.
@@ -120,7 +137,21 @@ class Mediafile(RESTModelMixin, ListOfSpeakersMixin, models.Model):
 
     def save(self, *args, **kwargs):
         self.validate_unique()
-        return super().save(*args, **kwargs)
+        is_new = self.pk is None
+        old_inherited_fields = (self.path, self.inherited_access_groups_id)
+        self.update_inherited_fields()
+        return_value = super().save(*args, **kwargs)
+
+        # The children depend on the path and access groups of this directory.
+        if (
+            self.is_directory
+            and not is_new
+            and old_inherited_fields != (self.path, self.inherited_access_groups_id)
+        ):
+            children = self.update_children_deep()
+            if children and not kwargs.get("skip_autoupdate", False):
+                inform_changed_data(children)
+        return return_value
 
     def validate_unique(self):
         """
@@ -182,45 +213,49 @@ class Mediafile(RESTModelMixin, ListOfSpeakersMixin, models.Model):
             children.extend(child.get_children_deep())
         return children
 
-    @property
-    def path(self):
+    def update_inherited_fields(self):
+        """
+        Calculates the path and the inherited access groups from the parent. The
+        parent's values must be up to date. The instance is not saved.
+        """
         name = (self.title + "/") if self.is_directory else self.original_filename
-        if self.parent:
-            return self.parent.path + name
+        # A new instance cannot have access groups yet.
+        own_access_groups = (
+            [group.id for group in self.access_groups.all()] if self.pk else []
+        )
+        if self.parent is None:
+            self.path = name
+            self.inherited_access_groups_id = (
+                own_access_groups or True
+            )  # either some groups or all
         else:
-            return name
+            self.path = self.parent.path + name
+            self.inherited_access_groups_id = get_inherited_access_groups_id(
+                self.parent.inherited_access_groups_id, own_access_groups
+            )
+
+    def update_children_deep(self):
+        """
+        Recalculates the inherited fields of all children (deep) and saves them
+        without informing the autoupdate system. Returns all children.
+        """
+        children = []
+        queue = [self]
+        while queue:
+            parent = queue.pop()
+            for child in parent.children.prefetch_related("access_groups"):
+                child.parent = parent
+                child.update_inherited_fields()
+                children.append(child)
+                if child.is_directory:
+                    queue.append(child)
+        Mediafile.objects.bulk_update(children, ["path", "inherited_access_groups_id"])
+        return children
 
     @property
     def url(self):
         return settings.MEDIA_URL + self.path
 
-    @property
-    def inherited_access_groups_id(self):
-        """
-        True: all groups
-        False: no permissions
-        List[int]: Groups with permissions
-        """
-        own_access_groups = [group.id for group in self.access_groups.all()]
-        if not self.parent:
-            return own_access_groups or True  # either some groups or all
-
-        access_groups = self.parent.inherited_access_groups_id
-        if len(own_access_groups) > 0:
-            if isinstance(access_groups, bool) and access_groups:
-                return own_access_groups
-            elif isinstance(access_groups, bool) and not access_groups:
-                return False
-            else:  # List[int]
-                access_groups = [
-                    id
-                    for id in cast(List[int], access_groups)
-                    if id in own_access_groups
-                ]
-                return access_groups or False
-        else:
-            return access_groups  # We do not have restrictions, copy from parent.
-
     def get_filesize(self):
         """
         Transforms bytes to kilobytes or megabytes. Returns the size as string.
@@ -264,3 +299,24 @@ class Mediafile(RESTModelMixin, ListOfSpeakersMixin, models.Model):
 
     def get_list_of_speakers_title_information(self):
         return {"title": self.title}
+
+
+def get_inherited_access_groups_id(parent_access_groups, own_access_groups):
+    """
+    Combines the inherited access groups of the parent with the own access groups
+    of a mediafile. See Mediafile.inherited_access_groups_id for the values.
+    """
+    if len(own_access_groups) > 0:
+        if isinstance(parent_access_groups, bool) and parent_access_groups:
+            return own_access_groups
+        elif isinstance(parent_access_groups, bool) and not parent_access_groups:
+            return False
+        else:  # List[int]
+            access_groups = [
+                id
+                for id in cast(List[int], parent_access_groups)
+                if id in own_access_groups
+            ]
+            return access_groups or False
+    else:
+        return parent_access_groups  # We do not have restrictions, copy from parent.
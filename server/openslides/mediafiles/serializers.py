@@ -23,6 +23,7 @@ class MediafileSerializer(ModelSerializer):
         many=True, required=False, queryset=get_group_model().objects.all()
     )
     original_filename = CharField(write_only=True, required=False, allow_null=True)
+    inherited_access_groups_id = JSONField(read_only=True)
 
     class Meta:
         model = Mediafile
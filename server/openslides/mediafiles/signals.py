@@ -13,3 +13,44 @@ def get_permission_change_data(sender, permissions=None, **kwargs):
             and permission.codename == "can_see"
         ):
             yield from mediafiles_app.get_startup_elements()
+
+
+def update_inherited_access_groups(
+    sender, instance, action, reverse, model, pk_set, **kwargs
+):
+    """
+    Recalculates the inherited access groups, if the access groups of mediafiles
+    were changed. Saving the mediafiles also updates all children.
+    """
+    if reverse and action == "pre_clear":
+        # A reverse clear does not give the pk_set, so the affected mediafiles
+        # are remembered before they are removed from the group.
+        instance._cleared_mediafile_ids = list(
+            instance.mediafile_set.values_list("pk", flat=True)
+        )
+        return
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if reverse:
+        # The instance is a group and pk_set contains the affected mediafiles.
+        if action == "post_clear":
+            pk_set = instance.__dict__.pop("_cleared_mediafile_ids", [])
+        mediafiles = model.objects.filter(pk__in=pk_set or [])
+    else:
+        mediafiles = [instance]
+
+    for mediafile in mediafiles:
+        mediafile.save()
+
+
+def remove_deleted_group_from_mediafiles(sender, instance, **kwargs):
+    """
+    Removes a group from the access groups of all mediafiles before it is deleted.
+    The deletion itself would not send a m2m_changed signal, so the inherited
+    access groups would not be updated.
+    """
+    mediafiles = list(instance.mediafile_set.all())
+    if mediafiles:
+        instance.mediafile_set.remove(*mediafiles)
@@ -54,7 +54,7 @@ class MediafileViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in (
             "create",
@@ -169,9 +169,9 @@ class MediafileViewSet(ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def update(self, *args, **kwargs):
+        # Changed children are informed by the mediafile itself.
         with watch_and_update_configs():
             response = super().update(*args, **kwargs)
-        inform_changed_data(self.get_object().get_children_deep())
         return response
 
     @list_route(methods=["post"])
@@ -300,24 +300,14 @@ def get_mediafile(request, path):
     """
     if not path:
         raise Mediafile.DoesNotExist()
-    parts = path.split("/")
-    parent = None
-    can_see = has_perm(request.user, "mediafiles.can_see")
-    for i, part in enumerate(parts):
-        is_directory = i < len(parts) - 1
-        if is_directory:
-            mediafile = Mediafile.objects.get(
-                parent=parent, is_directory=is_directory, title=part
-            )
-        else:
-            mediafile = Mediafile.objects.get(
-                parent=parent, is_directory=is_directory, original_filename=part
-            )
-        if mediafile.access_groups.exists() and not in_some_groups(
-            request.user.id, [group.id for group in mediafile.access_groups.all()]
-        ):
-            can_see = False
-        parent = mediafile
+    # The path and the access groups of all parents are stored in the mediafile.
+    mediafile = Mediafile.objects.get(path=path, is_directory=False)
+    access_groups = mediafile.inherited_access_groups_id
+    # If access_groups is False, in_some_groups is only true for admins.
+    can_see = has_perm(request.user, "mediafiles.can_see") and (
+        (isinstance(access_groups, bool) and access_groups)
+        or in_some_groups(request.user.id, access_groups or [])
+    )
 
     # Check, if this file is projected
     is_projected = False
@@ -16,6 +16,7 @@ class MotionAccessPermissions(BaseAccessPermissions):
     """
 
     base_permission = "motions.can_see"
+    user_specific = True
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
@@ -1,6 +1,6 @@
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.db import IntegrityError, models, transaction
+from django.db import models, transaction
 from django.db.models import Max
 from jsonfield import JSONField
 
@@ -13,6 +13,7 @@ from openslides.utils.autoupdate import inform_changed_data
 from openslides.utils.exceptions import OpenSlidesError
 from openslides.utils.manager import BaseManager
 from openslides.utils.models import RESTModelMixin
+from openslides.utils.postgres import lock_transaction
 from openslides.utils.rest_api import ValidationError
 
 from ..utils.models import CASCADE_AND_AUTOUPDATE, SET_NULL_AND_AUTOUPDATE
@@ -32,6 +33,10 @@ from .access_permissions import (
 from .exceptions import WorkflowError
 
 
+# Name of the lock, that is held while an automatically set identifier is saved.
+IDENTIFIER_LOCK = "motions/motion:identifier"
+
+
 class StatuteParagraph(RESTModelMixin, models.Model):
     """
     Model for parts of the statute
@@ -280,14 +285,17 @@ class Motion(RESTModelMixin, AgendaItemWithListOfSpeakersMixin, models.Model):
         """
         return self.title
 
-    # TODO: Use transaction
     def save(self, skip_autoupdate=False, *args, **kwargs):
         """
         Save the motion.
 
         1. Set the state of a new motion to the default state.
         2. Ensure that the identifier is not an empty string.
-        3. Save the motion object.
+        3. Ensure that an automatically set identifier is still free. The lock
+           for this is held until the outermost transaction is commited. So
+           inside a request with an outer transaction all automatic identifiers
+           of other requests wait until the whole request is done.
+        4. Save the motion object.
         """
         if not self.state:
             self.reset_state()
@@ -297,31 +305,29 @@ class Motion(RESTModelMixin, AgendaItemWithListOfSpeakersMixin, models.Model):
         if not self.identifier and isinstance(self.identifier, str):
             self.identifier = None
 
-        # Try to save the motion until it succeeds with a correct identifier.
-        while True:
-            try:
-                # Always skip autoupdate. Maybe we run it later in this method.
-                with transaction.atomic():
-                    super(Motion, self).save(  # type: ignore
-                        skip_autoupdate=True, *args, **kwargs
-                    )
-            except IntegrityError:
-                # Identifier is already used.
-                if hasattr(self, "_identifier_prefix"):
-                    # Calculate a new one and try again.
-                    (
-                        self.identifier_number,
-                        self.identifier,
-                    ) = self.increment_identifier_number(
-                        self.identifier_number, self._identifier_prefix
-                    )
-                else:
-                    # Do not calculate a new one but reraise the IntegrityError.
-                    # The error is caught in the category sort view.
-                    raise
-            else:
-                # Save was successful. End loop.
-                break
+        with transaction.atomic():
+            if hasattr(self, "_identifier_prefix"):
+                # The identifier was set automatically. Take the lock for
+                # identifiers and check again, that the identifier is free.
+                # Other motions wait until this motion is saved, so the
+                # identifier can not be used in the meantime.
+                lock_transaction(IDENTIFIER_LOCK)
+                (
+                    self.identifier_number,
+                    self.identifier,
+                ) = self.increment_identifier_number(
+                    self.identifier_number,
+                    self._identifier_prefix,
+                    initial_increment=False,
+                )
+            # Always skip autoupdate. Maybe we run it later in this method.
+            super(Motion, self).save(  # type: ignore
+                skip_autoupdate=True, *args, **kwargs
+            )
+
+        # The identifier is saved. Do not check it again in later saves.
+        if hasattr(self, "_identifier_prefix"):
+            del self._identifier_prefix
 
         if not skip_autoupdate:
             inform_changed_data(self)
@@ -356,11 +362,8 @@ class Motion(RESTModelMixin, AgendaItemWithListOfSpeakersMixin, models.Model):
         self._identifier_prefix = prefix
 
         # Use the already assigned identifier_number, if the motion has one.
-        # Else get the biggest number.
-        if self.identifier_number is not None:
-            number = self.identifier_number
-            initial_increment = False
-        else:
+        # Else use the biggest number + 1.
+        if self.identifier_number is None:
             # Find all motions that should be included in the calculations.
             if self.is_amendment():
                 motions = self.parent.amendments.all()
@@ -371,30 +374,33 @@ class Motion(RESTModelMixin, AgendaItemWithListOfSpeakersMixin, models.Model):
             else:
                 motions = Motion.objects.all()
 
-            number = (
+            self.identifier_number = (
                 motions.aggregate(Max("identifier_number"))["identifier_number__max"]
                 or 0
-            )
-            initial_increment = True
+            ) + 1
 
-        # Calculate new identifier.
-        number, identifier = self.increment_identifier_number(
-            number, prefix, initial_increment=initial_increment
+        # Set identifier. If it is already used, the next free identifier is
+        # set when the motion is saved.
+        self.identifier = (
+            f"{prefix}{Motion.extend_identifier_number(self.identifier_number)}"
         )
 
-        # Set identifier and identifier_number.
-        self.identifier = identifier
-        self.identifier_number = number
-
     def increment_identifier_number(self, number, prefix, initial_increment=True):
         """
         Helper method. It increments the number until a free identifier
         number is found. Returns new number and identifier.
+
+        All used identifiers with the prefix are loaded with one query.
         """
+        used_identifiers = set(
+            Motion.objects.filter(identifier__startswith=prefix)
+            .exclude(pk=self.pk)
+            .values_list("identifier", flat=True)
+        )
         if initial_increment:
             number += 1
         identifier = f"{prefix}{Motion.extend_identifier_number(number)}"
-        while Motion.objects.filter(identifier=identifier).exists():
+        while identifier in used_identifiers:
             number += 1
             identifier = f"{prefix}{Motion.extend_identifier_number(number)}"
         return number, identifier
@@ -1,13 +1,14 @@
 from decimal import Decimal
-from typing import List, Set
+from typing import Dict, List, Set, Tuple
 
 import jsonschema
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Case, When
+from django.db.models import Case, Q, When
 from django.db.models.deletion import ProtectedError
 from django.db.utils import IntegrityError
 from django.http.request import QueryDict
+from django.utils import timezone
 from rest_framework import status
 
 from openslides.poll.views import BaseOptionViewSet, BasePollViewSet, BaseVoteViewSet
@@ -15,7 +16,12 @@ from openslides.poll.views import BaseOptionViewSet, BasePollViewSet, BaseVoteVi
 from ..core.config import config
 from ..core.models import Tag
 from ..utils.auth import has_perm, in_some_groups
-from ..utils.autoupdate import inform_changed_data, inform_deleted_data
+from ..utils.autoupdate import (
+    AutoupdateElement,
+    inform_changed_data,
+    inform_deleted_data,
+    inform_elements,
+)
 from ..utils.rest_api import (
     ModelViewSet,
     Response,
@@ -70,7 +76,7 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("metadata", "partial_update", "update", "destroy"):
             result = has_perm(self.request.user, "motions.can_see")
@@ -233,7 +239,7 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         # TODO: Skip history.
         new_users = list(motion.submitters.all())
         new_users.extend(motion.supporters.all())
-        inform_changed_data(new_users)
+        inform_changed_data(new_users, force=True)
 
         # Fire autoupdate again to save information to OpenSlides history.
         inform_changed_data(
@@ -312,7 +318,7 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         # without permission to see users may not have them but can get it now.
         # TODO: Skip history.
         new_users = list(updated_motion.supporters.all())
-        inform_changed_data(new_users)
+        inform_changed_data(new_users, force=True)
 
         # Fire autoupdate again to save information to OpenSlides history.
         inform_changed_data(
@@ -484,7 +490,7 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         # Also send all new submitters via autoupdate because users without
         # permission to see users may not have them but can get it now.
         # TODO: Skip history.
-        inform_changed_data(new_submitters)
+        inform_changed_data(new_submitters, force=True)
 
         # Send response.
         return Response(
@@ -522,7 +528,7 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
             # Send new supporter via autoupdate because users without permission
             # to see users may not have it but can get it now.
             # TODO: Skip history.
-            inform_changed_data([request.user])
+            inform_changed_data([request.user], force=True)
             message = "You have supported this motion successfully."
         else:
             # Unsupport motion.
@@ -575,12 +581,20 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
+        # Get all motions and categories at once.
+        motion_objects = Motion.objects.in_bulk([item["id"] for item in motions])
+        category_objects = Category.objects.in_bulk(
+            [item["category"] for item in motions if item["category"] is not None]
+        )
+
         motion_result = []
+        elements = []
+        now = timezone.now()
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = motion_objects[item["id"]]
+            except KeyError:
                 raise ValidationError(
                     {"detail": "Motion {0} does not exist", "args": [item["id"]]}
                 )
@@ -589,8 +603,8 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
             category = None
             if item["category"] is not None:
                 try:
-                    category = Category.objects.get(pk=item["category"])
-                except Category.DoesNotExist:
+                    category = category_objects[item["category"]]
+                except KeyError:
                     raise ValidationError(
                         {
                             "detail": "Category {0} does not exist",
@@ -600,25 +614,25 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
 
             # Set category
             motion.category = category
+            motion.last_modified = now
 
-            # Save motion.
-            motion.save(
-                update_fields=["category", "last_modified"], skip_autoupdate=True
-            )
-
-            # Fire autoupdate again to save information to OpenSlides history.
+            # Collect the autoupdate element to save information to OpenSlides history.
             information = (
                 ["Category removed"]
                 if category is None
                 else ["Category set to {arg1}", category.name]
             )
-            inform_changed_data(
-                motion, information=information, user_id=request.user.pk
+            elements.append(
+                self.get_motion_element(motion, information, request.user.pk)
             )
 
             # Finish motion.
             motion_result.append(motion)
 
+        # Save all motions and inform all clients.
+        Motion.objects.bulk_update(motion_result, ["category", "last_modified"])
+        inform_elements(elements)
+
         # Send response.
         return Response(
             {
@@ -662,12 +676,25 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
+        # Get all motions and motion blocks at once.
+        motion_objects = Motion.objects.in_bulk([item["id"] for item in motions])
+        motion_block_objects = MotionBlock.objects.in_bulk(
+            [
+                item["motion_block"]
+                for item in motions
+                if item["motion_block"] is not None
+            ]
+        )
+
         motion_result = []
+        elements = []
+        motion_block_ids = set()
+        now = timezone.now()
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = motion_objects[item["id"]]
+            except KeyError:
                 raise ValidationError(
                     {"detail": "Motion {0} does not exist", "args": [item["id"]]}
                 )
@@ -676,8 +703,8 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
             motion_block = None
             if item["motion_block"] is not None:
                 try:
-                    motion_block = MotionBlock.objects.get(pk=item["motion_block"])
-                except MotionBlock.DoesNotExist:
+                    motion_block = motion_block_objects[item["motion_block"]]
+                except KeyError:
                     raise ValidationError(
                         {
                             "detail": "MotionBlock {0} does not exist",
@@ -685,34 +712,41 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
                         }
                     )
 
-            # inform old motion block
-            if motion.motion_block:
-                inform_changed_data(motion.motion_block)
-            # inform new motion block
-            if motion_block:
-                inform_changed_data(motion_block)
+            # Remember old and new motion block to inform them.
+            if motion.motion_block_id is not None:
+                motion_block_ids.add(motion.motion_block_id)
+            if motion_block is not None:
+                motion_block_ids.add(motion_block.pk)
 
             # Set motion bock
             motion.motion_block = motion_block
+            motion.last_modified = now
 
-            # Save motion.
-            motion.save(
-                update_fields=["motion_block", "last_modified"], skip_autoupdate=True
-            )
-
-            # Fire autoupdate again to save information to OpenSlides history.
+            # Collect the autoupdate element to save information to OpenSlides history.
             information = (
                 ["Motion block removed"]
                 if motion_block is None
                 else ["Motion block set to {arg1}", motion_block.title]
             )
-            inform_changed_data(
-                motion, information=information, user_id=request.user.pk
+            elements.append(
+                self.get_motion_element(motion, information, request.user.pk)
             )
 
             # Finish motion.
             motion_result.append(motion)
 
+        # Save all motions and inform all clients about the motions and the old
+        # and new motion blocks.
+        Motion.objects.bulk_update(motion_result, ["motion_block", "last_modified"])
+        elements.extend(
+            AutoupdateElement(
+                id=motion_block_id,
+                collection_string=MotionBlock.get_collection_string(),
+            )
+            for motion_block_id in motion_block_ids
+        )
+        inform_elements(elements)
+
         # Send response.
         return Response(
             {
@@ -768,8 +802,8 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
 
         # Send submitters and supporters via autoupdate because users without
         # users.can_see may see them now.
-        inform_changed_data(map(lambda s: s.user, motion.submitters.all()))
-        inform_changed_data(motion.supporters.all())
+        inform_changed_data(map(lambda s: s.user, motion.submitters.all()), force=True)
+        inform_changed_data(motion.supporters.all(), force=True)
 
         # Fire autoupdate again to save information to OpenSlides history.
         inform_changed_data(
@@ -816,52 +850,85 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
-        motion_result = []
+        # Get all motions with their states and all requested states at once.
+        motion_objects = Motion.objects.select_related("state").in_bulk(
+            [item["id"] for item in motions]
+        )
+        state_objects = State.objects.in_bulk([item["state"] for item in motions])
+
+        # Validate all items before any motion is changed.
+        motion_states = []
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = motion_objects[item["id"]]
+            except KeyError:
                 raise ValidationError(
                     {"detail": "Motion {0} does not exist", "args": [item["id"]]}
                 )
 
-            # Set or reset state.
             state_id = item["state"]
-            valid_states = State.objects.filter(workflow=motion.workflow_id)
-            if state_id not in [item.id for item in valid_states]:
+            state = state_objects.get(state_id)
+            if state is None or state.workflow_id != motion.state.workflow_id:
                 # States of different workflows are not allowed.
                 raise ValidationError(
                     {"detail": "You can not set the state to {0}.", "args": [state_id]}
                 )
-            motion.set_state(state_id)
-
-            # Save motion.
-            motion.save(
-                update_fields=[
-                    "state",
-                    "identifier",
-                    "identifier_number",
-                    "last_modified",
-                ],
-                skip_autoupdate=True,
-            )
+            motion_states.append((motion, state))
 
-            # Send submitters and supporters via autoupdate because users without
-            # users.can_see may see them now.
-            inform_changed_data(map(lambda s: s.user, motion.submitters.all()))
-            inform_changed_data(motion.supporters.all())
+        motion_result = []
+        motions_to_update = []
+        elements = []
+        now = timezone.now()
+        for motion, state in motion_states:
+            # Set or reset state.
+            identifier = motion.identifier
+            motion.set_state(state)
+
+            if motion.identifier != identifier:
+                # A new identifier was set. Save the motion at once, so the
+                # identifier is used for the following motions.
+                motion.save(
+                    update_fields=[
+                        "state",
+                        "identifier",
+                        "identifier_number",
+                        "last_modified",
+                    ],
+                    skip_autoupdate=True,
+                )
+            else:
+                motion.last_modified = now
+                motions_to_update.append(motion)
 
-            # Fire autoupdate again to save information to OpenSlides history.
-            inform_changed_data(
-                motion,
-                information=["State set to {arg1}", motion.state.name],
-                user_id=request.user.pk,
+            # Collect the autoupdate element to save information to OpenSlides history.
+            elements.append(
+                self.get_motion_element(
+                    motion, ["State set to {arg1}", state.name], request.user.pk
+                )
             )
 
             # Finish motion.
             motion_result.append(motion)
 
+        # Save all other motions.
+        Motion.objects.bulk_update(motions_to_update, ["state", "last_modified"])
+
+        # Send submitters and supporters via autoupdate because users without
+        # users.can_see may see them now.
+        inform_changed_data(
+            get_user_model()
+            .objects.filter(
+                Q(submitter__motion__in=motion_result)
+                | Q(motion_supporters__in=motion_result)
+            )
+            .distinct(),
+            force=True,
+        )
+
+        # Inform all clients and save information to OpenSlides history.
+        inform_elements(elements)
+
         # Send response.
         return Response(
             {
@@ -967,12 +1034,23 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
+        # Get all motions with their states and all requested recommendable
+        # states at once.
+        motion_objects = Motion.objects.select_related("state").in_bulk(
+            [item["id"] for item in motions]
+        )
+        recommendable_states = State.objects.filter(
+            recommendation_label__isnull=False
+        ).in_bulk([item["recommendation"] for item in motions])
+
         motion_result = []
+        elements = []
+        now = timezone.now()
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = motion_objects[item["id"]]
+            except KeyError:
                 raise ValidationError(
                     {"detail": "Motion {0} does not exist", "args": [item["id"]]}
                 )
@@ -984,40 +1062,39 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
                 motion.recommendation = None
             else:
                 # Check data and set recommendation.
-                recommendable_states = State.objects.filter(
-                    workflow=motion.workflow_id, recommendation_label__isnull=False
-                )
-                if recommendation_state_id not in [
-                    item.id for item in recommendable_states
-                ]:
+                recommendation = recommendable_states.get(recommendation_state_id)
+                if (
+                    recommendation is None
+                    or recommendation.workflow_id != motion.state.workflow_id
+                ):
                     raise ValidationError(
                         {
                             "detail": "You can not set the recommendation to {0}.",
                             "args": [recommendation_state_id],
                         }
                     )
-                motion.set_recommendation(recommendation_state_id)
+                motion.set_recommendation(recommendation)
+            motion.last_modified = now
 
-            # Save motion.
-            motion.save(
-                update_fields=["recommendation", "last_modified"], skip_autoupdate=True
-            )
+            # Collect the autoupdate element to save information to OpenSlides history.
             label = (
                 motion.recommendation.recommendation_label
                 if motion.recommendation
                 else "None"
             )
-
-            # Fire autoupdate and save information to OpenSlides history.
-            inform_changed_data(
-                motion,
-                information=["Recommendation set to {arg1}", label],
-                user_id=request.user.pk,
+            elements.append(
+                self.get_motion_element(
+                    motion, ["Recommendation set to {arg1}", label], request.user.pk
+                )
             )
 
             # Finish motion.
             motion_result.append(motion)
 
+        # Save all motions and inform all clients.
+        Motion.objects.bulk_update(motion_result, ["recommendation", "last_modified"])
+        inform_elements(elements)
+
         # Send response.
         return Response(
             {
@@ -1091,27 +1168,57 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
         except jsonschema.ValidationError as err:
             raise ValidationError({"detail": str(err)})
 
+        # Get all motions and check all tags at once.
+        motion_objects = Motion.objects.in_bulk([item["id"] for item in motions])
+        tag_ids = set(
+            Tag.objects.filter(
+                pk__in=[tag_id for item in motions for tag_id in item["tags"]]
+            ).values_list("pk", flat=True)
+        )
+
         motion_result = []
+        new_motion_tags = set()
         for item in motions:
             # Get motion.
             try:
-                motion = Motion.objects.get(pk=item["id"])
-            except Motion.DoesNotExist:
+                motion = motion_objects[item["id"]]
+            except KeyError:
                 raise ValidationError(
                     {"detail": "Motion {0} does not exist", "args": [item["id"]]}
                 )
 
             # Set new tags
             for tag_id in item["tags"]:
-                if not Tag.objects.filter(pk=tag_id).exists():
+                if tag_id not in tag_ids:
                     raise ValidationError(
                         {"detail": "Tag {0} does not exist", "args": [tag_id]}
                     )
-            motion.tags.set(item["tags"])
+                new_motion_tags.add((motion.pk, tag_id))
 
             # Finish motion.
             motion_result.append(motion)
 
+        # Delete all removed tags and add all new tags of all motions.
+        MotionTag = Motion.tags.through
+        old_motion_tags: Dict[Tuple[int, int], int] = {
+            (motion_id, tag_id): pk
+            for pk, motion_id, tag_id in MotionTag.objects.filter(
+                motion__in=motion_result
+            ).values_list("pk", "motion_id", "tag_id")
+        }
+        MotionTag.objects.filter(
+            pk__in=[
+                pk
+                for motion_tag, pk in old_motion_tags.items()
+                if motion_tag not in new_motion_tags
+            ]
+        ).delete()
+        MotionTag.objects.bulk_create(
+            MotionTag(motion_id=motion_id, tag_id=tag_id)
+            for motion_id, tag_id in new_motion_tags
+            if (motion_id, tag_id) not in old_motion_tags
+        )
+
         # Now inform all clients.
         inform_changed_data(motion_result)
 
@@ -1123,6 +1230,20 @@ class MotionViewSet(TreeSortMixin, ModelViewSet):
             }
         )
 
+    def get_motion_element(
+        self, motion: Motion, information: List[str], user_id: int
+    ) -> AutoupdateElement:
+        """
+        Returns the autoupdate element for a changed motion. Use it to inform
+        about many motions with different history information at once.
+        """
+        return AutoupdateElement(
+            id=motion.pk,
+            collection_string=motion.get_collection_string(),
+            information=information,
+            user_id=user_id,
+        )
+
 
 class MotionPollViewSet(BasePollViewSet):
     """
@@ -1313,7 +1434,7 @@ class MotionChangeRecommendationViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             result = has_perm(self.request.user, "motions.can_see")
@@ -1379,7 +1500,7 @@ class MotionCommentSectionViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create", "destroy", "update", "partial_update", "sort"):
             result = has_perm(self.request.user, "motions.can_see") and has_perm(
@@ -1470,7 +1591,7 @@ class StatuteParagraphViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create", "partial_update", "update", "destroy"):
             result = has_perm(self.request.user, "motions.can_see") and has_perm(
@@ -1496,7 +1617,7 @@ class CategoryViewSet(TreeSortMixin, ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in (
             "create",
@@ -1613,7 +1734,7 @@ class MotionBlockViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             result = has_perm(self.request.user, "motions.can_see")
@@ -1691,7 +1812,7 @@ class WorkflowViewSet(ModelViewSet, ProtectedErrorMessageMixin):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create", "partial_update", "update", "destroy"):
             result = has_perm(self.request.user, "motions.can_see") and has_perm(
@@ -1740,7 +1861,7 @@ class StateViewSet(ModelViewSet, ProtectedErrorMessageMixin):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve", "metadata"):
+        if self.action in ("list", "retrieve", "bulk_retrieve", "metadata"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create", "partial_update", "update", "destroy"):
             result = has_perm(self.request.user, "motions.can_see") and has_perm(
@@ -1784,5 +1905,5 @@ class StateViewSet(ModelViewSet, ProtectedErrorMessageMixin):
         """
         result = super().update(*args, **kwargs)
         state = self.get_object()
-        inform_changed_data(Motion.objects.filter(state=state))
+        inform_changed_data(Motion.objects.filter(state=state), force=True)
         return result
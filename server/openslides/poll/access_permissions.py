@@ -13,6 +13,7 @@ logger = logging.getLogger(__name__)
 
 class BaseVoteAccessPermissions(BaseAccessPermissions):
     manage_permission = ""  # set by subclass
+    user_specific = True
 
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
@@ -65,6 +66,7 @@ class BaseOptionAccessPermissions(BaseAccessPermissions):
 
 class BasePollAccessPermissions(BaseAccessPermissions):
     manage_permission = ""  # set by subclass
+    user_specific = True
 
     additional_fields: List[str] = []
     """ Add fields to be removed from each unpublished poll """
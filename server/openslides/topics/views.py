@@ -20,7 +20,7 @@ class TopicViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         else:
             result = has_perm(self.request.user, "agenda.can_manage")
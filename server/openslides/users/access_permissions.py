@@ -10,6 +10,8 @@ class UserAccessPermissions(BaseAccessPermissions):
     Access permissions container for User and UserViewSet.
     """
 
+    user_specific = True
+
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
     ) -> List[Dict[str, Any]]:
@@ -138,6 +140,8 @@ class PersonalNoteAccessPermissions(BaseAccessPermissions):
     can handle personal notes.
     """
 
+    user_specific = True
+
     async def get_restricted_data(
         self, full_data: List[Dict[str, Any]], user_id: int
     ) -> List[Dict[str, Any]]:
@@ -92,7 +92,7 @@ class UserViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             result = has_perm(self.request.user, "users.can_see_name")
@@ -603,7 +603,7 @@ class GroupViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action == "metadata":
             # Every authenticated user can see the metadata.
@@ -749,6 +749,7 @@ class GroupViewSet(ModelViewSet):
                             collection_string=cachable.get_collection_string(),
                             full_data=full_data,
                             disable_history=True,
+                            force=True,
                         )
                     )
         inform_elements(elements)
@@ -769,7 +770,7 @@ class PersonalNoteViewSet(ModelViewSet):
         """
         Returns True if the user has required permissions.
         """
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "bulk_retrieve"):
             result = self.get_access_permissions().check_permissions(self.request.user)
         elif self.action in ("create_or_update", "destroy"):
             # Every authenticated user can see metadata and create personal
@@ -21,6 +21,12 @@ class BaseAccessPermissions:
     If this string is empty, all users can see it.
     """
 
+    user_specific = False
+    """
+    Set to True, if the restricted data does not only depend on the groups of the
+    user, e. g. because users can see their own elements.
+    """
+
     def check_permissions(self, user_id: int) -> bool:
         """
         Returns True if the user has read access to model instances.
@@ -168,6 +168,23 @@ async def async_in_some_groups(
     return in_some_groups
 
 
+async def async_get_permission_class(user_id: int) -> str:
+    """
+    Returns a name for the groups of the user. All users with the same permission
+    class have the same permissions.
+
+    user_id 0 means anonymous user.
+    """
+    if not user_id:
+        return "anonymous"
+    user_data = await element_cache.get_element_data(user_collection_string, user_id)
+    if user_data is None:
+        raise UserDoesNotExist()
+    # If the user has no groups, then the default group is used.
+    group_ids = user_data["groups_id"] or [GROUP_DEFAULT_PK]
+    return ",".join(str(group_id) for group_id in sorted(group_ids))
+
+
 def anonymous_is_enabled() -> bool:
     """
     Returns True if the anonymous user is enabled in the settings.
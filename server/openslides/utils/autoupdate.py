@@ -4,9 +4,9 @@ from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 from django.db.models import Model
 from mypy_extensions import TypedDict
 
-from .auth import UserDoesNotExist
+from .auth import UserDoesNotExist, async_get_permission_class
 from .autoupdate_bundle import AutoupdateElement, autoupdate_bundle
-from .cache import ChangeIdTooLowError, element_cache
+from .cache import AUTOUPDATE_SNAPSHOT_INTERVAL, ChangeIdTooLowError, element_cache
 from .utils import is_iterable, split_element_id
 
 
@@ -34,6 +34,7 @@ def inform_changed_data(
     user_id: Optional[int] = None,
     disable_history: bool = False,
     no_delete_on_restriction: bool = False,
+    force: bool = False,
 ) -> None:
     """
     Informs the autoupdate system and the caching system about the creation or
@@ -41,6 +42,9 @@ def inform_changed_data(
 
     The argument instances can be one instance or an iterable over instances.
 
+    Set force to True, if the elements have to be sent even if they did not
+    change, e. g. because users may see them now (see AUTOUPDATE_SKIP_UNCHANGED).
+
     History creation is enabled.
     """
     if information is None:
@@ -59,6 +63,7 @@ def inform_changed_data(
             information=information,
             user_id=user_id,
             no_delete_on_restriction=no_delete_on_restriction,
+            force=force,
         )
         elements.append(element)
     inform_elements(elements)
@@ -119,17 +124,19 @@ async def _get_autoupdate_data(
     Returns the max_change_id and the autoupdate from from_change_id to max_change_id
     """
     try:
-        (
-            max_change_id,
-            changed_elements,
-            deleted_element_ids,
-        ) = await element_cache.get_data_since(user_id, from_change_id)
+        if not from_change_id and AUTOUPDATE_SNAPSHOT_INTERVAL:
+            max_change_id, changed_elements = await get_restricted_all_data(user_id)
+            deleted_element_ids: List[str] = []
+        else:
+            (
+                max_change_id,
+                changed_elements,
+                deleted_element_ids,
+            ) = await element_cache.get_data_since(user_id, from_change_id)
     except ChangeIdTooLowError:
         # The change_id is lower the the lowerst change_id in redis. Return all data
-        (
-            max_change_id,
-            changed_elements,
-        ) = await element_cache.get_all_data_list_with_max_change_id(user_id)
+        max_change_id, changed_elements = await get_restricted_all_data(user_id)
+        deleted_element_ids = []
         deleted_elements: Dict[str, List[int]] = {}
         all_data = True
     else:
@@ -155,3 +162,19 @@ async def _get_autoupdate_data(
                 all_data=all_data,
             ),
         )
+
+
+async def get_restricted_all_data(
+    user_id: int,
+) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+    """
+    Returns the max_change_id and all data restricted for the user.
+
+    If AUTOUPDATE_SNAPSHOT_INTERVAL is set, the snapshot of the permission class
+    of the user is used.
+    """
+    if AUTOUPDATE_SNAPSHOT_INTERVAL:
+        return await element_cache.get_all_data_list_with_snapshot(
+            user_id, await async_get_permission_class(user_id)
+        )
+    return await element_cache.get_all_data_list_with_max_change_id(user_id)
@@ -1,18 +1,48 @@
+import atexit
 import json
+import queue
 import threading
+import time
 from collections import defaultdict
-from contextlib import contextmanager
-from typing import Any, Dict, Iterable, Iterator, List, Optional
-
-from asgiref.sync import async_to_sync
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.db import close_old_connections, transaction
+from django.db.models import Model
+from django.utils.timezone import now
 from mypy_extensions import TypedDict
 
+from . import logging
 from .cache import element_cache, get_element_id
+from .stats import AutoupdateSuppressionLogger
 from .stream import stream
 from .timing import Timing
 from .utils import get_model_from_collection_string
 
 
+logger = logging.getLogger(__name__)
+
+use_autoupdate_pipeline = getattr(settings, "AUTOUPDATE_PIPELINE", False)
+use_stream_deltas = getattr(settings, "AUTOUPDATE_STREAM_DELTAS", False)
+skip_unchanged = getattr(settings, "AUTOUPDATE_SKIP_UNCHANGED", False)
+use_history_writer = getattr(settings, "HISTORY_WRITER", False)
+
+
 class AutoupdateElementBase(TypedDict):
     id: int
     collection_string: str
@@ -40,19 +70,30 @@ class AutoupdateElement(AutoupdateElementBase, total=False):
     as the _no_delete_on_restriction key. If this is true, there should neither be an
     entry for one specific model in the changed *nor the deleted* part of the
     autoupdate, if the model was restricted.
+
+    force: If this is True, the element is sent even if its full_data did not
+    change (see AUTOUPDATE_SKIP_UNCHANGED). Use this, if the restricted data of
+    the element may have changed, e. g. because users may see it now.
     """
 
     information: List[str]
     user_id: Optional[int]
     disable_history: bool
     no_delete_on_restriction: bool
+    force: bool
     full_data: Optional[Dict[str, Any]]
 
 
 class AutoupdateBundle:
     """
     Collects changed elements via inform*_data. After the collecting-step is finished,
-    the bundle releases all changes to the history and element cache via `.done()`.
+    the bundle releases all changes to the history and element cache via `.done()`
+    or `.adone()` in async code.
+
+    If an element is added more than once, the last one wins, but the force and
+    no_delete_on_restriction flags of all of them are kept. A bundle can be
+    shared by threads, e. g. when a view hands off work to a thread pool with
+    a copy of its context (see autoupdate_bundle()).
     """
 
     def __init__(self) -> None:
@@ -60,13 +101,24 @@ class AutoupdateBundle:
             dict
         )
         self._disable_history = False
+        self.lock = threading.Lock()
 
     def add(self, elements: Iterable[AutoupdateElement]) -> None:
         """ Adds the elements to the bundle """
-        for element in elements:
-            self.autoupdate_elements[element["collection_string"]][
-                element["id"]
-            ] = element
+        with self.lock:
+            for element in elements:
+                collection_elements = self.autoupdate_elements[
+                    element["collection_string"]
+                ]
+                existing_element = collection_elements.get(element["id"])
+                if existing_element is not None:
+                    # The flags of the replaced element must not get lost.
+                    element = element.copy()
+                    if existing_element.get("force"):
+                        element["force"] = True
+                    if existing_element.get("no_delete_on_restriction"):
+                        element["no_delete_on_restriction"] = True
+                collection_elements[element["id"]] = element
 
     def disable_history(self) -> None:
         self._disable_history = True
@@ -81,7 +133,62 @@ class AutoupdateBundle:
         if not self.autoupdate_elements:
             return None
 
-        for collection, elements in self.autoupdate_elements.items():
+        self.resolve_full_data()
+        if skip_unchanged:
+            async_to_sync(self.remove_unchanged_elements)()
+            if not self.autoupdate_elements:
+                # Nothing changed, so the client is up to date with the current
+                # change id.
+                return async_to_sync(element_cache.get_current_change_id)()
+
+        # Save histroy here using sync code.
+        if not self._disable_history:
+            save_history(self.element_iterator)
+
+        # Update cache and send autoupdate using async code.
+        change_id = async_to_sync(self.dispatch_autoupdate)()
+
+        return change_id
+
+    async def adone(self) -> Optional[int]:
+        """
+        Like done(), but for async code. Only the DB access to resolve the full
+        data and to save the history runs in a thread.
+        """
+        if not self.autoupdate_elements:
+            return None
+
+        await sync_to_async(self.resolve_full_data)()  # type: ignore
+        if skip_unchanged:
+            await self.remove_unchanged_elements()
+            if not self.autoupdate_elements:
+                return await element_cache.get_current_change_id()
+
+        if not self._disable_history:
+            await sync_to_async(save_history)(list(self.element_iterator))  # type: ignore
+
+        return await self.dispatch_autoupdate()
+
+    def resolve_full_data(self) -> None:
+        """
+        Loads the full_data of all elements, which do not have one, from the DB.
+
+        Collections with generic foreign keys (e. g. agenda items) are loaded last,
+        so their related objects can be taken from the already loaded instances
+        of the other collections.
+        """
+        collections = sorted(
+            self.autoupdate_elements.keys(),
+            key=lambda collection: any(
+                isinstance(field, GenericForeignKey)
+                for field in get_model_from_collection_string(
+                    collection
+                )._meta.private_fields
+            ),
+        )
+        known_instances: Dict[Type[Model], Dict[int, Model]] = {}
+        for collection in collections:
+            elements = self.autoupdate_elements[collection]
             # Get all ids, that do not have a full_data key
             # (element["full_data"]=None will not be resolved again!)
             ids = [
@@ -95,17 +202,43 @@ class AutoupdateBundle:
                 # for the element, the data will be interpreted as None, which
                 # is correct for deleted elements.
                 model_class = get_model_from_collection_string(collection)
-                for full_data in model_class.get_elements(ids):
-                    elements[full_data["id"]]["full_data"] = full_data
-
-        # Save histroy here using sync code.
-        if not self._disable_history:
-            save_history(self.element_iterator)
-
-        # Update cache and send autoupdate using async code.
-        change_id = async_to_sync(self.dispatch_autoupdate)()
-
-        return change_id
+                instances = model_class.get_instances(ids, known_instances)
+                known_instances[model_class] = {
+                    instance.pk: instance for instance in instances
+                }
+                for instance in instances:
+                    elements[instance.pk]["full_data"] = instance.get_full_data()
+
+    async def remove_unchanged_elements(self) -> None:
+        """
+        Removes all changed elements from the bundle, which full_data is the same
+        as in the cache. Deleted elements and elements with the force flag are
+        kept.
+        """
+        element_ids = {
+            get_element_id(element["collection_string"], element["id"]): element
+            for element in self.element_iterator
+            if element.get("full_data") is not None and not element.get("force")
+        }
+        unchanged_element_ids = await element_cache.get_unchanged_element_ids(
+            {
+                element_id: {
+                    **element["full_data"],  # type: ignore
+                    "_no_delete_on_restriction": element.get(
+                        "no_delete_on_restriction", False
+                    ),
+                }
+                for element_id, element in element_ids.items()
+            }
+        )
+        for element_id in unchanged_element_ids:
+            element = element_ids[element_id]
+            elements = self.autoupdate_elements[element["collection_string"]]
+            del elements[element["id"]]
+            if not elements:
+                del self.autoupdate_elements[element["collection_string"]]
+        if unchanged_element_ids:
+            AutoupdateSuppressionLogger.add(len(unchanged_element_ids))
 
     @property
     def element_iterator(self) -> Iterable[AutoupdateElement]:
@@ -130,7 +263,7 @@ class AutoupdateBundle:
             cache_elements[element_id] = full_data
         return cache_elements
 
-    async def dispatch_autoupdate(self) -> int:
+    async def dispatch_autoupdate(self, reserved_change_id: int = 0) -> int:
         """
         Async helper function to update cache and send autoupdate.
 
@@ -138,33 +271,396 @@ class AutoupdateBundle:
         """
         # Update cache
         cache_elements = await self.get_data_for_cache()
-        change_id = await element_cache.change_elements(cache_elements)
+        if use_stream_deltas:
+            change_id, patches = await element_cache.change_elements_with_patches(
+                cache_elements, reserved_change_id
+            )
+            # Changed elements are only send as patch. Consumers with another
+            # version than base_change_id have to load the full element.
+            autoupdate_payload: Dict[str, Any] = {
+                "elements": {
+                    element_id: data
+                    for element_id, data in cache_elements.items()
+                    if element_id not in patches
+                },
+                "patches": patches,
+                "change_id": change_id,
+            }
+        else:
+            change_id = await element_cache.change_elements(
+                cache_elements, reserved_change_id
+            )
+            autoupdate_payload = {"elements": cache_elements, "change_id": change_id}
 
         # Send autoupdate
-        autoupdate_payload = {"elements": cache_elements, "change_id": change_id}
         await stream.send("autoupdate", autoupdate_payload)
 
         return change_id
 
 
+_autoupdate_bundle: ContextVar[Optional[AutoupdateBundle]] = ContextVar(
+    "autoupdate_bundle", default=None
+)
+"""
+The bundle of the current context. Contexts are copied into new tasks and, by
+sync_to_async and async_to_sync, into threads. Use contextvars.copy_context()
+to hand it to other threads.
+"""
+
+
 @contextmanager
 def autoupdate_bundle() -> Iterator[AutoupdateBundle]:
-    bundle = _autoupdate_bundle.get(threading.get_ident())
-    autodone = False
-    if bundle is None:
-        bundle = AutoupdateBundle()
-        autodone = True
+    """
+    Returns the bundle of the current context.
 
-    yield bundle
+    If there is none, a new bundle is used for the current context and released
+    with done(), when the outermost autoupdate_bundle() is left without an
+    exception. Nested calls join the outer bundle, so all their elements are
+    released together.
+    """
+    bundle = _autoupdate_bundle.get()
+    if bundle is not None:
+        yield bundle
+        return
+
+    bundle = AutoupdateBundle()
+    token = _autoupdate_bundle.set(bundle)
+    try:
+        yield bundle
+    finally:
+        _autoupdate_bundle.reset(token)
+    bundle.done()
+
+
+@asynccontextmanager
+async def async_autoupdate_bundle() -> AsyncIterator[AutoupdateBundle]:
+    """
+    Like autoupdate_bundle() for async code. A new bundle is released with
+    adone(), so no thread is blocked while the cache and stream are written.
+    """
+    bundle = _autoupdate_bundle.get()
+    if bundle is not None:
+        yield bundle
+        return
 
-    if autodone:
-        bundle.done()
+    bundle = AutoupdateBundle()
+    token = _autoupdate_bundle.set(bundle)
+    try:
+        yield bundle
+    finally:
+        _autoupdate_bundle.reset(token)
+    await bundle.adone()
 
 
-"""
-Global container for autoupdate bundles
-"""
-_autoupdate_bundle: Dict[int, AutoupdateBundle] = {}
+class AutoupdatePipeline:
+    """
+    Releases autoupdate bundles in a worker-local background thread instead of
+    during the request.
+
+    The request only reserves a change id and queues the bundle, after the
+    transaction was commited. The background thread coalesces all bundles, that
+    arrive within `delay` seconds, resolves the missing full_data for all of them
+    at once and writes the history, the cache and the stream in one batch. If the
+    batch fails, every bundle is processed on its own.
+
+    Bundles with history are still resolved by the request after the commit, so
+    their history contains the state of their own transaction and not the one of
+    a later bundle. So the serialization is only taken out of the request for
+    bundles without history.
+
+    The change id of the batch is at least the highest reserved change id of
+    the coalesced bundles, so a reserved change id can be given to the client
+    as a lower bound. It is dispatched even if no element is left to send.
+    """
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.queue: "queue.Queue[Optional[Tuple[int, AutoupdateBundle]]]" = (
+            queue.Queue()
+        )
+        self.worker: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def put(self, bundle: AutoupdateBundle) -> Optional[int]:
+        """
+        Reserves a change id and queues the bundle after the current transaction
+        was commited. Returns the reserved change id or None, if the bundle is
+        empty.
+        """
+        if not bundle.autoupdate_elements:
+            return None
+
+        change_id = async_to_sync(element_cache.reserve_change_id)()
+        transaction.on_commit(lambda: self._put(change_id, bundle))
+        return change_id
+
+    def _put(self, change_id: int, bundle: AutoupdateBundle) -> None:
+        if not bundle._disable_history:
+            # Later bundles of the batch must not change the history of this one.
+            bundle.resolve_full_data()
+        self.ensure_worker()
+        self.queue.put((change_id, bundle))
+
+    def ensure_worker(self) -> None:
+        """
+        Starts the background thread, if it is not running.
+        """
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name="autoupdate-pipeline", daemon=True
+                )
+                self.worker.start()
+
+    def run(self) -> None:
+        """
+        Processes batches of bundles until stop() is called.
+        """
+        while True:
+            items = [self.queue.get()]
+            # Collect all bundles arriving in the next moment.
+            time.sleep(self.delay)
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in items
+            bundles = [item for item in items if item is not None]
+            try:
+                self.process(bundles)
+            except Exception:
+                logger.exception("Error processing autoupdate bundles")
+                if len(bundles) > 1:
+                    self.process_separately(bundles)
+            finally:
+                close_old_connections()
+            if stop:
+                return
+
+    def process_separately(self, items: List[Tuple[int, AutoupdateBundle]]) -> None:
+        """
+        Processes every bundle on its own, so a failing bundle does not hold
+        back the others.
+        """
+        for change_id, bundle in items:
+            try:
+                self.process([(change_id, bundle)])
+            except Exception:
+                logger.exception(
+                    f"Error processing the autoupdate bundle of change id {change_id}"
+                )
+                try:
+                    # The client waits for the reserved change id.
+                    async_to_sync(AutoupdateBundle().dispatch_autoupdate)(change_id)
+                except Exception:
+                    logger.exception(f"Error dispatching the change id {change_id}")
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Processes all queued bundles and stops the background thread.
+        """
+        if self.worker is not None and self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join(timeout)
+
+    def process(self, items: List[Tuple[int, AutoupdateBundle]]) -> Optional[int]:
+        """
+        Coalesces the bundles into one bundle (the last element wins) and releases
+        it. The history gets one entry per element for every bundle with the
+        full_data of this bundle. The change id is dispatched even if no element
+        changed, so the clients get the reserved change id.
+
+        Returns the change id or None, if there were no bundles.
+        """
+        if not items:
+            return None
+
+        coalesced_bundle = AutoupdateBundle()
+        for _, bundle in items:
+            coalesced_bundle.add(bundle.element_iterator)
+        coalesced_bundle.resolve_full_data()
+        if skip_unchanged:
+            async_to_sync(coalesced_bundle.remove_unchanged_elements)()
+
+        history_elements: List[AutoupdateElement] = []
+        for _, bundle in items:
+            if bundle._disable_history:
+                continue
+            for element in bundle.element_iterator:
+                if element["id"] not in coalesced_bundle.autoupdate_elements.get(
+                    element["collection_string"], {}
+                ):
+                    # The element did not change.
+                    continue
+                history_elements.append(copy_element(element))
+        if history_elements:
+            save_history(history_elements)
+        for _, bundle in items:
+            # Do not write the history again, if the bundles are processed
+            # separately after an error.
+            bundle.disable_history()
+
+        reserved_change_id = max(change_id for change_id, _ in items)
+        return async_to_sync(coalesced_bundle.dispatch_autoupdate)(reserved_change_id)
+
+
+autoupdate_pipeline = AutoupdatePipeline(
+    getattr(settings, "AUTOUPDATE_PIPELINE_DELAY", 0.05)
+)
+
+
+class HistoryWriter:
+    """
+    Writes the history in a worker-local background thread instead of during
+    the request.
+
+    The elements are queued with the time of the change, after the transaction
+    was commited. The background thread writes all changes, that arrive within
+    `delay` seconds, in batches of up to `batch_size` elements in one transaction
+    each. The changes are written in the order they were queued. If a batch
+    fails, it is retried after `delay` seconds before any newer change is written.
+    After `max_attempts` failed attempts the batch is dropped and logged.
+
+    At most `max_size` changes are queued. If the queue is full, the requests
+    wait until the background thread has taken changes from it.
+
+    Queued changes are written on shutdown. They are lost, if the worker is
+    killed.
+    """
+
+    def __init__(
+        self,
+        delay: float = 1,
+        batch_size: int = 1000,
+        max_attempts: int = 3,
+        max_size: int = 10000,
+    ) -> None:
+        self.delay = delay
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_size = max_size
+        self.queue: "queue.Queue[Optional[Tuple[datetime, List[AutoupdateElement]]]]" = queue.Queue(
+            max_size
+        )
+        self.worker: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def put(self, elements: Iterable[AutoupdateElement]) -> None:
+        """
+        Queues the elements after the current transaction was commited.
+        """
+        # The full_data is changed for the cache before the change is written.
+        change = (now(), [copy_element(element) for element in elements])
+        transaction.on_commit(lambda: self._put(change))
+
+    def _put(self, change: Tuple[datetime, List[AutoupdateElement]]) -> None:
+        self.ensure_worker()
+        self.queue.put(change)
+
+    def ensure_worker(self) -> None:
+        """
+        Starts the background thread, if it is not running.
+        """
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name="history-writer", daemon=True
+                )
+                self.worker.start()
+
+    def run(self) -> None:
+        """
+        Writes batches of changes until stop() is called.
+        """
+        stop = False
+        attempts = 0
+        changes: List[Tuple[datetime, List[AutoupdateElement]]] = []
+        while not stop:
+            items: List[Optional[Tuple[datetime, List[AutoupdateElement]]]] = []
+            if not changes:
+                items.append(self.queue.get())
+                # Collect all changes arriving in the next moment.
+                time.sleep(self.delay)
+            # Do not hold more changes than the queue, while a batch fails.
+            while len(changes) + len(items) < self.max_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in items
+            changes.extend(item for item in items if item is not None)
+            while changes:
+                batch = self.get_batch(changes)
+                try:
+                    self.write(batch)
+                except Exception:
+                    attempts += 1
+                    logger.exception("Error writing the history")
+                    if stop:
+                        # Do not block the shutdown.
+                        self.drop(changes)
+                        return
+                    if attempts < self.max_attempts:
+                        time.sleep(self.delay)
+                        break
+                    self.drop(batch)
+                finally:
+                    close_old_connections()
+                attempts = 0
+                del changes[: len(batch)]
+
+    def drop(self, changes: List[Tuple[datetime, List[AutoupdateElement]]]) -> None:
+        """
+        Logs the elements of changes, whose history could not be written.
+        """
+        element_ids = [
+            get_element_id(element["collection_string"], element["id"])
+            for _, elements in changes
+            for element in elements
+        ]
+        logger.error(f"Dropped the history of the elements {element_ids}")
+
+    def get_batch(
+        self, changes: List[Tuple[datetime, List[AutoupdateElement]]]
+    ) -> List[Tuple[datetime, List[AutoupdateElement]]]:
+        """
+        Returns the first changes with up to batch_size elements. The first change
+        is always returned, even if it has more elements.
+        """
+        batch = changes[:1]
+        size = len(changes[0][1])
+        for change in changes[1:]:
+            size += len(change[1])
+            if size > self.batch_size:
+                break
+            batch.append(change)
+        return batch
+
+    def write(self, changes: List[Tuple[datetime, List[AutoupdateElement]]]) -> None:
+        from ..core.models import History
+
+        History.objects.add_changes(changes)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Writes all queued changes and stops the background thread.
+        """
+        if self.worker is not None and self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join(timeout)
+
+
+history_writer = HistoryWriter(
+    getattr(settings, "HISTORY_WRITER_DELAY", 1),
+    getattr(settings, "HISTORY_WRITER_BATCH_SIZE", 1000),
+    getattr(settings, "HISTORY_WRITER_MAX_ATTEMPTS", 3),
+    getattr(settings, "HISTORY_WRITER_QUEUE_SIZE", 10000),
+)
 
 
 class AutoupdateBundleMiddleware:
@@ -177,12 +673,15 @@ class AutoupdateBundleMiddleware:
         # One-time configuration and initialization.
 
     def __call__(self, request: Any) -> Any:
-        thread_id = threading.get_ident()
-        _autoupdate_bundle[thread_id] = AutoupdateBundle()
+        bundle = AutoupdateBundle()
+        token = _autoupdate_bundle.set(bundle)
 
         timing = Timing("request")
 
-        response = self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _autoupdate_bundle.reset(token)
 
         timing()
 
@@ -190,30 +689,56 @@ class AutoupdateBundleMiddleware:
         status_redirect = response.status_code >= 300 and response.status_code < 400
 
         # rewrite the response by adding the autoupdate on any success-case (2xx status)
-        bundle: AutoupdateBundle = _autoupdate_bundle.pop(thread_id)
         if status_ok or status_redirect:
-            change_id = bundle.done()
+            if use_autoupdate_pipeline:
+                change_id = autoupdate_pipeline.put(bundle)
+            else:
+                change_id = bundle.done()
 
             # inject the change id, if there was an autoupdate and the response status is
             # ok (and not redirect; redirects do not have a useful content)
-            if change_id is not None and status_ok:
+            if change_id is not None and status_ok and not response.streaming:
                 # Inject the autoupdate in the response.
                 # The complete response body will be overwritten!
-                content = {"change_id": change_id, "data": response.data}
-                # Note: autoupdate may be none on skipped ones (which should not happen
-                # since the user has made the request....)
-                response.content = json.dumps(content)
+                if response.get("Content-Type", "").startswith("application/json"):
+                    # The data is already rendered as json. It is wrapped
+                    # without rendering it again.
+                    response.content = b'{"change_id":%d,"data":%s}' % (
+                        change_id,
+                        response.content or b"null",
+                    )
+                else:
+                    content = {"change_id": change_id, "data": response.data}
+                    # Note: autoupdate may be none on skipped ones (which should not happen
+                    # since the user has made the request....)
+                    response.content = json.dumps(content)
 
         timing(True)
         return response
 
 
+def copy_element(element: AutoupdateElement) -> AutoupdateElement:
+    """
+    Returns a copy of the element with a copy of its full_data.
+    """
+    element = element.copy()
+    full_data = element.get("full_data")
+    if full_data is not None:
+        element["full_data"] = dict(full_data)
+    return element
+
+
 def save_history(elements: Iterable[AutoupdateElement]) -> Iterable:
     """
     Thin wrapper around the call of history saving manager method.
 
     This is separated to patch it during tests.
+
+    With HISTORY_WRITER the elements are written later by the history writer.
     """
     from ..core.models import History
 
+    if use_history_writer:
+        history_writer.put(elements)
+        return []
     return History.objects.add_elements(elements)
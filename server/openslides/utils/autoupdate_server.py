@@ -0,0 +1,308 @@
+import asyncio
+import json
+from importlib import import_module
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+
+from . import logging
+from .auth import async_anonymous_is_enabled
+from .autoupdate import get_autoupdate_data
+from .cache import element_cache
+from .redis import use_redis
+from .stream import decode_payload
+
+
+if use_redis:
+    from .redis import get_connection
+
+
+logger = logging.getLogger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+AUTOUPDATE_SERVER_MAX_CONNECTIONS = getattr(
+    settings, "AUTOUPDATE_SERVER_MAX_CONNECTIONS", 1000
+)
+AUTOUPDATE_SERVER_SEND_TIMEOUT = getattr(settings, "AUTOUPDATE_SERVER_SEND_TIMEOUT", 10)
+AUTOUPDATE_SERVER_LONG_POLL_TIMEOUT = getattr(
+    settings, "AUTOUPDATE_SERVER_LONG_POLL_TIMEOUT", 30
+)
+
+KEEPALIVE_INTERVAL = 25
+""" Seconds between two keepalive comments of a server-sent events connection. """
+
+POLL_INTERVAL = 0.1
+""" Seconds between two checks of the current change id, if redis is not used. """
+
+
+class ChangeIdNotifier:
+    """
+    Shares one reader of the autoupdate stream between all connections of a
+    worker.
+
+    The reader only keeps the highest change id of the stream. Connections wait
+    for a change id higher than the one they have sent last and then load the
+    autoupdate since it from the cache. So a slow connection does not buffer
+    autoupdates, it gets the changes of all missed ones at once.
+
+    Without redis, the current change id of the cache is polled.
+    """
+
+    def __init__(self) -> None:
+        self.change_id = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.reader: Optional["asyncio.Future[None]"] = None
+
+    def ensure_reader(self) -> None:
+        """
+        Starts the reader, if it is not running in the current event loop.
+        """
+        loop = asyncio.get_event_loop()
+        if self.loop is not loop or self.reader is None or self.reader.done():
+            self.loop = loop
+            self.ready = asyncio.Event()
+            self.changed = asyncio.Event()
+            self.reader = asyncio.ensure_future(self.read())
+
+    async def read(self) -> None:
+        while True:
+            try:
+                # The change id can be lower after the cache was rebuilt.
+                self.change_id = await element_cache.get_current_change_id()
+                self.ready.set()
+                if use_redis:
+                    await self.read_stream()
+                else:
+                    await self.poll_cache()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error reading the autoupdate stream")
+                await asyncio.sleep(1)
+
+    async def read_stream(self) -> None:
+        last_id = "$"
+        while True:
+            async with get_connection(read_only=True) as redis:
+                entries = await redis.xread(
+                    ["autoupdate"], timeout=1000, latest_ids=[last_id]
+                )
+            for _, entry_id, fields in entries:
+                last_id = entry_id
+                self.set_change_id(decode_payload(fields)["change_id"])
+
+    async def poll_cache(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            self.set_change_id(await element_cache.get_current_change_id())
+
+    def set_change_id(self, change_id: int) -> None:
+        if change_id > self.change_id:
+            self.change_id = change_id
+            # Wake up all waiting connections.
+            self.changed.set()
+            self.changed = asyncio.Event()
+
+    async def wait(self, change_id: int, timeout: float) -> int:
+        """
+        Waits until there is a change id higher than the given one or the timeout
+        is reached. Returns the current change id.
+        """
+        self.ensure_reader()
+        await self.ready.wait()
+        if self.change_id <= change_id:
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.change_id
+
+
+notifier = ChangeIdNotifier()
+connections = 0
+
+
+def get_user_id(session_key: Optional[str]) -> int:
+    """
+    Returns the id of the user of the session. 0 means anonymous user.
+    """
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(  # type: ignore
+        session_key
+    )
+    return get_user(request).pk or 0
+
+
+def get_header(scope: Scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key.lower() == name:
+            return value.decode("latin1")
+    return ""
+
+
+async def send_response(send: Send, status: int, content: Any) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": json.dumps(content).encode()})
+
+
+async def send_body(send: Send, body: bytes) -> None:
+    """
+    Sends a part of a streaming response. Raises asyncio.TimeoutError, if the
+    client does not read it within AUTOUPDATE_SERVER_SEND_TIMEOUT seconds.
+    """
+    await asyncio.wait_for(
+        send({"type": "http.response.body", "body": body, "more_body": True}),
+        AUTOUPDATE_SERVER_SEND_TIMEOUT,
+    )
+
+
+async def wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    """
+    ASGI application for the autoupdate and health endpoints.
+
+    GET /system/autoupdate?change_id=<change_id> sends all autoupdates since the
+    change id as one json object per line, as long as the client is connected. If
+    the client accepts text/event-stream, server-sent events are used. With the
+    query parameter single=1 (long-poll) only the next autoupdate is sent.
+    """
+    global connections
+
+    if scope["path"] == "/system/health":
+        await send_response(send, 200, {"healthy": True})
+        return
+    if scope["path"] != "/system/autoupdate" or scope["method"] != "GET":
+        await send_response(send, 404, {"detail": "Not found."})
+        return
+
+    query = parse_qs(scope["query_string"].decode())
+    try:
+        change_id = int(query.get("change_id", ["0"])[0])
+    except ValueError:
+        await send_response(send, 400, {"detail": "change_id has to be an integer."})
+        return
+
+    session_key = parse_cookie(get_header(scope, b"cookie")).get(
+        settings.SESSION_COOKIE_NAME
+    )
+    user_id = await sync_to_async(get_user_id)(session_key)  # type: ignore
+    if not user_id and not await async_anonymous_is_enabled():
+        await send_response(
+            send, 403, {"detail": "You do not have permission to perform this action."}
+        )
+        return
+
+    if connections >= AUTOUPDATE_SERVER_MAX_CONNECTIONS:
+        await send_response(send, 503, {"detail": "Too many connections."})
+        return
+
+    connections += 1
+    try:
+        if query.get("single") == ["1"]:
+            await long_poll(send, user_id, change_id)
+        else:
+            await stream_autoupdates(
+                receive,
+                send,
+                user_id,
+                change_id,
+                "text/event-stream" in get_header(scope, b"accept"),
+            )
+    finally:
+        connections -= 1
+
+
+async def long_poll(send: Send, user_id: int, change_id: int) -> None:
+    """
+    Sends the next autoupdate after change_id. If there is no autoupdate within
+    AUTOUPDATE_SERVER_LONG_POLL_TIMEOUT seconds, the status 204 is returned.
+    """
+    loop = asyncio.get_event_loop()
+    end = loop.time() + AUTOUPDATE_SERVER_LONG_POLL_TIMEOUT
+    seen_change_id = change_id
+    while change_id == 0 or loop.time() < end:
+        current_change_id = (
+            await notifier.wait(seen_change_id, end - loop.time()) if change_id else 1
+        )
+        if current_change_id > seen_change_id:
+            max_change_id, autoupdate = await get_autoupdate_data(change_id, user_id)
+            if autoupdate is not None:
+                await send_response(send, 200, autoupdate)
+                return
+            # There are only changes the user can not see.
+            seen_change_id = max(seen_change_id, max_change_id, current_change_id)
+            change_id = change_id or max_change_id
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def stream_autoupdates(
+    receive: Receive, send: Send, user_id: int, change_id: int, sse: bool
+) -> None:
+    """
+    Sends autoupdates until the client disconnects or does not read them in time.
+
+    Every autoupdate starts with the change id the last one ended with, even if
+    there were changes in between, which the user can not see.
+    """
+    headers: List[Tuple[bytes, bytes]] = [
+        (b"content-type", b"text/event-stream" if sse else b"application/x-ndjson"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    disconnected: "asyncio.Future[Any]" = asyncio.ensure_future(
+        wait_for_disconnect(receive)
+    )
+    seen_change_id = current_change_id = change_id
+    # The first autoupdate is sent without waiting for a change.
+    changed = True
+    try:
+        while True:
+            if changed:
+                max_change_id, autoupdate = await get_autoupdate_data(
+                    change_id, user_id
+                )
+                seen_change_id = max(seen_change_id, max_change_id, current_change_id)
+                if autoupdate is not None:
+                    content = json.dumps(autoupdate, separators=(",", ":"))
+                    body = f"data: {content}\n\n" if sse else f"{content}\n"
+                    await send_body(send, body.encode())
+                    change_id = max_change_id
+            elif sse:
+                await send_body(send, b": keepalive\n\n")
+
+            waiter: "asyncio.Future[Any]" = asyncio.ensure_future(
+                notifier.wait(seen_change_id, KEEPALIVE_INTERVAL)
+            )
+            await asyncio.wait(
+                [waiter, disconnected], return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected.done():
+                waiter.cancel()
+                return
+            current_change_id = waiter.result()
+            changed = current_change_id > seen_change_id
+    except asyncio.TimeoutError:
+        # The response is not completed, so the server closes the connection.
+        logger.info(f"Closing autoupdate connection of user {user_id}: too slow")
+    finally:
+        disconnected.cancel()
@@ -1,11 +1,14 @@
+import asyncio
 import json
 from collections import defaultdict
 from datetime import datetime
 from time import sleep
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
 
 from asgiref.sync import async_to_sync, sync_to_async
 from django.apps import apps
+from django.conf import settings
+from mypy_extensions import TypedDict
 
 from . import logging
 from .cache_providers import (
@@ -22,11 +25,50 @@ from .utils import get_element_id, split_element_id
 
 logger = logging.getLogger(__name__)
 
+AUTOUPDATE_SNAPSHOT_INTERVAL: Optional[int] = getattr(
+    settings, "AUTOUPDATE_SNAPSHOT_INTERVAL", None
+)
+AUTOUPDATE_SNAPSHOT_TTL = getattr(settings, "AUTOUPDATE_SNAPSHOT_TTL", 3600)
+
+SNAPSHOT_LOCK_TIMEOUT = 10
+""" Seconds to wait for another process, that creates the same snapshot. """
+
 
 class ChangeIdTooLowError(Exception):
     pass
 
 
+class ElementPatch(TypedDict):
+    """
+    Field-level changes of an element against its version at base_change_id.
+
+    changed contains all new or changed fields with the new value, removed the
+    names of all removed fields. A patch can only be applied to the element with
+    the base_change_id. Otherwise the full element has to be loaded.
+    """
+
+    base_change_id: int
+    changed: Dict[str, Any]
+    removed: List[str]
+
+
+def get_element_patch(
+    old_element: Dict[str, Any], new_element: Dict[str, Any], base_change_id: int
+) -> ElementPatch:
+    """
+    Returns the patch from the old to the new element.
+    """
+    return ElementPatch(
+        base_change_id=base_change_id,
+        changed={
+            key: value
+            for key, value in new_element.items()
+            if key not in old_element or old_element[key] != value
+        },
+        removed=[key for key in old_element.keys() if key not in new_element],
+    )
+
+
 def get_all_cachables() -> List[Cachable]:
     """
     Returns all element of OpenSlides.
@@ -206,7 +248,9 @@ class ElementCache:
         return change_id
 
     async def change_elements(
-        self, elements: Dict[str, Optional[Dict[str, Any]]]
+        self,
+        elements: Dict[str, Optional[Dict[str, Any]]],
+        reserved_change_id: int = 0,
     ) -> int:
         """
         Changes elements in the cache.
@@ -214,6 +258,9 @@ class ElementCache:
         elements is a dict with element_id <-> changed element. When the value is None,
         it is interpreded as deleted.
 
+        If a change id was reserved with reserve_change_id, the new change id is
+        at least the reserved one.
+
         Returns the new generated change_id.
         """
         # Split elements into changed and deleted.
@@ -228,8 +275,69 @@ class ElementCache:
                 deleted_elements.append(element_id)
 
         return await self.cache_provider.add_changed_elements(
-            changed_elements, deleted_elements
+            changed_elements, deleted_elements, reserved_change_id
+        )
+
+    async def get_unchanged_element_ids(
+        self, elements: Dict[str, Dict[str, Any]]
+    ) -> Set[str]:
+        """
+        Returns the ids of all given elements, which are the same in the cache.
+        """
+        cached_elements = await self.cache_provider.get_elements_with_change_ids(
+            list(elements.keys())
+        )
+        return set(
+            element_id
+            for element_id, (cached_element, _) in cached_elements.items()
+            if cached_element is not None
+            and json.loads(cached_element.decode()) == elements[element_id]
+        )
+
+    async def change_elements_with_patches(
+        self,
+        elements: Dict[str, Optional[Dict[str, Any]]],
+        reserved_change_id: int = 0,
+    ) -> Tuple[int, Dict[str, ElementPatch]]:
+        """
+        Like change_elements, but also returns the patches for all changed
+        elements against their previous version in the cache.
+
+        New and deleted elements do not have a patch. Also there is no patch, if it
+        would not be smaller than the element.
+        """
+        changed_element_ids = [
+            element_id for element_id, data in elements.items() if data
+        ]
+        old_elements = await self.cache_provider.get_elements_with_change_ids(
+            changed_element_ids
         )
+        change_id = await self.change_elements(elements, reserved_change_id)
+
+        patches: Dict[str, ElementPatch] = {}
+        for element_id in changed_element_ids:
+            old_element, base_change_id = old_elements[element_id]
+            if old_element is None:
+                continue
+            patch = get_element_patch(
+                json.loads(old_element.decode()),
+                elements[element_id],  # type: ignore
+                base_change_id,
+            )
+            if len(patch["changed"]) + len(patch["removed"]) < len(
+                elements[element_id]  # type: ignore
+            ):
+                patches[element_id] = patch
+        return change_id, patches
+
+    async def reserve_change_id(self) -> int:
+        """
+        Reserves a change id for changes, which are added to the cache later.
+
+        The returned change id is higher than the current one and all change ids
+        reserved before.
+        """
+        return await self.cache_provider.reserve_change_id()
 
     async def get_all_data_list(
         self, user_id: Optional[int] = None
@@ -253,6 +361,135 @@ class ElementCache:
         ) = await self.cache_provider.get_all_data_with_max_change_id()
         return max_change_id, await self.format_all_data(all_data, user_id)
 
+    async def get_all_data_list_with_snapshot(
+        self, user_id: int, permission_class: str
+    ) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Like get_all_data_list_with_max_change_id, but uses the snapshot of the
+        permission class of the user.
+
+        A snapshot contains the restricted data of all collections, whose
+        restriction only depends on the groups of the user. So only the changes
+        since the snapshot and the collections with user specific restrictions
+        have to be restricted for the user.
+
+        A new snapshot is created, if there is no usable snapshot or it is
+        AUTOUPDATE_SNAPSHOT_INTERVAL change ids old.
+        """
+        snapshot = await self.cache_provider.get_snapshot(permission_class)
+        current_change_id = await self.get_current_change_id()
+        if (
+            snapshot is not None
+            and AUTOUPDATE_SNAPSHOT_INTERVAL is not None
+            and current_change_id - snapshot[0] < AUTOUPDATE_SNAPSHOT_INTERVAL
+        ):
+            result = await self.apply_snapshot(user_id, *snapshot)
+            if result is not None:
+                return result
+
+        lock_name = f"snapshot_{permission_class}"
+        if await locking.set(lock_name):
+            try:
+                return await self.create_snapshot(user_id, permission_class)
+            finally:
+                await locking.delete(lock_name)
+
+        # Another process creates the snapshot. Wait for it instead of restricting
+        # all data for this user, too.
+        for _ in range(SNAPSHOT_LOCK_TIMEOUT * 100):
+            if not await locking.get(lock_name):
+                break
+            await asyncio.sleep(0.01)
+        snapshot = await self.cache_provider.get_snapshot(permission_class)
+        if snapshot is not None:
+            result = await self.apply_snapshot(user_id, *snapshot)
+            if result is not None:
+                return result
+        return await self.get_all_data_list_with_max_change_id(user_id)
+
+    async def create_snapshot(
+        self, user_id: int, permission_class: str
+    ) -> Tuple[int, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Creates the snapshot of the permission class with the data restricted
+        for the user. Returns the max change id and all data restricted for the
+        user.
+        """
+        (
+            max_change_id,
+            all_data_bytes,
+        ) = await self.cache_provider.get_all_data_with_max_change_id()
+        all_data = await self.format_all_data(all_data_bytes, None)
+        snapshot_data = {}
+        for collection, elements in all_data.items():
+            cachable = self.cachables[collection]
+            all_data[collection] = await cachable.restrict_elements(user_id, elements)
+            if not cachable.restriction_is_user_specific():
+                snapshot_data[collection] = all_data[collection]
+
+        await self.cache_provider.set_snapshot(
+            permission_class,
+            max_change_id,
+            json.dumps(snapshot_data),
+            AUTOUPDATE_SNAPSHOT_TTL,
+        )
+        return max_change_id, all_data
+
+    async def apply_snapshot(
+        self, user_id: int, snapshot_change_id: int, snapshot_bytes: bytes
+    ) -> Optional[Tuple[int, Dict[str, List[Dict[str, Any]]]]]:
+        """
+        Returns the max change id and all data restricted for the user from the
+        snapshot and the changes since it.
+
+        Returns None, if the snapshot can not be used.
+        """
+        try:
+            (
+                max_change_id,
+                changed_elements,
+                deleted_element_ids,
+            ) = await self.get_data_since(None, snapshot_change_id + 1)
+        except ChangeIdTooLowError:
+            # The cache was rebuilt after the snapshot was created.
+            return None
+        if "users/group" in changed_elements or any(
+            element_id.startswith("users/group:") for element_id in deleted_element_ids
+        ):
+            # The permissions of the snapshot could have changed.
+            return None
+
+        all_data: Dict[str, List[Dict[str, Any]]] = json.loads(snapshot_bytes.decode())
+
+        # Replace the changed and deleted elements of the snapshot.
+        removed_element_ids = set(deleted_element_ids)
+        for collection, elements in changed_elements.items():
+            removed_element_ids.update(
+                get_element_id(collection, element["id"]) for element in elements
+            )
+        for collection, elements in all_data.items():
+            all_data[collection] = [
+                element
+                for element in elements
+                if get_element_id(collection, element["id"]) not in removed_element_ids
+            ]
+        for collection, elements in changed_elements.items():
+            cachable = self.cachables[collection]
+            if not cachable.restriction_is_user_specific():
+                all_data.setdefault(collection, []).extend(
+                    await cachable.restrict_elements(user_id, elements)
+                )
+
+        # The collections with user specific restrictions are not in the snapshot.
+        for collection, cachable in self.cachables.items():
+            if cachable.restriction_is_user_specific():
+                collection_data = await self.get_collection_data(collection)
+                if collection_data:
+                    all_data[collection] = await cachable.restrict_elements(
+                        user_id, list(collection_data.values())
+                    )
+        return max_change_id, all_data
+
     async def format_all_data(
         self, all_data_bytes: Dict[bytes, bytes], user_id: Optional[int]
     ) -> Dict[str, List[Dict[str, Any]]]:
@@ -286,6 +523,26 @@ class ElementCache:
             )  # remove special field for get_data_since
         return collection_data
 
+    async def get_collection_ids(self, collection: str) -> List[int]:
+        """
+        Returns the sorted ids of all elements of one collection without decoding
+        the elements.
+        """
+        return sorted(await self.cache_provider.get_collection_data(collection))
+
+    async def get_collection_restricted_data(
+        self, collection: str, user_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns all elements of one collection restricted for the user.
+
+        In contrast to get_all_data_list only this collection is loaded from the
+        cache and restricted.
+        """
+        collection_data = await self.get_collection_data(collection)
+        restricter = self.cachables[collection].restrict_elements
+        return await restricter(user_id, list(collection_data.values()))
+
     async def get_element_data(
         self, collection: str, id: int, user_id: Optional[int] = None
     ) -> Optional[Dict[str, Any]]:
@@ -308,6 +565,32 @@ class ElementCache:
             element = await self.restrict_element_data(element, collection, user_id)
         return element
 
+    async def get_elements_data(
+        self, collection: str, ids: List[int], user_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the existing elements of the collection with the given ids.
+        If the user id is given the elements are restricted for this user in
+        one call.
+        """
+        encoded_elements = await self.cache_provider.get_elements_data(
+            [get_element_id(collection, id) for id in ids]
+        )
+        elements = []
+        for encoded_element in encoded_elements:
+            if encoded_element is None:
+                continue
+            element = json.loads(encoded_element.decode())
+            element.pop(
+                "_no_delete_on_restriction", False
+            )  # remove special field for get_data_since
+            elements.append(element)
+
+        if user_id is not None:
+            restricter = self.cachables[collection].restrict_elements
+            elements = await restricter(user_id, elements)
+        return elements
+
     async def restrict_element_data(
         self, element: Dict[str, Any], collection: str, user_id: int
     ) -> Optional[Dict[str, Any]]:
@@ -416,6 +699,16 @@ class ElementCache:
         """
         return await self.cache_provider.get_lowest_change_id()
 
+    async def get_collection_change_ids(self, collections: List[str]) -> Dict[str, int]:
+        """
+        Returns the change id of the last change of every given collection.
+
+        Collections, that were not changed since the cache was built, have the
+        lowest change id.
+        """
+        change_ids = await self.cache_provider.get_collection_change_ids(collections)
+        return dict(zip(collections, change_ids))
+
 
 def load_element_cache() -> ElementCache:
     """
@@ -1,5 +1,6 @@
 import functools
 import hashlib
+import time
 from collections import defaultdict
 from textwrap import dedent
 from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
@@ -65,11 +66,25 @@ class ElementCacheProvider(Protocol):
     async def get_element_data(self, element_id: str) -> Optional[bytes]:
         ...
 
+    async def get_elements_data(self, element_ids: List[str]) -> List[Optional[bytes]]:
+        ...
+
+    async def get_elements_with_change_ids(
+        self, element_ids: List[str]
+    ) -> Dict[str, Tuple[Optional[bytes], int]]:
+        ...
+
     async def add_changed_elements(
-        self, changed_elements: List[str], deleted_element_ids: List[str]
+        self,
+        changed_elements: List[str],
+        deleted_element_ids: List[str],
+        reserved_change_id: int = 0,
     ) -> int:
         ...
 
+    async def reserve_change_id(self) -> int:
+        ...
+
     async def get_data_since(
         self, change_id: int
     ) -> Tuple[int, Dict[str, List[bytes]], List[str]]:
@@ -81,6 +96,17 @@ class ElementCacheProvider(Protocol):
     async def get_lowest_change_id(self) -> int:
         ...
 
+    async def get_collection_change_ids(self, collections: List[str]) -> List[int]:
+        ...
+
+    async def set_snapshot(
+        self, permission_class: str, change_id: int, data: str, ttl: int
+    ) -> None:
+        ...
+
+    async def get_snapshot(self, permission_class: str) -> Optional[Tuple[int, bytes]]:
+        ...
+
     async def get_schema_version(self) -> Optional[SchemaVersion]:
         ...
 
@@ -125,8 +151,11 @@ class RedisCacheProvider:
 
     full_data_cache_key: str = "full_data"
     change_id_cache_key: str = "change_id"
+    reserved_change_id_cache_key: str = "reserved_change_id"
+    collection_change_id_cache_key: str = "collection_change_id"
     schema_cache_key: str = "schema"
     cache_ready_key: str = "cache_ready"
+    snapshot_cache_key_prefix: str = "snapshot:"
 
     # All lua-scripts used by this provider. Every entry is a Tuple (str, bool) with the
     # script and an ensure_cache-indicator. If the indicator is True, a short ensure_cache-script
@@ -163,7 +192,7 @@ class RedisCacheProvider:
             local cursor = 0
             local collection = {}
             repeat
-                local result = redis.call('HSCAN', KEYS[1], cursor, 'MATCH', ARGV[1])
+                local result = redis.call('HSCAN', KEYS[1], cursor, 'MATCH', ARGV[1], 'COUNT', 1000)
                 cursor = tonumber(result[1])
                 for _, v in pairs(result[2]) do
                     table.insert(collection, v)
@@ -174,22 +203,58 @@ class RedisCacheProvider:
             True,
         ),
         "get_element_data": ("return redis.call('hget', KEYS[1], ARGV[1])", True),
+        "get_elements_data": (
+            # KEYS[1]: full data cache key
+            # ARGV: element_ids
+            """
+            -- Use batches of 1000 values in unpack() (see #5386)
+            local result = {}
+            for i = 1, #ARGV, 1000 do
+                local elements = redis.call('hmget', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+                for _, element in ipairs(elements) do
+                    table.insert(result, element)
+                end
+            end
+            return result
+            """,
+            True,
+        ),
+        "get_elements_with_change_ids": (
+            # KEYS[1]: full data cache key
+            # KEYS[2]: change id cache key
+            # ARGV: element_ids
+            """
+            -- Elements, that were not changed since the cache was built, have the
+            -- lowest change id.
+            local lowest_change_id = redis.call('zscore', KEYS[2], '_config:lowest_change_id')
+            local result = {}
+            for _, element_id in ipairs(ARGV) do
+                table.insert(result, redis.call('hget', KEYS[1], element_id))
+                table.insert(result, redis.call('zscore', KEYS[2], element_id) or lowest_change_id)
+            end
+            return result
+            """,
+            True,
+        ),
         "add_changed_elements": (
             # KEYS[1]: full data cache key
             # KEYS[2]: change id cache key
+            # KEYS[3]: collection change id cache key
             # ARGV[1]: amount changed elements
             # ARGV[2]: amount deleted elements
-            # ARGV[3..(ARGV[1]+2)]: changed_elements (element_id, element, element_id, element, ...)
-            # ARGV[(3+ARGV[1])..(ARGV[1]+ARGV[2]+2)]: deleted_elements (element_id, element_id, ...)
+            # ARGV[3]: reserved change id (0, if no change id was reserved)
+            # ARGV[4..(ARGV[1]+3)]: changed_elements (element_id, element, element_id, element, ...)
+            # ARGV[(4+ARGV[1])..(ARGV[1]+ARGV[2]+3)]: deleted_elements (element_id, element_id, ...)
             """
-            -- Generate a new change_id
+            -- Generate a new change_id. It is at least the reserved change id, but
+            -- always higher than the current one.
             local tmp = redis.call('zrevrangebyscore', KEYS[2], '+inf', '-inf', 'WITHSCORES', 'LIMIT', 0, 1)
             local change_id
             if next(tmp) == nil then
                 -- The key does not exist
                 return redis.error_reply("cache_reset")
             else
-                change_id = tmp[2] + 1
+                change_id = math.max(tmp[2] + 1, tonumber(ARGV[3]))
             end
 
             local nc = tonumber(ARGV[1])
@@ -197,13 +262,14 @@ class RedisCacheProvider:
 
             local i, max, batch_counter
             local change_id_data -- change_id, element_id, change_id, element_id, ...
+            local collections = {} -- collection -> true
 
             -- Add changed_elements to the cache and sorted set using batches of 1000
             -- values in unpack() (see #5386)
             local elements -- element_id, element, element_id, element, ...
             if (nc > 0) then
-                i = 3
-                max = 3 + nc
+                i = 4
+                max = 4 + nc
                 while (i < max) do
                     change_id_data = {}
                     elements = {}
@@ -211,6 +277,7 @@ class RedisCacheProvider:
                     while (i < max and batch_counter <= 1000) do
                         change_id_data[batch_counter] = change_id
                         change_id_data[batch_counter + 1] = ARGV[i]
+                        collections[string.match(ARGV[i], '^[^:]*')] = true
                         elements[batch_counter] = ARGV[i]
                         elements[batch_counter + 1] = ARGV[i + 1]
                         batch_counter = batch_counter + 2
@@ -227,8 +294,8 @@ class RedisCacheProvider:
             local element_ids -- element_id, element_id, ...
             local element_ids_counter
             if (nd > 0) then
-                i = 3 + nc
-                max = 3 + nc + nd
+                i = 4 + nc
+                max = 4 + nc + nd
                 while (i < max) do
                     change_id_data = {}
                     element_ids = {}
@@ -237,6 +304,7 @@ class RedisCacheProvider:
                     while (i < max and batch_counter <= 1000) do
                         change_id_data[batch_counter] = change_id
                         change_id_data[batch_counter + 1] = ARGV[i]
+                        collections[string.match(ARGV[i], '^[^:]*')] = true
                         element_ids[element_ids_counter] = ARGV[i]
                         batch_counter = batch_counter + 2
                         element_ids_counter = element_ids_counter + 1
@@ -248,6 +316,62 @@ class RedisCacheProvider:
                     end
                 end
             end
+
+            -- A reserved change id without elements is saved anyway, so it becomes
+            -- the current change id.
+            if (nc == 0 and nd == 0 and tonumber(ARGV[3]) > 0) then
+                redis.call('zadd', KEYS[2], change_id, '_config:empty_change_id')
+            end
+
+            -- Save the change id as the last change of every changed collection
+            for collection, _ in pairs(collections) do
+                redis.call('hset', KEYS[3], collection, change_id)
+            end
+            return change_id
+            """,
+            True,
+        ),
+        "get_collection_change_ids": (
+            # KEYS[1]: full data cache key
+            # KEYS[2]: change id cache key
+            # KEYS[3]: collection change id cache key
+            # ARGV: collections
+            """
+            -- Collections, that were not changed since the cache was built, have
+            -- the lowest change id.
+            local lowest_change_id = redis.call('zscore', KEYS[2], '_config:lowest_change_id')
+            if not lowest_change_id then
+                return redis.error_reply("cache_reset")
+            end
+            local result = {}
+            for i, collection in ipairs(ARGV) do
+                result[i] = redis.call('hget', KEYS[3], collection) or lowest_change_id
+            end
+            return result
+            """,
+            True,
+        ),
+        "reserve_change_id": (
+            # KEYS[1]: full data cache key
+            # KEYS[2]: change id cache key
+            # KEYS[3]: reserved change id cache key
+            """
+            -- The reserved change id is higher than the current change id and all
+            -- change ids reserved before.
+            local tmp = redis.call('zrevrangebyscore', KEYS[2], '+inf', '-inf', 'WITHSCORES', 'LIMIT', 0, 1)
+            local change_id
+            if next(tmp) == nil then
+                -- The key does not exist
+                return redis.error_reply("cache_reset")
+            else
+                change_id = tmp[2] + 1
+            end
+
+            local reserved = tonumber(redis.call('get', KEYS[3]))
+            if reserved ~= nil and reserved >= change_id then
+                change_id = reserved + 1
+            end
+            redis.call('set', KEYS[3], change_id)
             return change_id
             """,
             True,
@@ -327,12 +451,18 @@ class RedisCacheProvider:
             tr = redis.multi_exec()
             tr.delete(self.cache_ready_key)
             tr.delete(self.change_id_cache_key)
+            tr.delete(self.reserved_change_id_cache_key)
+            tr.delete(self.collection_change_id_cache_key)
             tr.delete(self.full_data_cache_key)
             tr.hmset_dict(self.full_data_cache_key, data)
             tr.zadd(
                 self.change_id_cache_key, default_change_id, "_config:lowest_change_id"
             )
             await tr.execute()
+        # Snapshots of the old data must not be used with the new change ids.
+        await self.eval(
+            "clear_cache", keys=[], args=[f"{self.snapshot_cache_key_prefix}*"]
+        )
 
     async def add_to_full_data(self, data: Dict[str, str]) -> None:
         async with get_connection() as redis:
@@ -408,28 +538,92 @@ class RedisCacheProvider:
             "get_element_data", [self.full_data_cache_key], [element_id], read_only=True
         )
 
+    @ensure_cache_wrapper()
+    async def get_elements_data(self, element_ids: List[str]) -> List[Optional[bytes]]:
+        """
+        Returns the elements from the cache in the order of the element ids. Not
+        existing elements are None.
+        """
+        if not element_ids:
+            return []
+        elements = await self.eval(
+            "get_elements_data", [self.full_data_cache_key], element_ids, read_only=True
+        )
+        return [element or None for element in elements]
+
+    @ensure_cache_wrapper()
+    async def get_elements_with_change_ids(
+        self, element_ids: List[str]
+    ) -> Dict[str, Tuple[Optional[bytes], int]]:
+        """
+        Returns the elements and the change ids of their last change. The element is
+        None, if it does not exist.
+        """
+        if not element_ids:
+            return {}
+        response = await self.eval(
+            "get_elements_with_change_ids",
+            keys=[self.full_data_cache_key, self.change_id_cache_key],
+            args=element_ids,
+            read_only=True,
+        )
+        return {
+            element_id: (response[i * 2], int(response[i * 2 + 1]))
+            for i, element_id in enumerate(element_ids)
+        }
+
     @ensure_cache_wrapper()
     async def add_changed_elements(
-        self, changed_elements: List[str], deleted_element_ids: List[str]
+        self,
+        changed_elements: List[str],
+        deleted_element_ids: List[str],
+        reserved_change_id: int = 0,
     ) -> int:
         """
         Modified the full_data_cache to insert the changed_elements and removes the
         deleted_element_ids (in this order). Generates a new change_id and inserts all
         element_ids (changed and deleted) with the change_id into the change_id_cache.
         The newly generated change_id is returned.
+
+        If a reserved_change_id is given, the new change id is at least this value.
+        The change id is saved even if there are no elements, so the reserved change
+        id is reached.
         """
         return int(
             await self.eval(
                 "add_changed_elements",
-                keys=[self.full_data_cache_key, self.change_id_cache_key],
+                keys=[
+                    self.full_data_cache_key,
+                    self.change_id_cache_key,
+                    self.collection_change_id_cache_key,
+                ],
                 args=[
                     len(changed_elements),
                     len(deleted_element_ids),
+                    reserved_change_id,
                     *(changed_elements + deleted_element_ids),
                 ],
             )
         )
 
+    @ensure_cache_wrapper()
+    async def reserve_change_id(self) -> int:
+        """
+        Reserves a change id, which is higher than the current change id and all
+        change ids reserved before. Changes added with this reserved change id will
+        get this or a higher change id.
+        """
+        return int(
+            await self.eval(
+                "reserve_change_id",
+                keys=[
+                    self.full_data_cache_key,
+                    self.change_id_cache_key,
+                    self.reserved_change_id_cache_key,
+                ],
+            )
+        )
+
     @ensure_cache_wrapper()
     async def get_data_since(
         self, change_id: int
@@ -498,6 +692,53 @@ class RedisCacheProvider:
             raise CacheReset()
         return value
 
+    @ensure_cache_wrapper()
+    async def get_collection_change_ids(self, collections: List[str]) -> List[int]:
+        """
+        Returns the change id of the last change of every collection.
+        Collections, that were not changed since the cache was built, have the
+        lowest change id.
+        """
+        change_ids = await self.eval(
+            "get_collection_change_ids",
+            keys=[
+                self.full_data_cache_key,
+                self.change_id_cache_key,
+                self.collection_change_id_cache_key,
+            ],
+            args=collections,
+            read_only=True,
+        )
+        return [int(float(change_id)) for change_id in change_ids]
+
+    async def set_snapshot(
+        self, permission_class: str, change_id: int, data: str, ttl: int
+    ) -> None:
+        """
+        Saves the snapshot of the permission class with the change id. It expires
+        after ttl seconds. An older snapshot of the permission class is replaced.
+        """
+        key = f"{self.snapshot_cache_key_prefix}{permission_class}"
+        async with get_connection() as redis:
+            tr = redis.multi_exec()
+            tr.delete(key)
+            tr.hmset_dict(key, {"change_id": change_id, "data": data})
+            tr.expire(key, ttl)
+            await tr.execute()
+
+    async def get_snapshot(self, permission_class: str) -> Optional[Tuple[int, bytes]]:
+        """
+        Returns the change id and the data of the snapshot of the permission class
+        or None, if there is no snapshot.
+        """
+        async with get_connection(read_only=True) as redis:
+            snapshot = await redis.hgetall(
+                f"{self.snapshot_cache_key_prefix}{permission_class}"
+            )
+        if not snapshot:
+            return None
+        return int(snapshot[b"change_id"]), snapshot[b"data"]
+
     async def get_schema_version(self) -> Optional[SchemaVersion]:
         """ Retrieves the schema version of the cache or None, if not existent """
         async with get_connection(read_only=True) as redis:
@@ -590,6 +831,9 @@ class MemoryCacheProvider:
         self.change_id_data: Dict[int, Set[str]] = {}
         self.locks: Dict[str, str] = {}
         self.default_change_id: int = -1
+        self.reserved_change_id: int = -1
+        self.collection_change_ids: Dict[str, int] = {}
+        self.snapshots: Dict[str, Tuple[int, str, float]] = {}
 
     async def ensure_cache(self) -> None:
         pass
@@ -604,6 +848,9 @@ class MemoryCacheProvider:
         self.change_id_data = {}
         self.full_data = data
         self.default_change_id = default_change_id
+        self.reserved_change_id = -1
+        self.collection_change_ids = {}
+        self.snapshots = {}
 
     async def add_to_full_data(self, data: Dict[str, str]) -> None:
         self.full_data.update(data)
@@ -636,10 +883,30 @@ class MemoryCacheProvider:
         value = self.full_data.get(element_id, None)
         return value.encode() if value is not None else None
 
+    async def get_elements_data(self, element_ids: List[str]) -> List[Optional[bytes]]:
+        return [await self.get_element_data(element_id) for element_id in element_ids]
+
+    async def get_elements_with_change_ids(
+        self, element_ids: List[str]
+    ) -> Dict[str, Tuple[Optional[bytes], int]]:
+        lowest_change_id = await self.get_lowest_change_id()
+        change_ids = {element_id: lowest_change_id for element_id in element_ids}
+        for change_id, changed_element_ids in self.change_id_data.items():
+            for element_id in changed_element_ids:
+                if element_id in change_ids and change_id > change_ids[element_id]:
+                    change_ids[element_id] = change_id
+        return {
+            element_id: (await self.get_element_data(element_id), change_id)
+            for element_id, change_id in change_ids.items()
+        }
+
     async def add_changed_elements(
-        self, changed_elements: List[str], deleted_element_ids: List[str]
+        self,
+        changed_elements: List[str],
+        deleted_element_ids: List[str],
+        reserved_change_id: int = 0,
     ) -> int:
-        change_id = await self.get_current_change_id() + 1
+        change_id = max(await self.get_current_change_id() + 1, reserved_change_id)
 
         for i in range(0, len(changed_elements), 2):
             element_id = changed_elements[i]
@@ -660,6 +927,20 @@ class MemoryCacheProvider:
             else:
                 self.change_id_data[change_id] = {element_id}
 
+        if not changed_elements and not deleted_element_ids and reserved_change_id:
+            self.change_id_data.setdefault(change_id, set())
+
+        for element_id in changed_elements[::2] + deleted_element_ids:
+            collection, _ = split_element_id(element_id)
+            self.collection_change_ids[collection] = change_id
+
+        return change_id
+
+    async def reserve_change_id(self) -> int:
+        change_id = max(
+            await self.get_current_change_id() + 1, self.reserved_change_id + 1
+        )
+        self.reserved_change_id = change_id
         return change_id
 
     async def get_data_since(
@@ -692,6 +973,23 @@ class MemoryCacheProvider:
     async def get_lowest_change_id(self) -> int:
         return self.default_change_id
 
+    async def get_collection_change_ids(self, collections: List[str]) -> List[int]:
+        return [
+            self.collection_change_ids.get(collection, self.default_change_id)
+            for collection in collections
+        ]
+
+    async def set_snapshot(
+        self, permission_class: str, change_id: int, data: str, ttl: int
+    ) -> None:
+        self.snapshots[permission_class] = (change_id, data, time.time() + ttl)
+
+    async def get_snapshot(self, permission_class: str) -> Optional[Tuple[int, bytes]]:
+        snapshot = self.snapshots.get(permission_class)
+        if snapshot is None or snapshot[2] < time.time():
+            return None
+        return snapshot[0], snapshot[1].encode()
+
     async def get_schema_version(self) -> Optional[SchemaVersion]:
         return None
 
@@ -718,6 +1016,12 @@ class Cachable(Protocol):
         Returns all elements of the cachable.
         """
 
+    def restriction_is_user_specific(self) -> bool:
+        """
+        Returns True, if the restricted data depends on the user and not only on
+        the groups of the user.
+        """
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
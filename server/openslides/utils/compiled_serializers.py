@@ -0,0 +1,124 @@
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
+from rest_framework.fields import SkipField, get_attribute
+from rest_framework.relations import PKOnlyObject
+from rest_framework.serializers import Serializer
+
+from .rest_api import IdManyRelatedField, IdPrimaryKeyRelatedField
+
+
+FullDataFunction = Callable[[Model], Dict[str, Any]]
+FieldGetter = Callable[[Model], Any]
+
+compiled_serializers: Dict[Type[Serializer], FullDataFunction] = {}
+
+
+def get_compiled_serializer(serializer_class: Type[Serializer]) -> FullDataFunction:
+    """
+    Returns the compiled serializer function for a serializer class.
+
+    The serializer class is compiled only once.
+    """
+    try:
+        return compiled_serializers[serializer_class]
+    except KeyError:
+        compiled_serializers[serializer_class] = compile_serializer(serializer_class)
+        return compiled_serializers[serializer_class]
+
+
+def compile_serializer(serializer_class: Type[Serializer]) -> FullDataFunction:
+    """
+    Returns a function, that returns the same data as serializer_class(instance).data.
+
+    The serializer and its fields are created only once. Related fields are
+    read from the foreign key attributes and the (maybe prefetched) related
+    managers without calling the fields. All other fields are represented like
+    Django REST framework does it.
+
+    Serializers with an own to_representation method can not be compiled. In
+    this case, the returned function uses the serializer.
+    """
+    if serializer_class.to_representation is not Serializer.to_representation:
+        return lambda instance: serializer_class(instance).data
+
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    getters: List[Tuple[str, FieldGetter]] = [
+        (field.field_name, get_field_getter(model, field))
+        for field in serializer._readable_fields
+    ]
+
+    def full_data(instance: Model) -> Dict[str, Any]:
+        data = {}
+        for field_name, getter in getters:
+            try:
+                data[field_name] = getter(instance)
+            except SkipField:
+                pass
+        return data
+
+    return full_data
+
+
+def get_field_getter(model: Type[Model], field: Any) -> FieldGetter:
+    """
+    Returns a function, that returns the representation of a field of an instance.
+    """
+    if isinstance(field, IdPrimaryKeyRelatedField) and field.pk_field is None:
+        attname = get_foreign_key_attname(model, field.source_attrs)
+        if attname is not None:
+            return attrgetter(attname)
+
+    elif (
+        isinstance(field, IdManyRelatedField)
+        and isinstance(field.child_relation, IdPrimaryKeyRelatedField)
+        and field.child_relation.pk_field is None
+    ):
+        source_attrs = field.source_attrs
+
+        def get_related_ids(instance: Model) -> Optional[List[Any]]:
+            if instance.pk is None:
+                return []
+            related = get_attribute(instance, source_attrs)
+            if hasattr(related, "all"):
+                related = related.all()
+            if related is None:
+                return None
+            return [related_instance.pk for related_instance in related]
+
+        return get_related_ids
+
+    def get_representation(instance: Model) -> Any:
+        attribute = field.get_attribute(instance)
+        check_for_none = (
+            attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        )
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+
+    return get_representation
+
+
+def get_foreign_key_attname(
+    model: Type[Model], source_attrs: List[str]
+) -> Optional[str]:
+    """
+    Returns the name of the attribute, that holds the id of a foreign key.
+
+    Returns None, if the source is not a foreign key of the model.
+    """
+    if len(source_attrs) != 1:
+        return None
+    try:
+        model_field = model._meta.get_field(source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+    if not model_field.many_to_one and not model_field.one_to_one:
+        return None
+    if model_field.auto_created or not model_field.concrete:
+        return None
+    return model_field.attname
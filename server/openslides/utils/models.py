@@ -1,19 +1,88 @@
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Type
 
+from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ImproperlyConfigured
 from django.db import models
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
 
 from . import logging
 from .access_permissions import BaseAccessPermissions
 from .auth import UserDoesNotExist
 from .autoupdate import AutoupdateElement, inform_changed_data, inform_elements
+from .compiled_serializers import get_compiled_serializer
 from .rest_api import model_serializer_classes
 from .utils import convert_camel_case_to_pseudo_snake_case, get_element_id
 
 
 logger = logging.getLogger(__name__)
 
+COMPILED_SERIALIZERS = getattr(settings, "COMPILED_SERIALIZERS", False)
+
+KnownInstances = Dict[Type[models.Model], Dict[int, models.Model]]
+
+
+def get_related_key(
+    instance: models.Model, descriptor: Any
+) -> Optional[Tuple[Type[models.Model], Any]]:
+    """
+    Returns the model and the pk of the related object of a foreign key or a
+    generic foreign key without loading it. Returns None, if there is no related
+    object.
+    """
+    if isinstance(descriptor, GenericForeignKey):
+        content_type_id = getattr(instance, descriptor.ct_field + "_id")
+        object_id = getattr(instance, descriptor.fk_field)
+        if content_type_id is None or object_id is None:
+            return None
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        return (model, model._meta.pk.to_python(object_id))
+    related_id = getattr(instance, descriptor.field.attname)
+    if related_id is None:
+        return None
+    return (descriptor.field.remote_field.model, related_id)
+
+
+def prefetch_related_with_known_instances(
+    instances: List[models.Model], lookups: Any, known_instances: KnownInstances
+) -> None:
+    """
+    Like prefetch_related_objects, but the related objects of simple lookups of
+    (generic) foreign keys are taken from known_instances, if they are there. Only
+    the missing related objects are loaded from the database.
+    """
+    remaining_lookups = []
+    for lookup in lookups:
+        descriptor = (
+            getattr(type(instances[0]), lookup, None)
+            if instances and isinstance(lookup, str) and "__" not in lookup
+            else None
+        )
+        if isinstance(descriptor, GenericForeignKey):
+            cache = descriptor
+        elif isinstance(descriptor, ForwardManyToOneDescriptor):
+            cache = descriptor.field
+        else:
+            remaining_lookups.append(lookup)
+            continue
+
+        missing = []
+        for instance in instances:
+            key = get_related_key(instance, descriptor)
+            if key is None:
+                # There is no related object, so nothing has to be loaded.
+                continue
+            related_instance = known_instances.get(key[0], {}).get(key[1])
+            if related_instance is None:
+                missing.append(instance)
+            else:
+                cache.set_cached_value(instance, related_instance)
+        if missing:
+            models.prefetch_related_objects(missing, lookup)
+    models.prefetch_related_objects(instances, *remaining_lookups)
+
 
 class MinMaxIntegerField(models.IntegerField):
     """
@@ -145,14 +214,17 @@ class RESTModelMixin:
         return return_value
 
     @classmethod
-    def get_elements(cls, ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
-        """
-        Returns all elements as full_data.
+    def get_instances(
+        cls,
+        ids: Optional[List[int]] = None,
+        known_instances: Optional[KnownInstances] = None,
+    ) -> List[models.Model]:
         """
-        do_logging = not bool(ids)
+        Returns all instances with all prefetched related objects.
 
-        if do_logging:
-            logger.info(f"Loading {cls.get_collection_string()}")
+        Related objects of (generic) foreign keys, which are in known_instances, are
+        not loaded again.
+        """
         # Get the query to receive all data from the database.
         try:
             query = cls.objects.get_prefetched_queryset(ids=ids)  # type: ignore
@@ -163,13 +235,30 @@ class RESTModelMixin:
             if ids:
                 query = query.filter(pk__in=ids)
 
+        if not known_instances:
+            return list(query.all())
+        lookups = query.all()._prefetch_related_lookups
+        instances = list(query.prefetch_related(None))
+        prefetch_related_with_known_instances(instances, lookups, known_instances)
+        return instances
+
+    @classmethod
+    def get_elements(cls, ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns all elements as full_data.
+        """
+        do_logging = not bool(ids)
+
+        if do_logging:
+            logger.info(f"Loading {cls.get_collection_string()}")
+
         # Build a dict from the instance id to the full_data
-        instances = query.all()
+        instances = cls.get_instances(ids)
         full_data = []
 
         # For logging the progress
         last_time = time.time()
-        instances_length = len(instances)  # this evaluates the query
+        instances_length = len(instances)
 
         for i, instance in enumerate(instances):
             # Append full data from this instance
@@ -183,6 +272,14 @@ class RESTModelMixin:
 
         return full_data
 
+    @classmethod
+    def restriction_is_user_specific(cls) -> bool:
+        """
+        Returns True, if the restricted data depends on the user and not only on
+        the groups of the user.
+        """
+        return cls.personalized_model or cls.get_access_permissions().user_specific
+
     @classmethod
     async def restrict_elements(
         cls, user_id: int, elements: List[Dict[str, Any]]
@@ -200,6 +297,9 @@ class RESTModelMixin:
     def get_full_data(self) -> Dict[str, Any]:
         """
         Returns the full_data of the instance.
+
+        If the setting COMPILED_SERIALIZERS is True, the compiled serializer
+        is used.
         """
         try:
             serializer_class = model_serializer_classes[type(self)]
@@ -210,6 +310,8 @@ class RESTModelMixin:
             module_name = type(self).__module__.rsplit(".", 1)[0] + ".serializers"
             __import__(module_name)
             serializer_class = model_serializer_classes[type(self)]
+        if COMPILED_SERIALIZERS:
+            return get_compiled_serializer(serializer_class)(self)
         return serializer_class(self).data
 
 
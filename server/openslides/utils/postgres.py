@@ -1,4 +1,9 @@
+import io
+import zlib
+from typing import Any, Iterable, List, Type
+
 from django.db import connection
+from django.db.models import Model
 
 
 def is_postgres() -> bool:
@@ -19,3 +24,78 @@ def restart_id_sequence(table_name: str) -> None:
         max_id = cursor.fetchone()[0]
         if max_id is not None:
             cursor.execute(f"ALTER SEQUENCE {table_name}_id_seq RESTART WITH {max_id};")
+
+
+def lock_transaction(name: str) -> None:
+    """
+    Takes the lock with the given name. It is held until the end of the current
+    transaction. Other transactions, that take the same lock, wait until then.
+    Inside of an outer transaction (e. g. ATOMIC_REQUESTS or a view with
+    transaction.atomic) this is the end of the outer transaction, not of the
+    inner atomic block.
+
+    Does nothing, if the database is not Postgresql.
+    """
+    if not is_postgres():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s);", [zlib.crc32(name.encode())])
+
+
+def get_next_ids(table_name: str, amount: int) -> List[int]:
+    """
+    Takes the given amount of ids from the id sequence of the table. Rows with
+    these ids can be inserted manually without restarting the sequence.
+    """
+    if not amount:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT nextval('{table_name}_id_seq') FROM generate_series(1, %s);",
+            [amount],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def copy_rows(table_name: str, columns: List[str], rows: Iterable[List[Any]]) -> None:
+    """
+    Inserts the rows into the table with COPY, which is much faster than INSERT
+    for many rows. The values have to be prepared for the database. None is
+    saved as NULL.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        # All values are quoted. Only an unquoted empty value is read as NULL.
+        buffer.write(
+            ",".join(
+                "" if value is None else '"' + str(value).replace('"', '""') + '"'
+                for value in row
+            )
+        )
+        buffer.write("\n")
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv);",
+            buffer,
+        )
+
+
+def copy_instances(model: Type[Model], instances: List[Model]) -> None:
+    """
+    Inserts the model instances with COPY. All fields including the id have to
+    be set.
+    """
+    fields = model._meta.concrete_fields
+    copy_rows(
+        model._meta.db_table,
+        [connection.ops.quote_name(field.column) for field in fields],
+        (
+            [
+                field.get_db_prep_save(getattr(instance, field.attname), connection)
+                for field in fields
+            ]
+            for instance in instances
+        ),
+    )
@@ -0,0 +1,42 @@
+from typing import Any, Dict, Optional
+
+from rest_framework.renderers import JSONRenderer as _JSONRenderer
+
+
+use_orjson = False
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    use_orjson = True
+
+
+class JSONRenderer(_JSONRenderer):
+    """
+    Renderer for all json responses of the REST api.
+
+    If orjson is installed, compact responses are rendered with it. Values,
+    which orjson does not support, and datetimes are converted like in Django
+    REST framework. Indented responses and all responses without orjson are
+    rendered by Django REST framework.
+    """
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        if not use_orjson or self.get_indent(
+            accepted_media_type or "", renderer_context or {}
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,  # type: ignore
+        )
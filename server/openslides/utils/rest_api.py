@@ -1,9 +1,18 @@
+import json
 from collections import OrderedDict
-from typing import Any, Dict, Iterable, Optional, Type
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
 
 from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.db.models import Model
-from django.http import Http404
+from django.http import (
+    Http404,
+    HttpResponseNotModified,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from django.http.response import HttpResponseBase
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.decorators import detail_route, list_route
 from rest_framework.exceptions import APIException
@@ -46,7 +55,12 @@ from rest_framework.viewsets import (
 )
 
 from . import logging
-from .access_permissions import BaseAccessPermissions
+from .access_permissions import BaseAccessPermissions, required_user
+from .auth import (
+    async_get_permission_class,
+    group_collection_string,
+    user_collection_string,
+)
 from .cache import element_cache
 
 
@@ -75,6 +89,8 @@ __all__ = [
 router = DefaultRouter()
 error_logger = logging.getLogger("openslides.requests.errors")
 
+REST_LIST_STREAMING_THRESHOLD = getattr(settings, "REST_LIST_STREAMING_THRESHOLD", 1000)
+
 
 class IdManyRelatedField(ManyRelatedField):
     """
@@ -185,6 +201,7 @@ class PermissionMixin:
         get access to your view.
 
         Don't forget to use access permissions container for list and retrieve
+        requests. Bulk retrieve requests need the same permissions as retrieve
         requests.
         """
         return False
@@ -265,12 +282,75 @@ class ModelSerializer(_ModelSerializer, metaclass=ModelSerializerRegisterer):
         return fields
 
 
+async def async_get_etag(
+    collection_string: str, user_id: int, id: Optional[int] = None
+) -> str:
+    """
+    Returns the ETag of the restricted data of a collection for the user. If an
+    id is given, it is the ETag of this element.
+
+    It consists of the change ids of the last changes of the collection, the
+    groups and the config and the permission class of the user. If the
+    restriction depends on the user, the user id and the change id of the users
+    are added. The restricted users depend on all elements that require users.
+    """
+    from ..core.config import config
+
+    collections = {
+        collection_string,
+        group_collection_string,
+        config.get_collection_string(),
+    }
+    fingerprint = await async_get_permission_class(user_id)
+    if element_cache.cachables[collection_string].restriction_is_user_specific():
+        collections.add(user_collection_string)
+        fingerprint += f":{user_id}"
+    if collection_string == user_collection_string:
+        collections.update(required_user.get_collection_strings())
+    if id is not None:
+        fingerprint += f":{collection_string}:{id}"
+    change_ids = await element_cache.get_collection_change_ids(sorted(collections))
+    return f'"{"-".join(map(str, change_ids.values()))}-{fingerprint}"'
+
+
+def is_not_modified(request: Any, etag: str) -> bool:
+    """
+    Returns True, if the If-None-Match header of the request matches the ETag.
+    """
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is None:
+        return False
+    etags = parse_etags(if_none_match)
+    return "*" in etags or etag in etags
+
+
 class ListModelMixin(_ListModelMixin):
     """
     Mixin to add the caching system to list requests.
+
+    The restricted elements can be filtered with query parameters:
+    <field>=<value>: Only elements, where the field has the value.
+    <field>__in=<value>,<value>: Only elements, where the field has one of the
+        values.
+    fields=<field>,<field>: Return only these fields (and the id).
+    limit: Return at most this amount of elements ordered by id. The response
+        is {"results": [...], "next_cursor": <id>}. next_cursor is None on the
+        last page.
+    cursor: The next_cursor of the previous page.
+
+    Values match as string and as json (e. g. 1, true or null). Numbers do not
+    match booleans. Parameters, that are no fields of the collection (e. g. a
+    cache buster), are ignored.
+
+    Responses with more than REST_LIST_STREAMING_THRESHOLD elements are streamed.
+
+    The responses have an ETag. Requests with a matching If-None-Match header
+    get a 304 response without loading the collection.
     """
 
-    def list(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+    list_reserved_query_params = ("fields", "limit", "cursor", "format")
+
+    def list(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponseBase:
         model = self.get_queryset().model
         try:
             collection_string = model.get_collection_string()
@@ -278,23 +358,152 @@ class ListModelMixin(_ListModelMixin):
             # The corresponding queryset does not support caching.
             response = super().list(request, *args, **kwargs)
         else:
-            # TODO
-            # This loads all data from the cache, not only the requested data.
-            # If we would use the rest api, we should add a method
-            # element_cache.get_collection_restricted_data
-            all_restricted_data = async_to_sync(element_cache.get_all_data_list)(
-                request.user.pk or 0
-            )
-            response = Response(all_restricted_data.get(collection_string, []))
+            user_id = request.user.pk or 0
+            # The ETag is read before the data, so it is never newer than the data.
+            etag = async_to_sync(async_get_etag)(collection_string, user_id)
+            if is_not_modified(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                restricted_data = async_to_sync(
+                    element_cache.get_collection_restricted_data
+                )(collection_string, user_id)
+                response = self.get_list_response(restricted_data, request.query_params)
+            response["ETag"] = etag
         return response
 
+    def get_list_response(
+        self, elements: List[Dict[str, Any]], query_params: Dict[str, str]
+    ) -> HttpResponseBase:
+        """
+        Applies the query parameters to the restricted elements.
+        """
+        try:
+            filters = self.get_list_filters(query_params)
+            limit = int(query_params["limit"]) if "limit" in query_params else None
+            cursor = int(query_params.get("cursor", 0))
+        except ValueError:
+            raise ValidationError({"detail": "limit and cursor must be integers."})
+        if limit is not None and limit < 1:
+            raise ValidationError({"detail": "limit must be positive."})
+
+        if filters:
+            elements = [
+                element
+                for element in elements
+                if all(
+                    field in element and self.match_query_values(element[field], values)
+                    for field, values in filters
+                )
+            ]
+
+        next_cursor = None
+        if limit is not None:
+            elements = sorted(
+                (element for element in elements if element["id"] > cursor),
+                key=lambda element: element["id"],
+            )
+            if len(elements) > limit:
+                elements = elements[:limit]
+                next_cursor = elements[-1]["id"]
+
+        fields = query_params.get("fields")
+        if fields:
+            field_names = set(fields.split(",")) | {"id"}
+            elements = [
+                {key: value for key, value in element.items() if key in field_names}
+                for element in elements
+            ]
+
+        if len(elements) > REST_LIST_STREAMING_THRESHOLD:
+            return StreamingHttpResponse(
+                self.stream_list(elements, limit is not None, next_cursor),
+                content_type="application/json",
+            )
+        if limit is not None:
+            return Response({"results": elements, "next_cursor": next_cursor})
+        return Response(elements)
+
+    def get_list_filters(
+        self, query_params: Dict[str, str]
+    ) -> List[Tuple[str, List[Any]]]:
+        """
+        Returns the field and the allowed values of every filter. Parameters for
+        unknown fields are ignored.
+        """
+        field_names = self.get_serializer().fields.keys()
+        filters = []
+        for key, value in query_params.items():
+            if key in self.list_reserved_query_params:
+                continue
+            if key.endswith("__in"):
+                field, items = key[: -len("__in")], value.split(",")
+            else:
+                field, items = key, [value]
+            if field not in field_names:
+                continue
+            values = []
+            for item in items:
+                values.extend(self.parse_query_value(item))
+            filters.append((field, values))
+        return filters
+
+    def parse_query_value(self, value: str) -> List[Any]:
+        """
+        Returns the value as string and, if possible, as parsed json, so 42
+        matches the number and the string.
+        """
+        try:
+            return [value, json.loads(value)]
+        except ValueError:
+            return [value]
+
+    def match_query_values(self, value: Any, values: List[Any]) -> bool:
+        """
+        Returns True, if the value is one of the values. Booleans only match
+        booleans, so 1 does not match True.
+        """
+        return any(
+            value == item and isinstance(value, bool) == isinstance(item, bool)
+            for item in values
+        )
+
+    def stream_list(
+        self,
+        elements: List[Dict[str, Any]],
+        paginated: bool,
+        next_cursor: Optional[int],
+        chunk_size: int = 100,
+    ) -> Iterator[str]:
+        """
+        Yields the json response in chunks of elements, so the response is never
+        built as one string.
+        """
+        if paginated:
+            yield '{"results":'
+        yield "["
+        for index in range(0, len(elements), chunk_size):
+            if index:
+                yield ","
+            yield ",".join(
+                json.dumps(element)
+                for element in elements[index : index + chunk_size]  # noqa: E203
+            )
+        yield "]"
+        if paginated:
+            yield f',"next_cursor":{json.dumps(next_cursor)}}}'
+
 
 class RetrieveModelMixin(_RetrieveModelMixin):
     """
     Mixin to add the caching system to retrieve requests.
+
+    The responses have an ETag like list requests, that also contains the id
+    of the element.
+
+    Many elements can be retrieved at once with the bulk_retrieve route.
     """
 
-    def retrieve(self, request: Any, *args: Any, **kwargs: Any) -> Response:
+    def retrieve(self, request: Any, *args: Any, **kwargs: Any) -> HttpResponseBase:
         model = self.get_queryset().model
         try:
             collection_string = model.get_collection_string()
@@ -303,15 +512,70 @@ class RetrieveModelMixin(_RetrieveModelMixin):
             response = super().retrieve(request, *args, **kwargs)
         else:
             lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
-            user_id = request.user.pk or 0
-            content = async_to_sync(element_cache.get_element_data)(
-                collection_string, self.kwargs[lookup_url_kwarg], user_id
-            )
-            if content is None:
+            try:
+                id = int(self.kwargs[lookup_url_kwarg])
+            except ValueError:
                 raise Http404
-            response = Response(content)
+            user_id = request.user.pk or 0
+            etag = async_to_sync(async_get_etag)(collection_string, user_id, id)
+            if is_not_modified(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                content = async_to_sync(element_cache.get_element_data)(
+                    collection_string, id, user_id
+                )
+                if content is None:
+                    raise Http404
+                response = Response(content)
+            response["ETag"] = etag
         return response
 
+    @list_route(methods=["get", "post"])
+    def bulk_retrieve(self, request: Any) -> Response:
+        """
+        Returns many elements at once. The ids are given as query parameter
+        (?ids=1,2,3) or in the body ({"ids": [1, 2, 3]}). The response contains
+        the found elements and the ids of all elements, that do not exist or can
+        not be seen by the user.
+        """
+        ids: Any
+        if request.method == "GET":
+            ids = [id for id in request.query_params.get("ids", "").split(",") if id]
+        elif isinstance(request.data, QueryDict):
+            ids = request.data.getlist("ids")
+        elif isinstance(request.data, dict):
+            ids = request.data.get("ids", [])
+        else:
+            ids = None
+        if not isinstance(ids, list):
+            raise ValidationError({"detail": "ids must be a list of integers."})
+        try:
+            ids = [int(id) for id in ids]
+        except (TypeError, ValueError):
+            raise ValidationError({"detail": "ids must be a list of integers."})
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > 1000:
+            raise ValidationError({"detail": "At most 1000 ids can be retrieved."})
+
+        model = self.get_queryset().model
+        try:
+            collection_string = model.get_collection_string()
+        except AttributeError:
+            # The corresponding queryset does not support caching.
+            queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=ids)
+            elements = self.get_serializer(queryset, many=True).data
+        else:
+            elements = async_to_sync(element_cache.get_elements_data)(
+                collection_string, ids, request.user.pk or 0
+            )
+        found_ids = set(element["id"] for element in elements)
+        return Response(
+            {
+                "elements": elements,
+                "missing_ids": [id for id in ids if id not in found_ids],
+            }
+        )
+
 
 class CreateModelMixin(_CreateModelMixin):
     """
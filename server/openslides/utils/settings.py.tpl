@@ -91,6 +91,9 @@ ENABLE_ELECTRONIC_VOTING = False
 # Controls if chat should be enabled
 ENABLE_CHAT = False
 
+# Amount of the newest messages per chat group held in the cache (0: all)
+CHAT_MESSAGE_CACHE_WINDOW = 0
+
 # Jitsi integration
 # JITSI_DOMAIN = None
 # JITSI_ROOM_NAME = None
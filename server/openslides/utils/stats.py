@@ -1,4 +1,5 @@
 import asyncio
+import threading
 import time
 from typing import List, Optional
 
@@ -137,3 +138,38 @@ class WebsocketThroughputLogger:
         self.receive_compressed = 0
         self.receive_uncompressed = 0
         self.time = time.time()
+
+
+class AutoupdateSuppressionLogger:
+    """
+    Counts the elements, that were removed from autoupdate bundles because they
+    did not change (see AUTOUPDATE_SKIP_UNCHANGED), and prints the count of the
+    last 60 seconds to the logger.
+
+    Usage: AutoupdateSuppressionLogger.add(<count>)
+    """
+
+    lock = threading.Lock()
+    """ Bundles are released in different threads. """
+
+    suppressed = 0
+    """ The count of all suppressed elements. """
+
+    suppressed_since_flush = 0
+    time = time.time()
+
+    logger = logging.getLogger("openslides.autoupdate.suppressed")
+    """ The logger to log to. """
+
+    @classmethod
+    def add(cls, count: int) -> None:
+        with cls.lock:
+            cls.suppressed += count
+            cls.suppressed_since_flush += count
+            current_time = time.time()
+            if current_time > (cls.time + 60):
+                cls.logger.debug(
+                    f"suppressed={cls.suppressed_since_flush}, total={cls.suppressed}"
+                )
+                cls.suppressed_since_flush = 0
+                cls.time = current_time
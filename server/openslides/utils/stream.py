@@ -1,5 +1,10 @@
+import asyncio
 import json
-from typing import Any
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
 from typing_extensions import Protocol
@@ -13,7 +18,15 @@ logger = logging.getLogger(__name__)
 REDIS_STREAM_MAXLEN = getattr(settings, "REDIS_STREAM_MAXLEN", None)
 logger.info(f"Redis stream maxlen {REDIS_STREAM_MAXLEN}")
 
+REDIS_STREAM_BATCH_DELAY = getattr(settings, "REDIS_STREAM_BATCH_DELAY", 0)
+REDIS_STREAM_COMPRESSION_THRESHOLD = getattr(
+    settings, "REDIS_STREAM_COMPRESSION_THRESHOLD", None
+)
+REDIS_STREAM_METRICS_INTERVAL = getattr(settings, "REDIS_STREAM_METRICS_INTERVAL", 60)
+
 if use_redis:
+    from aioredis.errors import ReplyError
+
     from .redis import get_connection
 
 
@@ -24,20 +37,230 @@ class Stream(Protocol):
     async def send(self, stream_name: str, payload: Any) -> None:
         ...
 
+    async def get_metrics(self, stream_name: str) -> Dict[str, Any]:
+        ...
+
+
+def merge_payloads(payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges autoupdate payloads into one payload. The last write of an element wins.
+
+    A patch (see AUTOUPDATE_STREAM_DELTAS) for an element, that was already sent
+    completely in an earlier payload, is applied to it. Two patches of the same
+    element are combined into one patch with the base_change_id of the first one.
+    A patch for an element, that was deleted in an earlier payload, is dropped,
+    so the deletion is kept.
+
+    The payloads are merged in the order of their change ids.
+    """
+    elements: Dict[str, Optional[Dict[str, Any]]] = {}
+    patches: Dict[str, Dict[str, Any]] = {}
+    for payload in sorted(payloads, key=lambda payload: payload["change_id"]):
+        for element_id, data in payload["elements"].items():
+            elements[element_id] = data
+            patches.pop(element_id, None)
+
+        for element_id, patch in payload.get("patches", {}).items():
+            element = elements.get(element_id)
+            old_patch = patches.get(element_id)
+            if element_id in elements and element is None:
+                # A patch can not be applied to a deleted element.
+                continue
+            elif element is not None:
+                element = {
+                    key: value
+                    for key, value in element.items()
+                    if key not in patch["removed"]
+                }
+                element.update(patch["changed"])
+                elements[element_id] = element
+            elif old_patch is not None:
+                patches[element_id] = {
+                    "base_change_id": old_patch["base_change_id"],
+                    "changed": {
+                        key: value
+                        for key, value in old_patch["changed"].items()
+                        if key not in patch["removed"]
+                    },
+                    "removed": [
+                        key
+                        for key in old_patch["removed"]
+                        if key not in patch["changed"] and key not in patch["removed"]
+                    ]
+                    + patch["removed"],
+                }
+                patches[element_id]["changed"].update(patch["changed"])
+            else:
+                patches[element_id] = patch
+
+    merged: Dict[str, Any] = {
+        "elements": elements,
+        "change_id": max(payload["change_id"] for payload in payloads),
+    }
+    if any("patches" in payload for payload in payloads):
+        merged["patches"] = patches
+    return merged
+
+
+def encode_payload(payload: Any) -> Dict[str, bytes]:
+    """
+    Returns the fields of the stream entry for the payload.
+
+    If the content is bigger than REDIS_STREAM_COMPRESSION_THRESHOLD bytes, it is
+    compressed with zlib and the field "compression" is set.
+    """
+    content = json.dumps(payload, separators=(",", ":")).encode()
+    if (
+        REDIS_STREAM_COMPRESSION_THRESHOLD is not None
+        and len(content) > REDIS_STREAM_COMPRESSION_THRESHOLD
+    ):
+        return {"content": zlib.compress(content), "compression": b"zlib"}
+    return {"content": content}
+
+
+def decode_payload(fields: Dict[bytes, bytes]) -> Any:
+    """
+    Returns the payload of a stream entry.
+    """
+    content = fields[b"content"]
+    if fields.get(b"compression") == b"zlib":
+        content = zlib.decompress(content)
+    return json.loads(content)
+
+
+class StreamMetrics:
+    """
+    Counts the written entries and their size.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.time()
+        self.entries = 0
+        self.payloads = 0
+        self.bytes = 0
+
+    def add(self, payloads: int, size: int) -> None:
+        self.entries += 1
+        self.payloads += payloads
+        self.bytes += size
+
+    def get(self) -> Dict[str, float]:
+        entries = self.entries or 1
+        return {
+            "entries_per_second": self.entries / max(time.time() - self.start, 1e-6),
+            "bytes_per_entry": self.bytes / entries,
+            "payloads_per_entry": self.payloads / entries,
+        }
+
+
+def get_lag(last_generated_id: bytes, last_delivered_id: bytes) -> int:
+    """
+    Returns the lag in milliseconds between two stream ids.
+    """
+    return max(
+        int(last_generated_id.split(b"-")[0]) - int(last_delivered_id.split(b"-")[0]),
+        0,
+    )
+
 
 class RedisStream:
+    """
+    Writes payloads to redis streams.
+
+    If REDIS_STREAM_BATCH_DELAY is set, all payloads of a worker, that are sent
+    within this delay, are merged into one entry. The first payload of a batch
+    waits for the delay and writes the entry, all other payloads join it and
+    wait for the result of the write.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.batches: Dict[str, Tuple[List[Any], "Future[None]"]] = {}
+        self.metrics: Dict[str, StreamMetrics] = {}
+        self.last_report = time.time()
+
     async def send(self, stream_name: str, payload: Any) -> None:
-        fields = {
-            "content": json.dumps(payload, separators=(",", ":")),
-        }
+        if not REDIS_STREAM_BATCH_DELAY:
+            await self.write(stream_name, [payload])
+            return
+
+        first = False
+        with self.lock:
+            batch = self.batches.get(stream_name)
+            if batch is not None:
+                batch[0].append(payload)
+            else:
+                # The senders can run in different threads and event loops.
+                batch = self.batches[stream_name] = ([payload], Future())
+                first = True
+            future = batch[1]
+        if not first:
+            await asyncio.wrap_future(future)
+            return
+
+        try:
+            await asyncio.sleep(REDIS_STREAM_BATCH_DELAY)
+            with self.lock:
+                del self.batches[stream_name]
+            await self.write(stream_name, batch[0])
+        except BaseException as error:
+            with self.lock:
+                if self.batches.get(stream_name) is batch:
+                    del self.batches[stream_name]
+            future.set_exception(error)
+            raise
+        future.set_result(None)
+
+    async def write(self, stream_name: str, payloads: List[Any]) -> None:
+        payload = payloads[0] if len(payloads) == 1 else merge_payloads(payloads)
+        fields = encode_payload(payload)
         async with get_connection() as redis:
-            await redis.xadd(stream_name, fields, max_len=REDIS_STREAM_MAXLEN)
+            await redis.xadd(
+                stream_name, fields, max_len=REDIS_STREAM_MAXLEN, exact_len=False
+            )
+
+        with self.lock:
+            self.metrics.setdefault(stream_name, StreamMetrics()).add(
+                len(payloads), len(fields["content"])
+            )
+            report = time.time() - self.last_report > REDIS_STREAM_METRICS_INTERVAL
+            if report:
+                self.last_report = time.time()
+        if report:
+            logger.info(f"Stream {stream_name}: {await self.get_metrics(stream_name)}")
+
+    async def get_metrics(self, stream_name: str) -> Dict[str, Any]:
+        """
+        Returns the metrics of the entries written by this worker and the lag of
+        all consumer groups of the stream in milliseconds.
+        """
+        with self.lock:
+            metrics: Dict[str, Any] = self.metrics.get(
+                stream_name, StreamMetrics()
+            ).get()
+        async with get_connection() as redis:
+            try:
+                info = await redis.xinfo_stream(stream_name)
+                groups = await redis.xinfo_groups(stream_name)
+            except ReplyError:
+                # The stream does not exist yet.
+                groups = []
+        metrics["consumer_lag"] = {
+            group[b"name"].decode(): get_lag(
+                info[b"last-generated-id"], group[b"last-delivered-id"]
+            )
+            for group in groups
+        }
+        return metrics
 
 
 class NoopStream:
     async def send(self, stream_name: str, payload: Any) -> None:
         pass
 
+    async def get_metrics(self, stream_name: str) -> Dict[str, Any]:
+        return {}
+
 
 def load_stream() -> Stream:
     if use_redis:
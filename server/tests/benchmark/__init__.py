@@ -0,0 +1 @@
+default_app_config = "tests.benchmark.apps.BenchmarkAppConfig"
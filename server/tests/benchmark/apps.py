@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BenchmarkAppConfig(AppConfig):
+    name = "tests.benchmark"
+    label = "tests.benchmark"
+    verbose_name = "Benchmark"
+    version = ""
@@ -0,0 +1,63 @@
+import time
+from typing import Any, List
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+
+from openslides.utils.cache import element_cache
+from openslides.utils.utils import get_model_from_collection_string
+
+
+DEFAULT_ROUNDS = 3
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the full_data generation of the serializers and the
+    compiled serializers.
+    """
+
+    help = "Compares the full_data generation with and without compiled serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-r",
+            "--rounds",
+            type=int,
+            default=DEFAULT_ROUNDS,
+            help=f"Number of rounds, the best one is shown (default {DEFAULT_ROUNDS}).",
+        )
+
+    def handle(self, *args, **options):
+        serializers_total = compiled_total = 0.0
+        for collection in element_cache.cachables:
+            instances = get_model_from_collection_string(collection).get_instances()
+            if not instances:
+                continue
+            serializers = self.measure(instances, False, options["rounds"])
+            compiled = self.measure(instances, True, options["rounds"])
+            serializers_total += serializers
+            compiled_total += compiled
+            self.stdout.write(
+                f"{collection:32} {len(instances):6} elements: "
+                f"{serializers * 1000:8.1f} ms -> {compiled * 1000:8.1f} ms"
+            )
+        if compiled_total:
+            self.stdout.write(
+                f"{'total':47}: {serializers_total * 1000:8.1f} ms -> "
+                f"{compiled_total * 1000:8.1f} ms "
+                f"({serializers_total / compiled_total:.1f}x)"
+            )
+
+    def measure(self, instances: List[Any], compiled: bool, rounds: int) -> float:
+        """
+        Returns the best time of all rounds in seconds.
+        """
+        times = []
+        with patch("openslides.utils.models.COMPILED_SERIALIZERS", compiled):
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for instance in instances:
+                    instance.get_full_data()
+                times.append(time.perf_counter() - start)
+        return min(times)
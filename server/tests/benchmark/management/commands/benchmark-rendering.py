@@ -0,0 +1,112 @@
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+
+from openslides.utils.renderers import JSONRenderer, use_orjson
+
+
+DEFAULT_ELEMENTS = 10000
+DEFAULT_ROUNDS = 5
+
+
+def get_elements(amount: int) -> List[Dict[str, Any]]:
+    """
+    Returns elements like users in the cache.
+    """
+    return [
+        {
+            "id": id,
+            "username": f"user{id}",
+            "title": "",
+            "first_name": f"Ünïcode {id}",
+            "last_name": f"User {id}",
+            "structure_level": "Example",
+            "number": str(id),
+            "about_me": "<p>Lorem ipsum dolor sit amet</p>" * 3,
+            "groups_id": [1, 3],
+            "is_present": bool(id % 2),
+            "is_committee": False,
+            "email": f"user{id}@example.com",
+            "last_email_send": None,
+            "comment": "",
+            "is_active": True,
+            "auth_type": "default",
+            "vote_weight": "1.000000",
+            "vote_delegated_to_id": None,
+            "vote_delegated_from_users_id": [],
+        }
+        for id in range(1, amount + 1)
+    ]
+
+
+def render_former(data: List[Dict[str, Any]]) -> bytes:
+    """
+    The former rendering: Django REST framework renders the data and the
+    autoupdate middleware renders it again with the change id.
+    """
+    DRFJSONRenderer().render(data)
+    return json.dumps({"change_id": 1, "data": data}).encode()
+
+
+def render_current(data: List[Dict[str, Any]]) -> bytes:
+    """
+    The current rendering: The data is rendered once and the autoupdate
+    middleware wraps it with the change id.
+    """
+    content = JSONRenderer().render(data)
+    return b'{"change_id":%d,"data":%s}' % (1, content)
+
+
+class Command(BaseCommand):
+    """
+    Command to compare the rendering time of large write responses.
+    """
+
+    help = "Compares the rendering time of large responses with the former rendering."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-e",
+            "--elements",
+            type=int,
+            default=DEFAULT_ELEMENTS,
+            help=f"Number of elements in the response (default {DEFAULT_ELEMENTS}).",
+        )
+        parser.add_argument(
+            "-r",
+            "--rounds",
+            type=int,
+            default=DEFAULT_ROUNDS,
+            help=f"Number of rounds, the best one is shown (default {DEFAULT_ROUNDS}).",
+        )
+
+    def handle(self, *args, **options):
+        data = get_elements(options["elements"])
+        if json.loads(render_former(data)) != json.loads(render_current(data)):
+            raise RuntimeError("The renderings have different results.")
+
+        self.stdout.write(
+            f"{options['elements']} elements, orjson {'used' if use_orjson else 'not installed'}"
+        )
+        former = self.measure(render_former, data, options["rounds"])
+        current = self.measure(render_current, data, options["rounds"])
+        self.stdout.write(f"former:  {former * 1000:8.1f} ms")
+        self.stdout.write(
+            f"current: {current * 1000:8.1f} ms ({former / current:.1f}x)"
+        )
+
+    def measure(
+        self, render: Callable[[List[Dict[str, Any]]], bytes], data: Any, rounds: int
+    ) -> float:
+        """
+        Returns the best time of all rounds in seconds.
+        """
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            render(data)
+            times.append(time.perf_counter() - start)
+        return min(times)
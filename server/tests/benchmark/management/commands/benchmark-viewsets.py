@@ -0,0 +1,713 @@
+import json
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Model
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from openslides.agenda.models import Item, ListOfSpeakers, Speaker
+from openslides.assignments.models import Assignment, AssignmentPoll
+from openslides.chat.models import ChatGroup, ChatMessage
+from openslides.core.config import config
+from openslides.core.models import Countdown, ProjectorMessage, Tag
+from openslides.mediafiles.models import Mediafile
+from openslides.motions.models import (
+    Category,
+    Motion,
+    MotionBlock,
+    MotionChangeRecommendation,
+    MotionComment,
+    MotionCommentSection,
+    MotionPoll,
+    MotionVote,
+    State,
+    StatuteParagraph,
+    Submitter,
+)
+from openslides.topics.models import Topic
+from openslides.users.models import Group, PersonalNote, User
+from openslides.utils.cache import element_cache
+from openslides.utils.redis import use_redis
+from openslides.utils.rest_api import router
+from openslides.utils.startup import run_startup_hooks
+from tests.common_groups import GROUP_DELEGATE_PK
+from tests.count_queries import get_verbose_queries
+
+
+DEFAULT_SCALE = 10
+DEFAULT_ROUNDS = 3
+DEFAULT_TIME_TOLERANCE = 0.5
+# Smaller increases of the time in ms are not reported as regression.
+MIN_TIME_INCREASE = 5
+SCHEMA_VERSION = 1
+
+
+def first(model: Type[Model]) -> Model:
+    return model.objects.order_by("pk").first()
+
+
+def last(model: Type[Model]) -> Model:
+    return model.objects.order_by("pk").last()
+
+
+def ids(model: Type[Model]) -> List[int]:
+    return list(model.objects.order_by("pk").values_list("pk", flat=True))
+
+
+def next_state_id(motion: Motion) -> int:
+    state = motion.state.next_states.first() or motion.state
+    return state.pk
+
+
+def recommendation_id(motion: Motion) -> Optional[int]:
+    state = motion.state.workflow.states.exclude(recommendation_label=None).first()
+    return None if state is None else state.pk
+
+
+def permissions(group: Group) -> List[str]:
+    return [
+        f"{permission.content_type.app_label}.{permission.codename}"
+        for permission in group.permissions.select_related("content_type")
+    ]
+
+
+def unstarted_speaker_ids(list_of_speakers: ListOfSpeakers) -> List[int]:
+    return list(
+        list_of_speakers.speakers.filter(begin_time=None)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+# Request data for actions, that do not work with the defaults. The keys are
+# (basename, method, action).
+SCENARIOS: Dict[Tuple[str, str, str], Callable[[], Any]] = {
+    ("projector", "post", "create"): lambda: {"name": "benchmark"},
+    ("tag", "post", "create"): lambda: {"name": "benchmark"},
+    ("topic", "post", "create"): lambda: {"title": "benchmark", "text": "text"},
+    ("user", "post", "create"): lambda: {
+        "username": "benchmark",
+        "groups_id": [GROUP_DELEGATE_PK],
+    },
+    ("group", "post", "create"): lambda: {"name": "benchmark"},
+    ("countdown", "post", "create"): lambda: {"title": "benchmark"},
+    ("projectormessage", "post", "create"): lambda: {"message": "benchmark"},
+    ("chatgroup", "post", "create"): lambda: {"name": "benchmark"},
+    ("chatmessage", "post", "create"): lambda: {
+        "text": "benchmark",
+        "chatgroup_id": first(ChatGroup).pk,
+    },
+    ("mediafile", "post", "create"): lambda: {
+        "title": "benchmark",
+        "is_directory": True,
+    },
+    ("category", "post", "create"): lambda: {"name": "benchmark", "prefix": "B"},
+    ("motionblock", "post", "create"): lambda: {"title": "benchmark"},
+    ("statuteparagraph", "post", "create"): lambda: {
+        "title": "benchmark",
+        "text": "text",
+    },
+    ("motioncommentsection", "post", "create"): lambda: {"name": "benchmark"},
+    ("workflow", "post", "create"): lambda: {"name": "benchmark"},
+    ("state", "post", "create"): lambda: {
+        "name": "benchmark",
+        "workflow_id": first(State).workflow_id,
+    },
+    ("motion", "post", "create"): lambda: {
+        "title": "benchmark",
+        "text": "<p>text</p>",
+        "category_id": first(Category).pk,
+        "motion_block_id": first(MotionBlock).pk,
+        "tags_id": ids(Tag)[:2],
+    },
+    ("motionchangerecommendation", "post", "create"): lambda: {
+        "motion_id": first(Motion).pk,
+        "line_from": 3,
+        "line_to": 4,
+        "text": "<p>text</p>",
+    },
+    ("motionpoll", "post", "create"): lambda: {
+        "motion_id": first(Motion).pk,
+        "title": "benchmark",
+        "pollmethod": "YNA",
+        "type": "analog",
+        "onehundred_percent_base": "YNA",
+        "majority_method": "simple",
+    },
+    ("assignment", "post", "create"): lambda: {"title": "benchmark", "open_posts": 1},
+    ("assignmentpoll", "post", "create"): lambda: {
+        "assignment_id": first(Assignment).pk,
+        "title": "benchmark",
+        "pollmethod": "YNA",
+        "type": "analog",
+        "onehundred_percent_base": "YNA",
+        "majority_method": "simple",
+    },
+    ("motion", "post", "sort"): lambda: [{"id": id} for id in ids(Motion)],
+    ("motion", "post", "manage_multiple_category"): lambda: {
+        "motions": [{"id": id, "category": ids(Category)[-1]} for id in ids(Motion)]
+    },
+    ("motion", "post", "manage_multiple_motion_block"): lambda: {
+        "motions": [
+            {"id": id, "motion_block": ids(MotionBlock)[-1]} for id in ids(Motion)
+        ]
+    },
+    ("motion", "post", "manage_multiple_state"): lambda: {
+        "motions": [
+            {"id": motion.pk, "state": next_state_id(motion)}
+            for motion in Motion.objects.all()
+        ]
+    },
+    ("motion", "post", "manage_multiple_recommendation"): lambda: {
+        "motions": [
+            {"id": motion.pk, "recommendation": recommendation_id(motion)}
+            for motion in Motion.objects.all()
+        ]
+    },
+    ("motion", "post", "manage_multiple_submitters"): lambda: {
+        "motions": [{"id": id, "submitters": ids(User)[:2]} for id in ids(Motion)]
+    },
+    ("motion", "post", "manage_multiple_tags"): lambda: {
+        "motions": [{"id": id, "tags": ids(Tag)[:2]} for id in ids(Motion)]
+    },
+    ("motion", "put", "set_state"): lambda: {"state": next_state_id(first(Motion))},
+    ("motion", "put", "set_recommendation"): lambda: {
+        "recommendation": recommendation_id(first(Motion))
+    },
+    ("motion", "post", "manage_comments"): lambda: {
+        "section_id": first(MotionCommentSection).pk,
+        "comment": "benchmark",
+    },
+    ("motion", "delete", "manage_comments"): lambda: {
+        "section_id": first(MotionCommentSection).pk
+    },
+    ("motioncommentsection", "post", "sort"): lambda: {
+        "ids": ids(MotionCommentSection)
+    },
+    ("category", "post", "sort_categories"): lambda: [
+        {"id": id} for id in ids(Category)
+    ],
+    ("item", "post", "sort"): lambda: [{"id": id} for id in ids(Item)],
+    ("user", "post", "bulk_set_state"): lambda: {
+        "user_ids": ids(User)[1:],
+        "field": "is_present",
+        "value": True,
+    },
+    ("user", "post", "bulk_alter_groups"): lambda: {
+        "user_ids": ids(User)[1:],
+        "action": "add",
+        "group_ids": [GROUP_DELEGATE_PK],
+    },
+    ("user", "post", "bulk_generate_passwords"): lambda: {"user_ids": ids(User)[1:]},
+    ("user", "post", "bulk_reset_passwords_to_default"): lambda: {
+        "user_ids": ids(User)[1:]
+    },
+    ("user", "post", "bulk_delete"): lambda: {"user_ids": ids(User)[1:]},
+    ("user", "post", "reset_password"): lambda: {"password": "benchmark"},
+    ("user", "post", "mass_import"): lambda: {
+        "users": [
+            {
+                "first_name": "bench",
+                "last_name": f"mark{i}",
+                "groups_id": [GROUP_DELEGATE_PK],
+            }
+            for i in range(10)
+        ]
+    },
+    ("personalnote", "post", "create_or_update"): lambda: [
+        {"collection": "motions/motion", "id": id, "content": {"star": True}}
+        for id in ids(Motion)[:10]
+    ],
+    ("assignment", "post", "candidature_other"): lambda: {"user": last(User).pk},
+    ("assignment", "delete", "candidature_other"): lambda: {
+        "user": first(Assignment).candidates.first().pk
+    },
+    ("listofspeakers", "post", "manage_speaker"): lambda: {"user": last(User).pk},
+    ("mediafile", "post", "bulk_delete"): lambda: {"ids": ids(Mediafile)},
+    ("config", "put", "update"): lambda: {"value": "benchmark"},
+    ("config", "patch", "partial_update"): lambda: {"value": "benchmark"},
+    ("config", "post", "bulk_update"): lambda: [
+        {"key": "general_event_name", "value": "benchmark"}
+    ],
+    ("projector", "post", "control_view"): lambda: {
+        "action": "scale",
+        "direction": "up",
+    },
+    ("projector", "post", "set_scroll"): lambda: 1,
+    ("group", "patch", "partial_update"): lambda: {
+        "name": "benchmark",
+        "permissions": permissions(first(Group)),
+    },
+    ("group", "post", "set_permission"): lambda: {
+        "perm": "agenda.can_see",
+        "set": False,
+    },
+    ("listofspeakers", "patch", "manage_speaker"): lambda: {
+        "user": first(ListOfSpeakers).speakers.order_by("pk").first().user_id,
+        "marked": True,
+    },
+    ("listofspeakers", "delete", "manage_speaker"): lambda: {
+        "speaker": unstarted_speaker_ids(first(ListOfSpeakers))[0]
+    },
+    ("listofspeakers", "post", "sort_speakers"): lambda: {
+        "speakers": unstarted_speaker_ids(first(ListOfSpeakers))[::-1]
+    },
+    ("category", "post", "sort_motions"): lambda: {
+        "motions": ids(Motion)[:: len(ids(Category))]
+    },
+    ("motion", "post", "follow_recommendation"): lambda: {},
+    ("motionpoll", "post", "vote"): lambda: {
+        "data": "Y",
+        "user_id": User.objects.exclude(vote_delegated_to=None).get().pk,
+    },
+    ("chatmessage", "get", "history"): lambda: {"chatgroup_id": first(ChatGroup).pk},
+    ("assignment", "patch", "partial_update"): lambda: {"open_posts": 2},
+    ("assignment", "post", "sort_related_users"): lambda: {
+        "related_users": list(
+            first(Assignment)
+            .assignment_related_users.order_by("-pk")
+            .values_list("pk", flat=True)
+        )
+    },
+    ("assignmentpoll", "post", "vote"): lambda: {
+        "data": {
+            "options": {
+                option.pk: {"Y": "1", "N": "0", "A": "0"}
+                for option in first(AssignmentPoll).options.all()
+            },
+            "votesvalid": "1",
+            "votesinvalid": "0",
+            "votescast": "1",
+        }
+    },
+}
+
+# Lookup values of detail routes, that do not use the pk of the first (or for
+# destroy the last) element. The keys are (basename, method, action).
+DETAIL_LOOKUPS: Dict[Tuple[str, str, str], Callable[[], Any]] = {
+    ("config", "put", "update"): lambda: "general_event_name",
+    ("config", "patch", "partial_update"): lambda: "general_event_name",
+    # The admin supports all motions except the last one.
+    ("motion", "post", "support"): lambda: last(Motion).pk,
+    # Only the last motion poll is started.
+    ("motionpoll", "post", "stop"): lambda: last(MotionPoll).pk,
+    ("motionpoll", "post", "vote"): lambda: last(MotionPoll).pk,
+}
+
+
+class Command(BaseCommand):
+    """
+    Command to measure the queries and the time of all actions of all
+    registered viewsets.
+    """
+
+    help = (
+        "Measures the queries and the time of all viewset actions with a "
+        "generated dataset in a test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-s",
+            "--scale",
+            type=int,
+            default=DEFAULT_SCALE,
+            help=f"Scale of the generated dataset (default {DEFAULT_SCALE}).",
+        )
+        parser.add_argument(
+            "-r",
+            "--rounds",
+            type=int,
+            default=DEFAULT_ROUNDS,
+            help=f"Number of rounds, the best time is used (default {DEFAULT_ROUNDS}).",
+        )
+        parser.add_argument(
+            "-o", "--output", help="Writes the results as baseline to this file."
+        )
+        parser.add_argument(
+            "-c",
+            "--compare",
+            help="Compares the results with this baseline file and fails on regressions.",
+        )
+        parser.add_argument(
+            "--time-tolerance",
+            type=float,
+            default=DEFAULT_TIME_TOLERANCE,
+            help=(
+                "Allowed relative increase of the time before it is reported as "
+                f"regression (default {DEFAULT_TIME_TOLERANCE})."
+            ),
+        )
+        parser.add_argument(
+            "-a",
+            "--action",
+            help="Only measure actions that contain this string, e. g. 'motion '.",
+        )
+        parser.add_argument(
+            "--verbose-queries",
+            action="store_true",
+            help="Prints the queries of all measured actions.",
+        )
+
+    def handle(self, *args, **options):
+        if use_redis:
+            raise CommandError(
+                "The benchmark writes into the cache. Run it without redis, "
+                "e. g. with --settings tests.settings."
+            )
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline.get("scale") != options["scale"]:
+                raise CommandError(
+                    f"The baseline was created with the scale {baseline.get('scale')}."
+                )
+
+        setup_test_environment()
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with patch("openslides.chat.views.ENABLE_CHAT", True):
+                # The config is read from the cache while seeding.
+                element_cache.ensure_cache(reset=True)
+                self.seed(options["scale"])
+                run_startup_hooks()
+                element_cache.ensure_cache(reset=True)
+                results = self.run_actions(options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+
+        server_errors = [
+            name for name, result in results.items() if result["status"] >= 500
+        ]
+        for name in server_errors:
+            self.stdout.write(self.style.ERROR(f"{name}: server error"))
+
+        if options["output"]:
+            with open(options["output"], "w") as output_file:
+                json.dump(
+                    {
+                        "version": SCHEMA_VERSION,
+                        "scale": options["scale"],
+                        # Server errors are no valid baseline.
+                        "results": {
+                            name: result
+                            for name, result in results.items()
+                            if name not in server_errors
+                        },
+                    },
+                    output_file,
+                    indent=2,
+                    sort_keys=True,
+                )
+            self.stdout.write(f"Baseline written to {options['output']}.")
+        if baseline is not None:
+            self.compare(baseline["results"], results, options["time_tolerance"])
+        if server_errors:
+            raise CommandError(f"{len(server_errors)} actions had a server error.")
+
+    @transaction.atomic
+    def seed(self, scale: int) -> None:
+        """
+        Creates a dataset with motions, assignments, users and so on. All
+        amounts are multiples of the scale.
+        """
+        admin = User.objects.get(username="admin")
+        admin.is_present = True
+        admin.save(skip_autoupdate=True)
+        password = make_password("benchmark")
+        User.objects.bulk_create(
+            User(username=f"user{i}", password=password, default_password="benchmark")
+            for i in range(scale * 10)
+        )
+        users = list(User.objects.exclude(pk=admin.pk).order_by("pk"))
+        delegates = Group.objects.get(pk=GROUP_DELEGATE_PK)
+        delegates.user_set.add(*users)
+        # The admin votes for the last user.
+        users[-1].vote_delegated_to = admin
+        users[-1].save(skip_autoupdate=True)
+        config["motions_min_supporters"] = 1
+        PersonalNote.objects.create(user=admin, notes={})
+
+        tags = [Tag.objects.create(name=f"tag{i}") for i in range(scale)]
+        for i in range(scale):
+            Mediafile.objects.create(title=f"directory{i}", is_directory=True)
+            Countdown.objects.create(title=f"countdown{i}")
+            ProjectorMessage.objects.create(message=f"message{i}")
+        chat_group = ChatGroup.objects.create(name="chat")
+        ChatMessage.objects.bulk_create(
+            ChatMessage(
+                text=f"message{i}",
+                chatgroup=chat_group,
+                username=admin.username,
+                user_id=admin.pk,
+            )
+            for i in range(scale * 5)
+        )
+
+        for i in range(scale * 2):
+            topic = Topic(title=f"topic{i}", text="text")
+            topic.save(skip_autoupdate=True)
+
+        StatuteParagraph.objects.create(title="statute", text="text")
+        section = MotionCommentSection.objects.create(name="comments")
+        section.read_groups.add(delegates)
+        section.write_groups.add(delegates)
+        categories = [
+            Category.objects.create(name=f"category{i}", prefix=f"C{i}")
+            for i in range(scale)
+        ]
+        blocks = []
+        for i in range(scale):
+            block = MotionBlock(title=f"block{i}")
+            block.save(skip_autoupdate=True)
+            blocks.append(block)
+        for i in range(scale * 10):
+            motion = Motion(
+                title=f"motion{i}",
+                text="<p>text</p>" * 4,
+                category=categories[i % scale],
+                motion_block=blocks[i % scale],
+            )
+            motion.save(skip_autoupdate=True)
+            motion.tags.add(*tags[:2])
+            user = users[i % len(users)]
+            motion.supporters.add(user, admin)
+            Submitter.objects.add(user, motion, skip_autoupdate=True)
+            MotionComment.objects.create(motion=motion, section=section, comment="c")
+            MotionChangeRecommendation.objects.create(
+                motion=motion, line_from=1, line_to=2, text="<p>text</p>"
+            )
+            poll = MotionPoll.objects.create(
+                motion=motion,
+                title="poll",
+                pollmethod="YN",
+                type="named",
+                onehundred_percent_base="YN",
+                majority_method="simple",
+            )
+            poll.create_options()
+            poll.groups.add(delegates)
+            option = poll.options.get()
+            for user in users[:scale]:
+                MotionVote.objects.create(
+                    user=user, option=option, value="Y", weight=Decimal(1)
+                )
+            poll.voted.add(*users[:scale])
+        # The last motion can be supported by the admin and its poll is started.
+        motion.supporters.remove(admin)
+        poll.state = MotionPoll.STATE_STARTED
+        poll.save(skip_autoupdate=True)
+        motion = first(Motion)
+        motion.recommendation_id = recommendation_id(motion)
+        motion.save(skip_autoupdate=True)
+
+        # add_candidate adds the candidates to the lists of speakers itself.
+        for list_of_speakers in ListOfSpeakers.objects.all():
+            for user in users[:3]:
+                Speaker.objects.add(user, list_of_speakers, skip_autoupdate=True)
+
+        for i in range(scale):
+            assignment = Assignment(title=f"assignment{i}", open_posts=1)
+            assignment.save(skip_autoupdate=True)
+            for user in users[i:][:3]:
+                assignment.add_candidate(user)
+            poll = AssignmentPoll.objects.create(
+                assignment=assignment,
+                title="poll",
+                pollmethod="YNA",
+                type="analog",
+                onehundred_percent_base="YNA",
+                majority_method="simple",
+            )
+            poll.create_options()
+
+    def run_actions(self, options: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Measures all actions of all registered viewsets.
+
+        Write requests are rolled back, so every action runs with the same data.
+        """
+        client = APIClient()
+        client.force_login(User.objects.get(username="admin"))
+        results = {}
+        for _, viewset, basename in router.registry:
+            model = viewset.queryset.model
+            for route in router.get_routes(viewset):
+                for method, action in route.mapping.items():
+                    if not hasattr(viewset, action):
+                        continue
+                    name = f"{basename} {method.upper()} {action}"
+                    if options["action"] and options["action"] not in name:
+                        continue
+                    args = []
+                    if route.detail:
+                        lookup = self.get_detail_lookup(basename, method, action, model)
+                        if lookup is None:
+                            continue
+                        args.append(lookup)
+                    url = reverse(route.name.format(basename=basename), args=args)
+                    data = self.get_data(client, basename, method, action, url, model)
+                    results[name] = self.measure(
+                        client, method, url, data, options["rounds"], options
+                    )
+                    self.stdout.write(
+                        f"{name:60} {results[name]['status']} "
+                        f"{results[name]['queries']:5} queries "
+                        f"{results[name]['time']:9.2f} ms"
+                    )
+        return results
+
+    def get_detail_lookup(
+        self, basename: str, method: str, action: str, model: Type[Model]
+    ) -> Any:
+        """
+        Returns the lookup value for a detail route or None, if there is no
+        element.
+        """
+        lookup = DETAIL_LOOKUPS.get((basename, method, action))
+        if lookup is not None:
+            return lookup()
+        instance = last(model) if action == "destroy" else first(model)
+        return None if instance is None else instance.pk
+
+    def get_data(
+        self,
+        client: APIClient,
+        basename: str,
+        method: str,
+        action: str,
+        url: str,
+        model: Type[Model],
+    ) -> Any:
+        """
+        Returns the request data for an action.
+        """
+        scenario = SCENARIOS.get((basename, method, action))
+        if scenario is not None:
+            return scenario()
+        if action == "bulk_retrieve":
+            element_ids = ids(model)[:100]
+            if method == "get":
+                return {"ids": ",".join(map(str, element_ids))}
+            return {"ids": element_ids}
+        if action == "update":
+            # Send the element as it is. Empty fields are omitted, because some
+            # serializers do not accept null.
+            return {
+                key: value
+                for key, value in client.get(url).data.items()
+                if value is not None
+            }
+        if method == "get":
+            return None
+        return {}
+
+    def measure(
+        self,
+        client: APIClient,
+        method: str,
+        url: str,
+        data: Any,
+        rounds: int,
+        options: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Returns the status, the amount of queries and the best time in ms.
+        """
+        times = []
+        for _ in range(rounds):
+            context = CaptureQueriesContext(connections[DEFAULT_DB_ALIAS])
+            with transaction.atomic():
+                with context:
+                    start = time.perf_counter()
+                    try:
+                        status = self.request(client, method, url, data)
+                    except Exception:
+                        # The test client raises exceptions of the views.
+                        status = 500
+                    times.append(time.perf_counter() - start)
+                transaction.set_rollback(True)
+            if method != "get":
+                # The cache contains the rolled back changes.
+                async_to_sync(element_cache.cache_provider.clear_cache)()
+                element_cache.ensure_cache(reset=True)
+
+        if options["verbose_queries"]:
+            self.stdout.write(get_verbose_queries(context))
+        return {
+            "status": status,
+            "queries": len(context),
+            "time": round(min(times) * 1000, 2),
+        }
+
+    def request(self, client: APIClient, method: str, url: str, data: Any) -> int:
+        """
+        Sends the request, reads the whole response and returns its status.
+        """
+        if method == "get":
+            response = client.get(url, data)
+        else:
+            response = getattr(client, method)(
+                url, json.dumps(data), content_type="application/json"
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+    def compare(
+        self,
+        baseline: Dict[str, Dict[str, Any]],
+        results: Dict[str, Dict[str, Any]],
+        time_tolerance: float,
+    ) -> None:
+        """
+        Compares the results with the baseline. Raises CommandError, if an
+        action changed its status, uses more queries or is slower than the
+        tolerance allows. Increases of less than MIN_TIME_INCREASE ms are
+        ignored.
+        """
+        regressions = []
+        for name, result in results.items():
+            try:
+                expected = baseline[name]
+            except KeyError:
+                self.stdout.write(f"{name}: not in baseline")
+                continue
+            if result["status"] != expected["status"]:
+                regressions.append(
+                    f"{name}: status {expected['status']} -> {result['status']}"
+                )
+            if result["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name}: {expected['queries']} -> {result['queries']} queries"
+                )
+            if (
+                result["time"] > expected["time"] * (1 + time_tolerance)
+                and result["time"] - expected["time"] > MIN_TIME_INCREASE
+            ):
+                regressions.append(
+                    f"{name}: {expected['time']} ms -> {result['time']} ms"
+                )
+
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions found.")
+        self.stdout.write(self.style.SUCCESS("No regressions found."))
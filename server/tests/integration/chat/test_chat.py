@@ -1,8 +1,13 @@
+from unittest.mock import patch
+
 import pytest
+from django.urls import reverse
+from rest_framework import status
 
-from openslides.chat.models import ChatGroup, ChatMessage
+from openslides.chat.models import ChatGroup, ChatMessage, ChatMessageManager
 from openslides.utils.auth import get_group_model
 from tests.count_queries import count_queries
+from tests.test_case import TestCase
 
 
 @pytest.mark.django_db(transaction=False)
@@ -39,3 +44,102 @@ def test_motion_db_queries():
 
     assert count_queries(ChatGroup.get_elements)() == 3
     assert count_queries(ChatMessage.get_elements)() == 4
+
+
+@pytest.mark.django_db(transaction=False)
+def test_chat_message_cache_window():
+    """
+    Tests that only the newest messages of each chat group are loaded into the cache.
+    """
+    chatgroup1 = ChatGroup.objects.create(name="chatgroup1")
+    chatgroup2 = ChatGroup.objects.create(name="chatgroup2")
+    for chatgroup in (chatgroup1, chatgroup2):
+        for i in range(5):
+            ChatMessage.objects.create(
+                text=f"text-{i}", username="user", user_id=1, chatgroup=chatgroup
+            )
+
+    with patch.object(ChatMessageManager, "cache_window", 2):
+        elements = ChatMessage.get_elements()
+
+    assert sorted(element["text"] for element in elements) == [
+        "text-3",
+        "text-3",
+        "text-4",
+        "text-4",
+    ]
+
+
+@pytest.mark.django_db(transaction=False)
+def test_chat_message_cache_window_ids():
+    """
+    Tests that the window of all chat groups is loaded with one query and that
+    explicitly given empty ids load no messages.
+    """
+    for i1 in range(3):
+        chatgroup = ChatGroup.objects.create(name=f"chatgroup{i1}")
+        for i2 in range(5):
+            ChatMessage.objects.create(
+                text=f"text-{i1}-{i2}", username="user", user_id=1, chatgroup=chatgroup
+            )
+
+    with patch.object(ChatMessageManager, "cache_window", 2):
+        assert count_queries(ChatMessage.objects.get_window_ids)() == 1
+        assert len(ChatMessage.objects.get_window_ids()) == 6
+        assert not ChatMessage.objects.get_prefetched_queryset(ids=[]).exists()
+
+
+class TestChatMessageHistory(TestCase):
+    def advancedSetUp(self):
+        self.chatgroup = ChatGroup.objects.create(name="chatgroup")
+        for i in range(5):
+            ChatMessage.objects.create(
+                text=f"text-{i}", username="user", user_id=1, chatgroup=self.chatgroup
+            )
+        self.ids = list(
+            ChatMessage.objects.order_by("-pk").values_list("pk", flat=True)
+        )
+
+    @patch("openslides.chat.views.ENABLE_CHAT", True)
+    def test_history(self):
+        response = self.client.get(
+            reverse("chatmessage-history"),
+            {"chatgroup_id": self.chatgroup.pk, "before_id": self.ids[1], "limit": 2},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([message["id"] for message in response.data], self.ids[2:4])
+
+    @patch("openslides.chat.views.ENABLE_CHAT", True)
+    def test_history_no_read_groups(self):
+        self.make_admin_delegate()
+        response = self.client.get(
+            reverse("chatmessage-history"), {"chatgroup_id": self.chatgroup.pk}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    @patch("openslides.chat.views.ENABLE_CHAT", True)
+    def test_history_no_chatgroup_id(self):
+        response = self.client.get(reverse("chatmessage-history"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("openslides.chat.views.ENABLE_CHAT", True)
+    @patch.object(ChatMessageManager, "cache_window", 5)
+    def test_create_drops_oldest_message_from_cache(self):
+        response = self.client.post(
+            reverse("chatmessage-list"),
+            {"text": "new text", "chatgroup_id": self.chatgroup.pk},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        _, deleted_element_ids = self.get_last_autoupdate()
+        self.assertEqual(deleted_element_ids, [f"chat/chat-message:{self.ids[-1]}"])
+        self.assertTrue(ChatMessage.objects.filter(pk=self.ids[-1]).exists())
+
+    @patch("openslides.chat.views.ENABLE_CHAT", True)
+    @patch.object(ChatMessageManager, "cache_window", 4)
+    def test_destroy_moves_next_message_into_cache(self):
+        response = self.client.delete(reverse("chatmessage-detail", args=[self.ids[0]]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        changed_autoupdate, deleted_element_ids = self.get_last_autoupdate()
+        self.assertEqual(deleted_element_ids, [f"chat/chat-message:{self.ids[0]}"])
+        self.assertIn(f"chat/chat-message:{self.ids[-1]}", changed_autoupdate)
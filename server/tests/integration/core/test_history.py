@@ -0,0 +1,454 @@
+import datetime
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from openslides.core.config import config
+from openslides.core.models import History, HistoryBuildProgress, HistoryData
+from openslides.utils.autoupdate import AutoupdateElement
+from openslides.utils.cache import element_cache
+from openslides.utils.locking import locking
+from tests.test_case import TestCase
+
+
+@patch("openslides.core.models.HISTORY_KEYFRAME_INTERVAL", 3)
+class HistoryKeyframes(TestCase):
+    def get_full_data(self, name):
+        return {"id": 1, "name": name, "text": "A long text. " * 10}
+
+    def add_tag(self, name):
+        full_data = None if name is None else self.get_full_data(name)
+        History.objects.add_elements(
+            [AutoupdateElement(id=1, collection_string="core/tag", full_data=full_data)]
+        )
+
+    def get_history_data(self):
+        return [
+            instance.full_data
+            for instance in History.objects.filter(element_id="core/tag:1")
+            .select_related("full_data__keyframe")
+            .order_by("id")
+        ]
+
+    def test_diffs(self):
+        for name in ("tag1", "tag2", "tag3", "tag4"):
+            self.add_tag(name)
+
+        history_data = self.get_history_data()
+        self.assertEqual(
+            [data.keyframe for data in history_data],
+            [None, history_data[0], history_data[0], None],
+        )
+        self.assertEqual(
+            history_data[1].diff, {"changed": {"name": "tag2"}, "removed": []}
+        )
+        self.assertIsNone(history_data[1].full_data)
+        self.assertEqual(
+            [data.get_full_data()["name"] for data in history_data],
+            ["tag1", "tag2", "tag3", "tag4"],
+        )
+
+    def test_deleted(self):
+        self.add_tag("tag1")
+        self.add_tag(None)
+        self.add_tag("tag2")
+
+        history_data = self.get_history_data()
+        self.assertEqual([data.keyframe for data in history_data], [None, None, None])
+        self.assertEqual(history_data[2].get_full_data()["name"], "tag2")
+
+    def test_same_element_twice(self):
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=1,
+                    collection_string="core/tag",
+                    full_data=self.get_full_data(name),
+                )
+                for name in ("tag1", "tag2")
+            ]
+        )
+
+        history_data = self.get_history_data()
+        self.assertEqual(history_data[1].keyframe, history_data[0])
+
+    def test_history_data_view(self):
+        self.add_tag("tag1")
+        self.add_tag("tag2")
+
+        response = self.client.get(reverse("core_history_data"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(data["core/tag"], [self.get_full_data("tag2")])
+
+    def test_compress(self):
+        with patch("openslides.core.models.HISTORY_KEYFRAME_INTERVAL", 0):
+            for name in ("tag1", "tag2", "tag3"):
+                self.add_tag(name)
+        self.assertFalse(HistoryData.objects.filter(keyframe__isnull=False).exists())
+
+        call_command("compresshistory", stdout=None)
+
+        history_data = self.get_history_data()
+        self.assertEqual(
+            [data.keyframe for data in history_data],
+            [None, history_data[0], history_data[0]],
+        )
+        self.assertEqual(
+            [data.get_full_data()["name"] for data in history_data],
+            ["tag1", "tag2", "tag3"],
+        )
+
+
+class RetrieveHistoryData(TestCase):
+    def add_element(self, collection_string, id, full_data, timestamp):
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=id, collection_string=collection_string, full_data=full_data
+                )
+            ]
+        )
+        History.objects.filter(element_id=f"{collection_string}:{id}").filter(
+            id=History.objects.latest("id").id
+        ).update(now=datetime.datetime.fromtimestamp(timestamp))
+
+    def get_data(self, timestamp):
+        response = self.client.get(
+            reverse("core_history_data"), {"timestamp": timestamp}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(b"".join(response.streaming_content))
+
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        self.add_element("core/tag", 1, {"id": 1, "name": "tag1"}, 1000)
+        self.add_element("core/tag", 2, {"id": 2, "name": "tag2"}, 1000)
+        self.add_element("core/tag", 1, {"id": 1, "name": "tag1 changed"}, 2000)
+        self.add_element("core/tag", 2, None, 2000)
+        self.add_element("agenda/item", 1, {"id": 1, "title": "item"}, 3000)
+
+    def test_point_in_time(self):
+        data = self.get_data(1500)
+
+        self.assertEqual(
+            data["core/tag"], [{"id": 1, "name": "tag1"}, {"id": 2, "name": "tag2"}]
+        )
+        self.assertNotIn("agenda/item", data)
+
+    def test_deleted_element(self):
+        data = self.get_data(2500)
+
+        self.assertEqual(data["core/tag"], [{"id": 1, "name": "tag1 changed"}])
+
+    def test_missing_config(self):
+        data = self.get_data(1500)
+
+        self.assertEqual(
+            set(config["key"] for config in data["core/config"]),
+            set(config.config_variables.keys()),
+        )
+
+    def test_not_admin(self):
+        self.client.logout()
+
+        response = self.client.get(reverse("core_history_data"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SearchHistoryInformation(TestCase):
+    def add_entry(self, element_id, user_id, timestamp, information=("changed",)):
+        collection_string, id = element_id.split(":")
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=int(id),
+                    collection_string=collection_string,
+                    full_data={"id": int(id)},
+                    information=list(information),
+                    user_id=user_id,
+                )
+            ],
+            history_time=datetime.datetime.fromtimestamp(
+                timestamp, tz=datetime.timezone.utc
+            ),
+        )
+
+    def search(self, **params):
+        response = self.client.get(
+            reverse("core_history_information"), {"type": "search", **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        self.add_entry("motions/motion:1", 1, 1000)
+        self.add_entry("motions/motion:1", None, 2000)
+        self.add_entry("motions/motion:2", 1, 2000)
+        self.add_entry("core/tag:1", 1, 3000)
+        self.add_entry("motions/motion:1", 1, 4000, information=())
+
+    def get_element_ids(self, data):
+        return [(entry["element_id"], entry["timestamp"]) for entry in data["results"]]
+
+    def test_element(self):
+        response = self.client.get(
+            reverse("core_history_information"),
+            {"type": "element", "value": "motions/motion:1"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "element_id": "motions/motion:1",
+                    "timestamp": 2000.0,
+                    "information": ["changed"],
+                    "user_id": None,
+                },
+                {
+                    "element_id": "motions/motion:1",
+                    "timestamp": 1000.0,
+                    "information": ["changed"],
+                    "user_id": 1,
+                },
+            ],
+        )
+
+    def test_filter(self):
+        data = self.search(collection="motions/motion", user_id=1, **{"from": 1500})
+
+        self.assertEqual(self.get_element_ids(data), [("motions/motion:2", 2000.0)])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_pages(self):
+        first_page = self.search(limit=2)
+        second_page = self.search(limit=2, cursor=first_page["next_cursor"])
+
+        self.assertEqual(
+            self.get_element_ids(first_page),
+            [("core/tag:1", 3000.0), ("motions/motion:2", 2000.0)],
+        )
+        self.assertEqual(
+            self.get_element_ids(second_page),
+            [("motions/motion:1", 2000.0), ("motions/motion:1", 1000.0)],
+        )
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse("core_history_information"), {"type": "search", "cursor": "abc"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@patch("openslides.core.models.HISTORY_RETENTION_DAYS", 30)
+class PruneHistory(TestCase):
+    def add_tag(self, id, name, days_ago):
+        full_data = (
+            None if name is None else {"id": id, "name": name, "text": "Text. " * 20}
+        )
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=id, collection_string="core/tag", full_data=full_data
+                )
+            ],
+            history_time=timezone.now() - datetime.timedelta(days=days_ago),
+        )
+
+    def get_names(self, id):
+        return [
+            (entry.full_data.get_full_data() or {}).get("name")
+            for entry in History.objects.filter(element_id=f"core/tag:{id}")
+            .select_related("full_data__keyframe")
+            .order_by("id")
+        ]
+
+    def prune(self):
+        return sum(History.objects.prune(chunk_size=2))
+
+    @patch("openslides.core.models.HISTORY_KEYFRAME_INTERVAL", 1)
+    def test_prune(self):
+        self.add_tag(1, "tag1", 100)
+        self.add_tag(1, "tag2", 50)
+        self.add_tag(1, "tag3", 1)
+        self.add_tag(2, "tag1", 100)
+        self.add_tag(3, "tag1", 100)
+        self.add_tag(3, None, 50)
+
+        self.assertEqual(self.prune(), 3)
+
+        # The latest entry before the cutoff is kept.
+        self.assertEqual(self.get_names(1), ["tag2", "tag3"])
+        self.assertEqual(self.get_names(2), ["tag1"])
+        # Deleted elements are removed completely.
+        self.assertEqual(self.get_names(3), [])
+        self.assertFalse(HistoryData.objects.filter(history__isnull=True).exists())
+
+    def test_prune_keeps_keyframes(self):
+        self.add_tag(1, "tag1", 100)
+        self.add_tag(1, "tag2", 50)
+        self.add_tag(1, "tag3", 40)
+
+        self.assertEqual(self.prune(), 1)
+
+        self.assertEqual(self.get_names(1), ["tag1", "tag3"])
+
+    @patch(
+        "openslides.core.models.HISTORY_RETENTION_DAYS_PER_COLLECTION",
+        {"core/tag": 10, "core/countdown": None},
+    )
+    def test_prune_per_collection(self):
+        self.add_tag(1, "tag1", 20)
+        self.add_tag(1, "tag2", 15)
+        self.add_tag(1, "tag3", 12)
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=1, collection_string="core/countdown", full_data={"id": 1}
+                )
+                for _ in range(2)
+            ],
+            history_time=timezone.now() - datetime.timedelta(days=100),
+        )
+
+        self.assertEqual(self.prune(), 1)
+
+        self.assertEqual(
+            History.objects.filter(element_id="core/countdown:1").count(), 2
+        )
+
+    def test_command(self):
+        self.add_tag(1, "tag1", 100)
+        self.add_tag(1, "tag2", 50)
+        self.add_tag(1, "tag3", 40)
+
+        call_command("prunehistory", stdout=None)
+
+        self.assertEqual(self.get_names(1), ["tag1", "tag3"])
+
+    @patch("openslides.core.views.HistoryInformationView.rebuild_history")
+    def test_delete(self, rebuild_history):
+        self.add_tag(1, "tag1", 1)
+        self.client.login(username="admin", password="admin")
+
+        response = self.client.delete(reverse("core_history_information"))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(History.objects.exists())
+        self.assertFalse(HistoryData.objects.exists())
+        progress = HistoryBuildProgress.objects.get()
+        self.assertEqual((progress.collection, progress.last_id), ("", 0))
+        rebuild_history.assert_called_once()
+
+
+@patch("openslides.core.models.HISTORY_BUILD_CHUNK_SIZE", 2)
+class BuildHistory(TestCase):
+    def get_all_element_ids(self):
+        all_data = async_to_sync(element_cache.get_all_data_list)()
+        return sorted(
+            f"{collection}:{full_data['id']}"
+            for collection, collection_data in all_data.items()
+            for full_data in collection_data
+        )
+
+    def get_history_element_ids(self):
+        return sorted(History.objects.values_list("element_id", flat=True))
+
+    def test_build(self):
+        History.objects.clear()
+
+        History.objects.build_history()
+
+        self.assertEqual(self.get_history_element_ids(), self.get_all_element_ids())
+
+    def test_resume(self):
+        History.objects.clear()
+        add_missing_elements = History.objects.add_missing_elements
+        calls = []
+
+        def interrupted_add_missing_elements(elements):
+            calls.append(elements)
+            if len(calls) == 3:
+                raise RuntimeError
+            return add_missing_elements(elements)
+
+        with patch(
+            "openslides.core.models.HistoryManager.add_missing_elements",
+            side_effect=interrupted_add_missing_elements,
+        ):
+            with self.assertRaises(RuntimeError):
+                History.objects.build_history()
+        # A change after the interruption.
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=1, collection_string="users/user", full_data={"id": 1}
+                )
+            ]
+        )
+
+        progress = HistoryBuildProgress.objects.get()
+        with patch(
+            "openslides.core.models.HistoryManager.add_missing_elements",
+            side_effect=add_missing_elements,
+        ) as resumed_add_missing_elements:
+            History.objects.build_history()
+
+        self.assertEqual(self.get_history_element_ids(), self.get_all_element_ids())
+        first_element = resumed_add_missing_elements.call_args_list[0][0][0][0]
+        self.assertGreaterEqual(
+            (first_element["collection_string"], first_element["id"]),
+            (progress.collection, progress.last_id + 1),
+        )
+        self.assertFalse(HistoryBuildProgress.objects.exists())
+
+    def test_not_empty(self):
+        History.objects.clear()
+        History.objects.add_elements(
+            [
+                AutoupdateElement(
+                    id=1, collection_string="users/user", full_data={"id": 1}
+                )
+            ]
+        )
+
+        with self.assertLogs("openslides.core.models", "INFO") as logs:
+            History.objects.build_history()
+
+        self.assertEqual(self.get_history_element_ids(), ["users/user:1"])
+        self.assertIn("The history is not empty", logs.output[0])
+
+    def test_locked(self):
+        History.objects.clear()
+        async_to_sync(locking.set)("build_cache")
+        try:
+            with self.assertLogs("openslides.core.models", "INFO") as logs:
+                History.objects.build_history()
+        finally:
+            async_to_sync(locking.delete)("build_cache")
+
+        self.assertFalse(History.objects.exists())
+        self.assertIn("The lock build_cache is held", logs.output[0])
+
+    def test_complete(self):
+        History.objects.clear()
+        History.objects.build_history()
+
+        with patch(
+            "openslides.core.models.HistoryManager.add_missing_elements"
+        ) as add_missing_elements:
+            History.objects.build_history()
+
+        add_missing_elements.assert_not_called()
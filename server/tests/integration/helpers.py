@@ -30,6 +30,9 @@ class TConfig:
             config.key_to_id[item.name] = id + 1
         return elements
 
+    def restriction_is_user_specific(self) -> bool:
+        return False
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -69,6 +72,9 @@ class TUser:
             }
         ]
 
+    def restriction_is_user_specific(self) -> bool:
+        return False
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -91,6 +97,9 @@ class TProjector:
             {"id": 2, "elements": [{"name": "test/slide2", "id": 1}]},
         ]
 
+    def restriction_is_user_specific(self) -> bool:
+        return False
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -7,6 +7,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from openslides.mediafiles.models import Mediafile
+from openslides.users.models import Group
 from tests.count_queries import count_queries
 from tests.test_case import TestCase
 
@@ -18,7 +19,6 @@ def test_mediafiles_db_queries():
     * 1 requests to get the list of all files
     * 1 request to get all lists of speakers.
     * 1 request to get all groups
-    * 1 request to prefetch parents
     """
     for index in range(10):
         Mediafile.objects.create(
@@ -27,7 +27,7 @@ def test_mediafiles_db_queries():
             mediafile=SimpleUploadedFile(f"some_file{index}", b"some content."),
         )
 
-    assert count_queries(Mediafile.get_elements)() == 4
+    assert count_queries(Mediafile.get_elements)() == 3
 
 
 class TestCreation(TestCase):
@@ -278,3 +278,75 @@ class TestUpdate(TestCase):
         mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
         self.assertTrue(mediafile.parent)
         self.assertEqual(mediafile.parent.pk, self.dir.pk)
+
+    def test_update_directory_access_groups(self):
+        response = self.client.put(
+            reverse("mediafile-detail", args=[self.dir.pk]),
+            {"title": self.dir.title, "access_groups_id": [2, 4]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dir = Mediafile.objects.get(pk=self.dir.pk)
+        self.assertEqual(sorted(dir.inherited_access_groups_id), [2, 4])
+        mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
+        self.assertEqual(sorted(mediafile.inherited_access_groups_id), [2, 4])
+        mediafile = Mediafile.objects.get(pk=self.mediafileB.pk)
+        self.assertEqual(mediafile.inherited_access_groups_id, True)
+
+
+class TestMove(TestCase):
+    """
+    Tree:
+    -dirA (access groups 3)
+      -mediafileA (access groups 3, 4)
+    -dirB (access groups 4)
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.login(username="admin", password="admin")
+        self.dirA = Mediafile.objects.create(title="dirA", is_directory=True)
+        self.dirA.access_groups.set([3])
+        self.mediafileA = Mediafile.objects.create(
+            title="mediafileA",
+            original_filename="some_fileA.ext",
+            mediafile=SimpleUploadedFile("some_fileA.ext", b"some content."),
+            parent=self.dirA,
+        )
+        self.mediafileA.access_groups.set([3, 4])
+        self.dirB = Mediafile.objects.create(title="dirB", is_directory=True)
+        self.dirB.access_groups.set([4])
+
+    def test_inherited_fields(self):
+        mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
+        self.assertEqual(mediafile.path, "dirA/some_fileA.ext")
+        self.assertEqual(mediafile.inherited_access_groups_id, [3])
+
+    def test_clear_group(self):
+        Group.objects.get(pk=4).mediafile_set.clear()
+
+        mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
+        self.assertEqual(mediafile.inherited_access_groups_id, [3])
+        directory = Mediafile.objects.get(pk=self.dirB.pk)
+        self.assertEqual(directory.inherited_access_groups_id, True)
+
+    def test_move(self):
+        response = self.client.post(
+            reverse("mediafile-move"),
+            {"ids": [self.mediafileA.pk], "directory_id": self.dirB.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
+        self.assertEqual(mediafile.path, "dirB/some_fileA.ext")
+        self.assertEqual(mediafile.inherited_access_groups_id, [4])
+
+    def test_move_directory(self):
+        response = self.client.post(
+            reverse("mediafile-move"),
+            {"ids": [self.dirA.pk], "directory_id": self.dirB.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mediafile = Mediafile.objects.get(pk=self.mediafileA.pk)
+        self.assertEqual(mediafile.path, "dirB/dirA/some_fileA.ext")
+        self.assertEqual(mediafile.inherited_access_groups_id, False)
@@ -7,7 +7,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from openslides.core.config import config
-from openslides.core.models import Tag
+from openslides.core.models import History, Tag
 from openslides.motions.models import (
     Category,
     Motion,
@@ -16,6 +16,7 @@ from openslides.motions.models import (
     MotionComment,
     MotionCommentSection,
     MotionPoll,
+    State,
     Submitter,
     Workflow,
 )
@@ -110,7 +111,7 @@ class CreateMotion(TestCase):
         The created motion should have an identifier and the admin user should
         be the submitter.
         """
-        with self.assertNumQueries(54):
+        with self.assertNumQueries(52):
             response = self.client.post(
                 reverse("motion-list"),
                 {
@@ -799,6 +800,240 @@ class ManageMultipleSubmitters(TestCase):
         self.assertEqual(self.motion2.submitters.count(), 0)
 
 
+class ManageMultipleMetadata(TestCase):
+    """
+    Tests setting the category, motion block, state, recommendation and tags
+    of multiple motions.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.login(username="admin", password="admin")
+        self.motions = [
+            Motion.objects.create(title=f"test_title_Ahm9xeiz{index}", text="text")
+            for index in range(3)
+        ]
+        self.state_id_accepted = 2  # This should be the id of the state 'accepted'.
+
+    def post(self, action, data):
+        return self.client.post(
+            reverse(f"motion-manage-multiple-{action}"),
+            json.dumps({"motions": data}),
+            content_type="application/json",
+        )
+
+    def get_history_information(self, motion):
+        return (
+            History.objects.filter(element_id=f"motions/motion:{motion.pk}")
+            .order_by("-pk")
+            .values_list("information", flat=True)
+            .first()
+        )
+
+    def test_set_category(self):
+        category = Category.objects.create(name="test_category_Ouy4ieve", prefix="C")
+        # The motions are loaded and saved at once. Only the history entries
+        # are saved one by one in the test database.
+        with self.assertNumQueries(26):
+            response = self.post(
+                "category",
+                [
+                    {"id": self.motions[0].pk, "category": category.pk},
+                    {"id": self.motions[1].pk, "category": category.pk},
+                    {"id": self.motions[2].pk, "category": None},
+                ],
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"detail": "Category of {0} motions successfully set.", "args": [3]},
+        )
+        self.assertEqual(Motion.objects.filter(category=category).count(), 2)
+        self.assertEqual(
+            self.get_history_information(self.motions[0]),
+            ["Category set to {arg1}", "test_category_Ouy4ieve"],
+        )
+        self.assertEqual(
+            self.get_history_information(self.motions[2]), ["Category removed"]
+        )
+
+    def test_set_category_non_existing_motion(self):
+        category = Category.objects.create(name="test_category_Quu0aeth")
+        response = self.post(
+            "category",
+            [
+                {"id": self.motions[0].pk, "category": category.pk},
+                {"id": 1337, "category": category.pk},
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, {"detail": "Motion {0} does not exist", "args": ["1337"]}
+        )
+        self.assertFalse(Motion.objects.filter(category=category).exists())
+
+    def test_set_non_existing_category(self):
+        response = self.post("category", [{"id": self.motions[0].pk, "category": 42}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, {"detail": "Category {0} does not exist", "args": ["42"]}
+        )
+
+    def test_set_motion_block(self):
+        old_block = MotionBlock.objects.create(title="test_block_Ohfu1xoo")
+        block = MotionBlock.objects.create(title="test_block_Eethei6c")
+        self.motions[0].motion_block = old_block
+        self.motions[0].save()
+        response = self.post(
+            "motion-block",
+            [
+                {"id": self.motions[0].pk, "motion_block": block.pk},
+                {"id": self.motions[1].pk, "motion_block": None},
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Motion.objects.get(pk=self.motions[0].pk).motion_block, block)
+        self.assertEqual(
+            self.get_history_information(self.motions[0]),
+            ["Motion block set to {arg1}", "test_block_Eethei6c"],
+        )
+        self.assertEqual(
+            self.get_history_information(self.motions[1]), ["Motion block removed"]
+        )
+        changed_autoupdate, _ = self.get_last_autoupdate()
+        self.assertIn(f"motions/motion-block:{old_block.pk}", changed_autoupdate)
+        self.assertIn(f"motions/motion-block:{block.pk}", changed_autoupdate)
+
+    def test_set_state(self):
+        Motion.objects.filter(pk__in=[motion.pk for motion in self.motions]).update(
+            identifier=None, identifier_number=None
+        )
+        Motion.objects.filter(pk=self.motions[0].pk).update(
+            identifier="test_identifier_Ieb0quo4"
+        )
+        response = self.post(
+            "state",
+            [
+                {"id": motion.pk, "state": self.state_id_accepted}
+                for motion in self.motions
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"detail": "State of {0} motions successfully set.", "args": [3]},
+        )
+        motions = Motion.objects.filter(
+            pk__in=[motion.pk for motion in self.motions]
+        ).order_by("pk")
+        self.assertEqual([motion.state.name for motion in motions], ["accepted"] * 3)
+        self.assertEqual(
+            [motion.identifier for motion in motions],
+            ["test_identifier_Ieb0quo4", "1", "2"],
+        )
+        self.assertEqual(
+            self.get_history_information(self.motions[2]),
+            ["State set to {arg1}", "accepted"],
+        )
+
+    def test_set_state_of_other_workflow(self):
+        invalid_state_id = 6  # State 'permitted'
+        response = self.post(
+            "state", [{"id": self.motions[0].pk, "state": invalid_state_id}]
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {
+                "detail": "You can not set the state to {0}.",
+                "args": [str(invalid_state_id)],
+            },
+        )
+        self.assertEqual(
+            Motion.objects.get(pk=self.motions[0].pk).state.name, "submitted"
+        )
+
+    def test_set_recommendation(self):
+        self.motions[1].set_recommendation(self.state_id_accepted)
+        self.motions[1].save()
+        with self.assertNumQueries(24):
+            response = self.post(
+                "recommendation",
+                [
+                    {
+                        "id": self.motions[0].pk,
+                        "recommendation": self.state_id_accepted,
+                    },
+                    {"id": self.motions[1].pk, "recommendation": 0},
+                ],
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            Motion.objects.get(pk=self.motions[0].pk).recommendation_id,
+            self.state_id_accepted,
+        )
+        self.assertIsNone(Motion.objects.get(pk=self.motions[1].pk).recommendation)
+        self.assertEqual(
+            self.get_history_information(self.motions[0]),
+            ["Recommendation set to {arg1}", "Acceptance"],
+        )
+        self.assertEqual(
+            self.get_history_information(self.motions[1]),
+            ["Recommendation set to {arg1}", "None"],
+        )
+
+    def test_set_invalid_recommendation(self):
+        invalid_state_id = State.objects.get(
+            workflow=self.motions[0].workflow_id, name="submitted"
+        ).pk
+        response = self.post(
+            "recommendation",
+            [{"id": self.motions[0].pk, "recommendation": invalid_state_id}],
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {
+                "detail": "You can not set the recommendation to {0}.",
+                "args": [str(invalid_state_id)],
+            },
+        )
+
+    def test_set_tags(self):
+        tag1 = Tag.objects.create(name="test_tag_Iel9ohri")
+        tag2 = Tag.objects.create(name="test_tag_oowoh3Ah")
+        self.motions[0].tags.add(tag1)
+        self.motions[1].tags.add(tag1)
+        response = self.post(
+            "tags",
+            [
+                {"id": self.motions[0].pk, "tags": [tag1.pk, tag2.pk]},
+                {"id": self.motions[1].pk, "tags": [tag2.pk]},
+                {"id": self.motions[2].pk, "tags": []},
+            ],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, {"detail": "{0} motions successfully updated.", "args": [3]}
+        )
+        self.assertEqual(
+            set(self.motions[0].tags.values_list("pk", flat=True)), {tag1.pk, tag2.pk}
+        )
+        self.assertEqual(
+            list(self.motions[1].tags.values_list("pk", flat=True)), [tag2.pk]
+        )
+        self.assertFalse(self.motions[2].tags.exists())
+
+    def test_set_non_existing_tag(self):
+        tag = Tag.objects.create(name="test_tag_Mai8ceit")
+        response = self.post("tags", [{"id": self.motions[0].pk, "tags": [tag.pk, 42]}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, {"detail": "Tag {0} does not exist", "args": ["42"]}
+        )
+        self.assertFalse(self.motions[0].tags.exists())
+
+
 class SupportMotion(TestCase):
     """
     Tests supporting a motion.
@@ -896,6 +1131,29 @@ class SetState(TestCase):
         )
         self.assertEqual(Motion.objects.get(pk=self.motion.pk).state.name, "submitted")
 
+    def test_manage_multiple_state(self):
+        response = self.client.post(
+            reverse("motion-manage-multiple-state"),
+            {"motions": [{"id": self.motion.pk, "state": self.state_id_accepted}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Motion.objects.get(pk=self.motion.pk).state.name, "accepted")
+
+    def test_manage_multiple_state_invalid_item(self):
+        response = self.client.post(
+            reverse("motion-manage-multiple-state"),
+            {
+                "motions": [
+                    {"id": self.motion.pk, "state": self.state_id_accepted},
+                    {"id": self.motion.pk + 1, "state": self.state_id_accepted},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Motion.objects.get(pk=self.motion.pk).state.name, "submitted")
+
 
 class SetRecommendation(TestCase):
     """
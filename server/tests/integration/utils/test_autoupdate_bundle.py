@@ -0,0 +1,473 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime, timezone
+from typing import Any, List
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+
+from openslides.agenda.models import Item, ListOfSpeakers
+from openslides.core.models import History, Tag
+from openslides.motions.models import Motion
+from openslides.utils.autoupdate import inform_changed_data
+from openslides.utils.autoupdate_bundle import (
+    AutoupdateBundle,
+    AutoupdateElement,
+    AutoupdatePipeline,
+    HistoryWriter,
+    async_autoupdate_bundle,
+    autoupdate_bundle,
+)
+from openslides.utils.cache import element_cache
+from tests.count_queries import count_queries
+from tests.test_case import TestCase
+
+
+class TestAutoupdateBundleContext(TestCase):
+    def advancedSetUp(self):
+        self.tag = Tag(name="tag")
+        self.tag.save(skip_autoupdate=True)
+
+    def get_cached_tag(self):
+        return async_to_sync(element_cache.get_element_data)(
+            Tag.get_collection_string(), self.tag.pk
+        )
+
+    def test_nested(self):
+        with autoupdate_bundle() as bundle:
+            with autoupdate_bundle() as inner_bundle:
+                inform_changed_data(self.tag)
+
+            self.assertIs(inner_bundle, bundle)
+            self.assertIsNone(self.get_cached_tag())
+
+        self.assertEqual(self.get_cached_tag()["name"], "tag")
+
+    def test_thread(self):
+        with autoupdate_bundle() as bundle:
+            context = copy_context()
+            with ThreadPoolExecutor() as executor:
+                executor.submit(context.run, inform_changed_data, self.tag).result()
+
+            self.assertIn(self.tag.pk, bundle.autoupdate_elements["core/tag"])
+
+        self.assertEqual(self.get_cached_tag()["name"], "tag")
+
+    def test_async(self):
+        async def add_tag():
+            async with async_autoupdate_bundle() as bundle:
+                bundle.add(
+                    [AutoupdateElement(id=self.tag.pk, collection_string="core/tag")]
+                )
+                async with async_autoupdate_bundle() as inner_bundle:
+                    self.assertIs(inner_bundle, bundle)
+
+        async_to_sync(add_tag)()
+
+        self.assertEqual(self.get_cached_tag()["name"], "tag")
+
+
+class TestAutoupdateBundleMiddleware(TestCase):
+    def test_change_id_in_response(self):
+        self.client.login(username="admin", password="admin")
+
+        response = self.client.post(reverse("tag-list"), {"name": "tag"})
+
+        content = json.loads(response.content)
+        self.assertEqual(
+            content["change_id"],
+            async_to_sync(element_cache.get_current_change_id)(),
+        )
+        self.assertEqual(content["data"], {"id": Tag.objects.get().pk})
+
+
+class TestAutoupdatePipeline(TestCase):
+    def advancedSetUp(self):
+        self.pipeline = AutoupdatePipeline(delay=0)
+        self.tag = Tag(name="tag")
+        self.tag.save(skip_autoupdate=True)
+
+    def get_bundle(self, information):
+        bundle = AutoupdateBundle()
+        bundle.add(
+            [
+                AutoupdateElement(
+                    id=self.tag.pk,
+                    collection_string=Tag.get_collection_string(),
+                    information=[information],
+                )
+            ]
+        )
+        return bundle
+
+    def test_process(self):
+        first_change_id = async_to_sync(element_cache.reserve_change_id)()
+        self.tag.name = "tag1"
+        self.tag.save(skip_autoupdate=True)
+        second_change_id = async_to_sync(element_cache.reserve_change_id)()
+        self.tag.name = "tag2"
+        self.tag.save(skip_autoupdate=True)
+
+        change_id = self.pipeline.process(
+            [
+                (first_change_id, self.get_bundle("first")),
+                (second_change_id, self.get_bundle("second")),
+            ]
+        )
+
+        self.assertGreaterEqual(change_id, second_change_id)
+        self.assertEqual(
+            async_to_sync(element_cache.get_current_change_id)(), change_id
+        )
+        tag = async_to_sync(element_cache.get_element_data)(
+            Tag.get_collection_string(), self.tag.pk
+        )
+        self.assertEqual(tag["name"], "tag2")
+        history = History.objects.filter(element_id=self.tag.get_element_id())
+        self.assertEqual(
+            sorted(entry.information for entry in history), [["first"], ["second"]]
+        )
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_history_of_each_bundle(self, close_old_connections):
+        first_change_id = async_to_sync(element_cache.reserve_change_id)()
+        self.tag.name = "tag1"
+        self.tag.save(skip_autoupdate=True)
+        with patch.object(self.pipeline, "ensure_worker"):
+            self.pipeline._put(first_change_id, self.get_bundle("first"))
+            second_change_id = async_to_sync(element_cache.reserve_change_id)()
+            self.tag.name = "tag2"
+            self.tag.save(skip_autoupdate=True)
+            self.pipeline._put(second_change_id, self.get_bundle("second"))
+        self.pipeline.queue.put(None)
+        self.pipeline.run()
+
+        history = History.objects.filter(
+            element_id=self.tag.get_element_id()
+        ).select_related("full_data__keyframe")
+        self.assertEqual(
+            sorted(
+                (entry.information, entry.full_data.get_full_data()["name"])
+                for entry in history
+            ),
+            [(["first"], "tag1"), (["second"], "tag2")],
+        )
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_process_separately_after_error(self, close_old_connections):
+        items = [
+            (
+                async_to_sync(element_cache.reserve_change_id)(),
+                self.get_bundle("first"),
+            ),
+            (
+                async_to_sync(element_cache.reserve_change_id)(),
+                self.get_bundle("second"),
+            ),
+        ]
+        process = self.pipeline.process
+        calls: List[Any] = []
+
+        def failing_process(items):
+            calls.append(items)
+            if len(calls) == 1:
+                raise RuntimeError("failed")
+            return process(items)
+
+        with patch.object(self.pipeline, "process", failing_process):
+            for item in items:
+                self.pipeline.queue.put(item)
+            self.pipeline.queue.put(None)
+            self.pipeline.run()
+
+        self.assertEqual(calls[1:], [[items[0]], [items[1]]])
+        self.assertEqual(
+            async_to_sync(element_cache.get_current_change_id)(), items[1][0]
+        )
+        history = History.objects.filter(element_id=self.tag.get_element_id())
+        self.assertEqual(
+            sorted(entry.information for entry in history), [["first"], ["second"]]
+        )
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_process_separately_dispatches_failing_bundle(self, close_old_connections):
+        change_id = async_to_sync(element_cache.reserve_change_id)()
+
+        with patch.object(self.pipeline, "process", side_effect=RuntimeError):
+            self.pipeline.process_separately([(change_id, self.get_bundle("first"))])
+
+        self.assertEqual(
+            async_to_sync(element_cache.get_current_change_id)(), change_id
+        )
+
+    def test_put_resolves_bundles_with_history(self):
+        bundle = self.get_bundle("first")
+        bundle_without_history = self.get_bundle("second")
+        bundle_without_history.disable_history()
+
+        with patch.object(self.pipeline, "ensure_worker"):
+            self.pipeline._put(1, bundle)
+            self.pipeline._put(2, bundle_without_history)
+
+        self.assertIn("full_data", next(iter(bundle.element_iterator)))
+        self.assertNotIn(
+            "full_data", next(iter(bundle_without_history.element_iterator))
+        )
+
+    def test_process_disable_history(self):
+        bundle = self.get_bundle("first")
+        bundle.disable_history()
+        change_id = async_to_sync(element_cache.reserve_change_id)()
+
+        self.pipeline.process([(change_id, bundle)])
+
+        self.assertFalse(
+            History.objects.filter(element_id=self.tag.get_element_id()).exists()
+        )
+
+
+class TestHistoryWriter(TestCase):
+    def advancedSetUp(self):
+        self.writer = HistoryWriter(delay=0, batch_size=2)
+
+    def get_change(self, timestamp, *names):
+        return (
+            datetime.fromtimestamp(timestamp, timezone.utc),
+            [
+                AutoupdateElement(
+                    id=id, collection_string="core/tag", full_data={"name": name}
+                )
+                for id, name in enumerate(names, start=1)
+            ],
+        )
+
+    def get_history(self):
+        return [
+            (entry.element_id, entry.now.timestamp(), entry.full_data.get_full_data())
+            for entry in History.objects.filter(element_id__startswith="core/tag:")
+            .select_related("full_data__keyframe")
+            .order_by("id")
+        ]
+
+    def test_get_batch(self):
+        changes = [
+            self.get_change(1000, "tag1", "tag2", "tag3"),
+            self.get_change(2000, "tag1"),
+        ]
+
+        self.assertEqual(self.writer.get_batch(changes), changes[:1])
+        self.assertEqual(self.writer.get_batch(changes[1:]), changes[1:])
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_run(self, close_old_connections):
+        self.writer.queue.put(self.get_change(1000, "tag1", "tag2"))
+        self.writer.queue.put(self.get_change(2000, "tag1 changed"))
+        self.writer.queue.put(None)
+
+        self.writer.run()
+
+        self.assertEqual(
+            self.get_history(),
+            [
+                ("core/tag:1", 1000, {"name": "tag1"}),
+                ("core/tag:2", 1000, {"name": "tag2"}),
+                ("core/tag:1", 2000, {"name": "tag1 changed"}),
+            ],
+        )
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_history_without_cache_data(self, close_old_connections):
+        tag = Tag(name="tag")
+        tag.save(skip_autoupdate=True)
+        bundle = AutoupdateBundle()
+        bundle.add([AutoupdateElement(id=tag.pk, collection_string="core/tag")])
+
+        with patch(
+            "openslides.utils.autoupdate_bundle.use_history_writer", True
+        ), patch(
+            "openslides.utils.autoupdate_bundle.history_writer", self.writer
+        ), patch(
+            "openslides.utils.autoupdate_bundle.transaction.on_commit",
+            lambda func: func(),
+        ), patch.object(
+            self.writer, "ensure_worker"
+        ):
+            bundle.done()
+        self.writer.queue.put(None)
+        self.writer.run()
+
+        history = History.objects.get(element_id=tag.get_element_id())
+        self.assertEqual(
+            history.full_data.get_full_data(), {"id": tag.pk, "name": "tag"}
+        )
+
+    @patch("openslides.utils.autoupdate_bundle.close_old_connections")
+    def test_run_drops_failing_batch(self, close_old_connections):
+        self.writer.queue.put(self.get_change(1000, "tag1", "tag2"))
+        self.writer.queue.put(self.get_change(2000, "tag1 changed"))
+        write = self.writer.write
+        attempts: List[Any] = []
+
+        def failing_write(changes):
+            if changes[0][0].timestamp() == 1000:
+                attempts.append(changes)
+                raise RuntimeError("failed")
+            write(changes)
+            self.writer.queue.put(None)
+
+        with patch.object(self.writer, "write", failing_write):
+            with self.assertLogs("openslides.utils.autoupdate_bundle", "ERROR") as logs:
+                self.writer.run()
+
+        self.assertEqual(len(attempts), 3)
+        self.assertIn(
+            "Dropped the history of the elements ['core/tag:1', 'core/tag:2']",
+            logs.output[-1],
+        )
+        self.assertEqual(
+            self.get_history(), [("core/tag:1", 2000, {"name": "tag1 changed"})]
+        )
+
+
+@patch("openslides.utils.autoupdate_bundle.use_stream_deltas", True)
+class TestStreamDeltas(TestCase):
+    def advancedSetUp(self):
+        self.tag = Tag(name="tag")
+        self.tag.save()
+
+    def test_send_patches(self):
+        self.tag.name = "changed"
+        self.tag.save(skip_autoupdate=True)
+        new_tag = Tag(name="new")
+        new_tag.save(skip_autoupdate=True)
+        bundle = AutoupdateBundle()
+        bundle.add(
+            [
+                AutoupdateElement(id=tag.pk, collection_string="core/tag")
+                for tag in (self.tag, new_tag)
+            ]
+        )
+
+        with patch("openslides.utils.autoupdate_bundle.stream.send") as send:
+            change_id = bundle.done()
+
+        send.assert_called_once()
+        stream_name, payload = send.call_args[0]
+        self.assertEqual(stream_name, "autoupdate")
+        self.assertEqual(payload["change_id"], change_id)
+        self.assertEqual(list(payload["elements"]), [new_tag.get_element_id()])
+        self.assertEqual(list(payload["patches"]), [self.tag.get_element_id()])
+        self.assertEqual(
+            payload["patches"][self.tag.get_element_id()]["changed"],
+            {"name": "changed"},
+        )
+
+
+@patch("openslides.utils.autoupdate_bundle.skip_unchanged", True)
+class TestSkipUnchanged(TestCase):
+    def advancedSetUp(self):
+        self.tag = Tag(name="tag")
+        self.tag.save()
+
+    def get_bundle(self, force=False):
+        bundle = AutoupdateBundle()
+        bundle.add(
+            [
+                AutoupdateElement(
+                    id=self.tag.pk,
+                    collection_string=Tag.get_collection_string(),
+                    force=force,
+                )
+            ]
+        )
+        return bundle
+
+    def test_unchanged(self):
+        current_change_id = async_to_sync(element_cache.get_current_change_id)()
+        history_count = History.objects.count()
+
+        change_id = self.get_bundle().done()
+
+        self.assertEqual(change_id, current_change_id)
+        self.assertEqual(History.objects.count(), history_count)
+
+    def test_changed(self):
+        current_change_id = async_to_sync(element_cache.get_current_change_id)()
+        self.tag.name = "changed"
+        self.tag.save(skip_autoupdate=True)
+
+        change_id = self.get_bundle().done()
+
+        self.assertGreater(change_id, current_change_id)
+
+    def test_unchanged_with_force(self):
+        current_change_id = async_to_sync(element_cache.get_current_change_id)()
+
+        change_id = self.get_bundle(force=True).done()
+
+        self.assertGreater(change_id, current_change_id)
+
+    def test_force_of_replaced_element(self):
+        current_change_id = async_to_sync(element_cache.get_current_change_id)()
+        bundle = self.get_bundle(force=True)
+        bundle.add(self.get_bundle().element_iterator)
+
+        change_id = bundle.done()
+
+        self.assertGreater(change_id, current_change_id)
+
+    def test_pipeline_unchanged(self):
+        pipeline = AutoupdatePipeline(delay=0)
+        history_count = History.objects.count()
+        change_id = async_to_sync(element_cache.reserve_change_id)()
+
+        self.assertEqual(pipeline.process([(change_id, self.get_bundle())]), change_id)
+        self.assertEqual(
+            async_to_sync(element_cache.get_current_change_id)(), change_id
+        )
+        self.assertEqual(History.objects.count(), history_count)
+
+
+class TestResolveFullData(TestCase):
+    """
+    Resolves motions with their agenda items and lists of speakers, like e.g.
+    a numbering of the agenda or a sorting of motions does.
+    """
+
+    def advancedSetUp(self):
+        for index in range(20):
+            Motion.objects.create(title=f"motion{index}", text="text")
+        self.bundle = AutoupdateBundle()
+        self.models: List[Any] = [Motion, Item, ListOfSpeakers]
+        for model in self.models:
+            self.bundle.add(
+                AutoupdateElement(
+                    id=pk, collection_string=model.get_collection_string()
+                )
+                for pk in model.objects.values_list("pk", flat=True)
+            )
+
+    def test_db_queries(self):
+        """
+        The content objects of the agenda items and lists of speakers are the
+        already loaded motions and the items have no parents. So three queries
+        are saved compared to loading every collection on its own.
+        """
+        separate_queries = sum(
+            count_queries(model.get_elements)() for model in self.models
+        )
+
+        self.assertEqual(count_queries(self.bundle.resolve_full_data)(), 15)
+        self.assertEqual(separate_queries, 18)
+
+    def test_full_data(self):
+        self.bundle.resolve_full_data()
+
+        for model in self.models:
+            elements = self.bundle.autoupdate_elements[model.get_collection_string()]
+            self.assertEqual(
+                {element["id"]: element["full_data"] for element in elements.values()},
+                {full_data["id"]: full_data for full_data in model.get_elements()},
+            )
@@ -0,0 +1,156 @@
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+
+from openslides.core.models import Tag
+from openslides.utils.autoupdate_server import application
+from openslides.utils.cache import element_cache
+from tests.test_case import TestCase
+
+
+class TestAutoupdateServer(TestCase):
+    def get_communicator(self, path, query_string="", headers=None, login=True):
+        if headers is None:
+            headers = []
+        if login:
+            session_key = self.client.session.session_key
+            headers.append(
+                (b"cookie", f"{settings.SESSION_COOKIE_NAME}={session_key}".encode())
+            )
+        return ApplicationCommunicator(
+            application,
+            {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": query_string.encode(),
+                "headers": headers,
+            },
+        )
+
+    async def get_response(self, *args, timeout=1, **kwargs):
+        communicator = self.get_communicator(*args, **kwargs)
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output(timeout)
+        body = await communicator.receive_output(timeout)
+        return start["status"], body["body"]
+
+    def get_change_id(self):
+        return async_to_sync(element_cache.get_current_change_id)()
+
+    def test_health(self):
+        status, body = async_to_sync(self.get_response)("/system/health")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {"healthy": True})
+
+    def test_not_logged_in(self):
+        status, _ = async_to_sync(self.get_response)("/system/autoupdate", login=False)
+
+        self.assertEqual(status, 403)
+
+    def test_long_poll_all_data(self):
+        status, body = async_to_sync(self.get_response)(
+            "/system/autoupdate", "change_id=0&single=1"
+        )
+
+        self.assertEqual(status, 200)
+        autoupdate = json.loads(body)
+        self.assertEqual(autoupdate["from_change_id"], 0)
+        self.assertIn("users/user", autoupdate["changed"])
+
+    def test_long_poll_all_data_with_snapshot(self):
+        status, body = async_to_sync(self.get_response)(
+            "/system/autoupdate", "change_id=0&single=1"
+        )
+        with patch("openslides.utils.autoupdate.AUTOUPDATE_SNAPSHOT_INTERVAL", 10):
+            with patch("openslides.utils.cache.AUTOUPDATE_SNAPSHOT_INTERVAL", 10):
+                # The first request creates the snapshot, the second one uses it.
+                for _ in range(2):
+                    snapshot_status, snapshot_body = async_to_sync(self.get_response)(
+                        "/system/autoupdate", "change_id=0&single=1"
+                    )
+
+                    self.assertEqual(snapshot_status, 200)
+                    self.assertEqual(json.loads(snapshot_body), json.loads(body))
+
+    def test_long_poll_change(self):
+        change_id = self.get_change_id()
+
+        async def long_poll():
+            communicator = self.get_communicator(
+                "/system/autoupdate", f"change_id={change_id}&single=1"
+            )
+            await communicator.send_input({"type": "http.request"})
+            await sync_to_async(Tag.objects.create)(name="tag")  # type: ignore
+            await communicator.receive_output(2)
+            return json.loads((await communicator.receive_output(2))["body"])
+
+        autoupdate = async_to_sync(long_poll)()
+
+        self.assertEqual(autoupdate["from_change_id"], change_id)
+        self.assertEqual(autoupdate["changed"]["core/tag"][0]["name"], "tag")
+
+    @patch(
+        "openslides.utils.autoupdate_server.AUTOUPDATE_SERVER_LONG_POLL_TIMEOUT", 0.2
+    )
+    def test_long_poll_timeout(self):
+        status, body = async_to_sync(self.get_response)(
+            "/system/autoupdate", f"change_id={self.get_change_id()}&single=1"
+        )
+
+        self.assertEqual(status, 204)
+
+    def test_stream(self):
+        async def stream():
+            communicator = self.get_communicator("/system/autoupdate", "change_id=0")
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(2)
+            first = await communicator.receive_output(2)
+            await sync_to_async(Tag.objects.create)(name="tag")  # type: ignore
+            second = await communicator.receive_output(2)
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(2)
+            return start, first["body"], second["body"]
+
+        start, first, second = async_to_sync(stream)()
+
+        self.assertIn((b"content-type", b"application/x-ndjson"), start["headers"])
+        self.assertTrue(first.endswith(b"\n"))
+        first_autoupdate = json.loads(first)
+        second_autoupdate = json.loads(second)
+        self.assertEqual(
+            second_autoupdate["from_change_id"], first_autoupdate["to_change_id"]
+        )
+        self.assertEqual(second_autoupdate["changed"]["core/tag"][0]["name"], "tag")
+
+    def test_server_sent_events(self):
+        async def stream():
+            communicator = self.get_communicator(
+                "/system/autoupdate",
+                "change_id=0",
+                headers=[(b"accept", b"text/event-stream")],
+            )
+            await communicator.send_input({"type": "http.request"})
+            start = await communicator.receive_output(2)
+            body = await communicator.receive_output(2)
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(2)
+            return start, body["body"]
+
+        start, body = async_to_sync(stream)()
+
+        self.assertIn((b"content-type", b"text/event-stream"), start["headers"])
+        self.assertTrue(body.startswith(b"data: {"))
+        self.assertTrue(body.endswith(b"\n\n"))
+
+    @patch("openslides.utils.autoupdate_server.AUTOUPDATE_SERVER_MAX_CONNECTIONS", 0)
+    def test_too_many_connections(self):
+        status, _ = async_to_sync(self.get_response)(
+            "/system/autoupdate", "change_id=0"
+        )
+
+        self.assertEqual(status, 503)
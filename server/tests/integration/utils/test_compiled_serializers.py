@@ -0,0 +1,98 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from openslides.agenda.models import Item
+from openslides.assignments.models import Assignment, AssignmentPoll
+from openslides.chat.models import ChatGroup, ChatMessage
+from openslides.core.models import Tag
+from openslides.mediafiles.models import Mediafile
+from openslides.motions.models import (
+    Category,
+    Motion,
+    MotionBlock,
+    MotionChangeRecommendation,
+    MotionComment,
+    MotionCommentSection,
+    MotionPoll,
+    MotionVote,
+    Submitter,
+)
+from openslides.topics.models import Topic
+from openslides.users.models import Group, PersonalNote, User
+from openslides.utils.cache import element_cache
+from tests.test_case import TestCase
+
+
+class TestCompiledSerializers(TestCase):
+    """
+    Tests, that the compiled serializers return the same full_data as the
+    serializers for all collections.
+    """
+
+    def setUp(self):
+        admin = User.objects.get(username="admin")
+        delegate = User.objects.create_user(username="delegate", password="delegate")
+        delegate.groups.add(Group.objects.get(pk=3))
+        delegate.vote_delegated_to = admin
+        delegate.save()
+        PersonalNote.objects.create(user=admin, notes={"motions/motion": {}})
+
+        tag = Tag.objects.create(name="tag")
+        directory = Mediafile.objects.create(title="directory", is_directory=True)
+        directory.access_groups.add(Group.objects.get(pk=2))
+        topic = Topic.objects.create(title="topic")
+        topic.agenda_item.type = Item.INTERNAL_ITEM
+        topic.agenda_item.save()
+
+        category = Category.objects.create(name="category", prefix="C")
+        Category.objects.create(name="sub category", prefix="S", parent=category)
+        block = MotionBlock.objects.create(title="block")
+        motion = Motion.objects.create(
+            title="motion", text="text", category=category, motion_block=block
+        )
+        motion.tags.add(tag)
+        motion.supporters.add(delegate)
+        Submitter.objects.add(admin, motion)
+        Motion.objects.create(title="amendment", text="text", parent=motion)
+        section = MotionCommentSection.objects.create(name="section")
+        section.read_groups.add(Group.objects.get(pk=2))
+        MotionComment.objects.create(motion=motion, section=section, comment="c")
+        MotionChangeRecommendation.objects.create(
+            motion=motion, line_from=1, line_to=2, text="text", author=admin
+        )
+        poll = MotionPoll.objects.create(
+            motion=motion, title="poll", pollmethod="YN", type="named"
+        )
+        poll.create_options()
+        poll.groups.add(Group.objects.get(pk=3))
+        poll.voted.add(delegate)
+        MotionVote.objects.create(
+            user=delegate,
+            delegated_user=admin,
+            option=poll.options.get(),
+            value="Y",
+            weight=Decimal(1),
+        )
+
+        assignment = Assignment.objects.create(title="assignment", open_posts=1)
+        assignment.add_candidate(admin)
+        assignment.tags.add(tag)
+        assignment_poll = AssignmentPoll.objects.create(
+            assignment=assignment, title="poll", pollmethod="YNA", type="analog"
+        )
+        assignment_poll.create_options()
+
+        chat_group = ChatGroup.objects.create(name="chat")
+        chat_group.read_groups.add(Group.objects.get(pk=2))
+        ChatMessage.objects.create(
+            text="message", chatgroup=chat_group, username="admin", user_id=admin.pk
+        )
+
+    def test_full_data(self):
+        for collection, cachable in element_cache.cachables.items():
+            with patch("openslides.utils.models.COMPILED_SERIALIZERS", False):
+                expected = cachable.get_elements()
+            with patch("openslides.utils.models.COMPILED_SERIALIZERS", True):
+                compiled = cachable.get_elements()
+
+            self.assertEqual(compiled, expected, collection)
@@ -0,0 +1,201 @@
+import json
+from unittest.mock import patch
+
+from django.urls import reverse
+from rest_framework import status
+
+from openslides.core.config import config
+from openslides.core.models import Tag
+from tests.test_case import TestCase
+
+
+class TestListQueryParams(TestCase):
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        for name in ("tag1", "tag2", "tag3", "42"):
+            Tag.objects.create(name=name)
+        self.ids = list(Tag.objects.order_by("id").values_list("id", flat=True))
+
+    def get_list(self, **params):
+        response = self.client.get(reverse("tag-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_filter(self):
+        response = self.get_list(name="tag2")
+
+        self.assertEqual(response.data, [{"id": self.ids[1], "name": "tag2"}])
+
+    def test_filter_in(self):
+        response = self.get_list(name__in="tag1,tag3")
+
+        self.assertEqual(sorted(tag["name"] for tag in response.data), ["tag1", "tag3"])
+
+    def test_filter_json_value(self):
+        response = self.get_list(id=self.ids[3])
+        self.assertEqual(response.data, [{"id": self.ids[3], "name": "42"}])
+
+        response = self.get_list(name="42")
+        self.assertEqual(response.data, [{"id": self.ids[3], "name": "42"}])
+
+    def test_filter_unknown_field(self):
+        response = self.get_list(_="12345", name="tag1")
+
+        self.assertEqual(response.data, [{"id": self.ids[0], "name": "tag1"}])
+
+    def test_filter_bool(self):
+        config["general_system_enable_anonymous"] = True
+
+        response = self.client.get(
+            reverse("config-list"),
+            {"key": "general_system_enable_anonymous", "value": "1"},
+        )
+        self.assertEqual(response.data, [])
+
+        response = self.client.get(
+            reverse("config-list"),
+            {"key": "general_system_enable_anonymous", "value": "true"},
+        )
+        self.assertEqual(
+            [element["key"] for element in response.data],
+            ["general_system_enable_anonymous"],
+        )
+
+    def test_fields(self):
+        response = self.get_list(fields="name", name="tag1")
+
+        self.assertEqual(response.data, [{"id": self.ids[0], "name": "tag1"}])
+        response = self.get_list(fields="id", name="tag1")
+        self.assertEqual(response.data, [{"id": self.ids[0]}])
+
+    def test_pages(self):
+        first_page = self.get_list(limit=3).data
+        second_page = self.get_list(limit=3, cursor=first_page["next_cursor"]).data
+
+        self.assertEqual([tag["id"] for tag in first_page["results"]], self.ids[:3])
+        self.assertEqual(first_page["next_cursor"], self.ids[2])
+        self.assertEqual([tag["id"] for tag in second_page["results"]], self.ids[3:])
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_invalid_limit(self):
+        response = self.client.get(reverse("tag-list"), {"limit": "0"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch("openslides.utils.rest_api.REST_LIST_STREAMING_THRESHOLD", 1)
+    def test_streaming(self):
+        response = self.get_list(limit=3)
+
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([tag["id"] for tag in data["results"]], self.ids[:3])
+        self.assertEqual(data["next_cursor"], self.ids[2])
+
+
+class TestETag(TestCase):
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        self.tag = Tag.objects.create(name="tag")
+
+    def test_list_not_modified(self):
+        response = self.client.get(reverse("tag-list"))
+        etag = response["ETag"]
+
+        response = self.client.get(reverse("tag-list"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_retrieve_not_modified(self):
+        url = reverse("tag-detail", args=[self.tag.pk])
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_other_element(self):
+        other_tag = Tag.objects.create(name="other tag")
+        etag = self.client.get(reverse("tag-detail", args=[self.tag.pk]))["ETag"]
+        url = reverse("tag-detail", args=[other_tag.pk])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "other tag")
+
+    def test_changed(self):
+        etag = self.client.get(reverse("tag-list"))["ETag"]
+        Tag.objects.create(name="tag2")
+
+        response = self.client.get(reverse("tag-list"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data), 2)
+
+    def test_other_user(self):
+        etag = self.client.get(reverse("tag-list"))["ETag"]
+        self.client.logout()
+        config["general_system_enable_anonymous"] = True
+
+        response = self.client.get(reverse("tag-list"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestBulkRetrieve(TestCase):
+    def setUp(self):
+        self.client.login(username="admin", password="admin")
+        self.tags = [Tag.objects.create(name=f"tag{i}") for i in range(3)]
+        self.url = reverse("tag-bulk-retrieve")
+
+    def test_query(self):
+        ids = [self.tags[2].pk, 9999, self.tags[0].pk]
+
+        response = self.client.get(self.url, {"ids": ",".join(map(str, ids))})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(tag["name"] for tag in response.data["elements"]), ["tag0", "tag2"]
+        )
+        self.assertEqual(response.data["missing_ids"], [9999])
+
+    def test_empty_query(self):
+        response = self.client.get(self.url, {"ids": ""})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"elements": [], "missing_ids": []})
+
+    def test_body(self):
+        response = self.client.post(
+            self.url,
+            json.dumps({"ids": [self.tags[1].pk, 9999]}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["elements"], [{"id": self.tags[1].pk, "name": "tag1"}]
+        )
+        self.assertEqual(response.data["missing_ids"], [9999])
+
+    def test_invalid_ids(self):
+        response = self.client.get(self.url, {"ids": "1,a"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_no_permission(self):
+        self.client.logout()
+
+        response = self.client.get(self.url, {"ids": str(self.tags[0].pk)})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_permission_of_retrieve(self):
+        self.client.logout()
+        config["general_system_enable_anonymous"] = True
+
+        response = self.client.get(self.url, {"ids": str(self.tags[0].pk)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["elements"][0]["name"], "tag0")
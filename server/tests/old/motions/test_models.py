@@ -1,6 +1,8 @@
+from unittest.mock import patch
+
 from openslides.core.config import config
 from openslides.motions.exceptions import WorkflowError
-from openslides.motions.models import Motion, State, Workflow
+from openslides.motions.models import IDENTIFIER_LOCK, Motion, State, Workflow
 from openslides.users.models import User
 from tests.test_case import TestCase
 
@@ -110,3 +112,73 @@ class ModelTest(TestCase):
         motion.set_identifier()
 
         self.assertEqual(motion.identifier, "Parent identifier-2")
+
+    def test_save_skips_used_identifiers(self):
+        """
+        Identifiers, that are already used, are skipped. All used identifiers
+        are loaded with one query.
+        """
+        config["motions_identifier"] = "serially_numbered"
+        Motion.objects.filter(pk=self.motion.pk).update(
+            identifier=None, identifier_number=None
+        )
+        for identifier in ("1", "2", "3"):
+            Motion.objects.create(title="foo", identifier=identifier)
+        motion = Motion(title="bar")
+        motion.reset_state()
+        self.assertEqual(motion.identifier, "1")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                motion.increment_identifier_number(1, "", initial_increment=False),
+                (4, "4"),
+            )
+        motion.save()
+
+        self.assertEqual(motion.identifier, "4")
+
+    def test_save_identifier_used_in_the_meantime(self):
+        """
+        If the identifier was used after it was set, the next free identifier
+        is saved.
+        """
+        config["motions_identifier"] = "serially_numbered"
+        motion_1 = Motion(title="foo")
+        motion_1.reset_state()
+        motion_2 = Motion(title="bar")
+        motion_2.reset_state()
+        self.assertEqual(motion_1.identifier, motion_2.identifier)
+
+        motion_1.save()
+        motion_2.save()
+
+        self.assertEqual(motion_1.identifier_number + 1, motion_2.identifier_number)
+        self.assertEqual(
+            motion_2.identifier,
+            Motion.extend_identifier_number(motion_2.identifier_number),
+        )
+
+    def test_save_locks_only_automatic_identifiers(self):
+        config["motions_identifier"] = "serially_numbered"
+        with patch("openslides.motions.models.lock_transaction") as lock_transaction:
+            Motion.objects.create(title="foo", identifier="manual")
+            lock_transaction.assert_not_called()
+
+            motion = Motion(title="bar")
+            motion.reset_state()
+            motion.save()
+            lock_transaction.assert_called_once_with(IDENTIFIER_LOCK)
+
+            # The identifier is not checked again.
+            motion.save()
+            lock_transaction.assert_called_once()
+
+    def test_save_keeps_identifier(self):
+        config["motions_identifier"] = "serially_numbered"
+        motion = Motion.objects.create(title="foo")
+        identifier = motion.identifier
+
+        motion.title = "bar"
+        motion.save()
+
+        self.assertEqual(Motion.objects.get(pk=motion.pk).identifier, identifier)
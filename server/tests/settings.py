@@ -73,7 +73,7 @@ PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 # Deactivate restricted_data_cache
 RESTRICTED_DATA_CACHE = False
 
-REST_FRAMEWORK = {"TEST_REQUEST_DEFAULT_FORMAT": "json"}
+REST_FRAMEWORK = {**REST_FRAMEWORK, "TEST_REQUEST_DEFAULT_FORMAT": "json"}  # noqa
 
 ENABLE_ELECTRONIC_VOTING = True
 
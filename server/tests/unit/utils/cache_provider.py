@@ -28,6 +28,9 @@ class Collection1:
     def get_elements(self) -> List[Dict[str, Any]]:
         return [{"id": 1, "value": "value1"}, {"id": 2, "value": "value2"}]
 
+    def restriction_is_user_specific(self) -> bool:
+        return False
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -43,6 +46,9 @@ class Collection2:
     def get_elements(self) -> List[Dict[str, Any]]:
         return [{"id": 1, "key": "value1"}, {"id": 2, "key": "value2"}]
 
+    def restriction_is_user_specific(self) -> bool:
+        return False
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -61,6 +67,9 @@ class PersonalizedCollection:
             {"id": 2, "key": "value2", "user_id": 2},
         ]
 
+    def restriction_is_user_specific(self) -> bool:
+        return True
+
     async def restrict_elements(
         self, user_id: int, elements: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -1,5 +1,6 @@
 import json
 from typing import Any, Dict, List
+from unittest.mock import patch
 
 import pytest
 
@@ -245,6 +246,16 @@ async def test_get_element_data_full_redis(element_cache):
     assert result == {"id": 1, "value": "value1"}
 
 
+@pytest.mark.asyncio
+async def test_get_elements_data(element_cache):
+    result = await element_cache.get_elements_data("app/collection1", [2, 3, 1], 1)
+
+    assert result == [
+        {"id": 2, "value": "restricted_value2"},
+        {"id": 1, "value": "restricted_value1"},
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_all_restricted_data(element_cache):
     result = await element_cache.get_all_data_list(1)
@@ -266,6 +277,16 @@ async def test_get_all_restricted_data(element_cache):
     )
 
 
+@pytest.mark.asyncio
+async def test_get_collection_restricted_data(element_cache):
+    result = await element_cache.get_collection_restricted_data("app/collection1", 1)
+
+    assert sorted(result, key=lambda x: x["id"]) == [
+        {"id": 1, "value": "restricted_value1"},
+        {"id": 2, "value": "restricted_value2"},
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_restricted_data_change_id_0(element_cache):
     (
@@ -350,3 +371,166 @@ async def test_lowest_change_id_after_updating_lowest_element(element_cache):
 
     assert first_lowest_change_id == 0
     assert second_lowest_change_id == 0  # The lowest_change_id should not change
+
+
+@pytest.mark.asyncio
+async def test_get_collection_change_ids(element_cache):
+    first_change_id = await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "updated"}}
+    )
+    second_change_id = await element_cache.change_elements({"app/collection2:2": None})
+
+    result = await element_cache.get_collection_change_ids(
+        ["app/collection1", "app/collection2", "app/personalized-collection"]
+    )
+
+    assert result == {
+        "app/collection1": first_change_id,
+        "app/collection2": second_change_id,
+        "app/personalized-collection": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_reserve_change_id(element_cache):
+    first_change_id = await element_cache.reserve_change_id()
+    second_change_id = await element_cache.reserve_change_id()
+    change_id = await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "updated"}}, first_change_id
+    )
+
+    assert first_change_id == 1
+    assert second_change_id == 2
+    assert change_id == 1
+    assert await element_cache.reserve_change_id() == 3
+
+
+@pytest.mark.asyncio
+async def test_change_elements_with_lower_reserved_change_id(element_cache):
+    reserved_change_id = await element_cache.reserve_change_id()
+    await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "updated1"}}
+    )
+    change_id = await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "updated2"}}, reserved_change_id
+    )
+
+    assert reserved_change_id == 1
+    assert change_id == 2  # The change id must never go backwards
+
+
+@pytest.mark.asyncio
+async def test_change_elements_with_patches(element_cache):
+    element_cache.cache_provider.full_data = {
+        "app/collection1:1": '{"id": 1, "value": "old", "a": 1, "b": 2}',
+        "app/collection2:1": '{"id": 1, "key": "old"}',
+        "app/collection2:2": '{"id": 2, "key": "old"}',
+    }
+    await element_cache.change_elements(
+        {"app/collection1:1": {"id": 1, "value": "old", "a": 1, "b": 2}}
+    )
+
+    change_id, patches = await element_cache.change_elements_with_patches(
+        {
+            "app/collection1:1": {"id": 1, "value": "updated", "a": 1, "c": 3},
+            "app/collection1:2": {"id": 2, "value": "new"},
+            "app/collection2:1": {"id": 1, "key": "updated"},
+            "app/collection2:2": None,
+        }
+    )
+
+    assert change_id == 2
+    # New and deleted elements do not have a patch.
+    assert patches == {
+        "app/collection1:1": {
+            "base_change_id": 1,
+            "changed": {"value": "updated", "c": 3},
+            "removed": ["b"],
+        },
+        "app/collection2:1": {
+            "base_change_id": 0,
+            "changed": {"key": "updated"},
+            "removed": [],
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_change_elements_with_patches_unchanged_since_build(element_cache):
+    element_cache.cache_provider.full_data = {
+        "app/collection1:1": '{"id": 1, "value": "old", "a": 1}',
+    }
+
+    change_id, patches = await element_cache.change_elements_with_patches(
+        {"app/collection1:1": {"id": 1, "value": "updated", "a": 1}}
+    )
+
+    assert change_id == 1
+    assert patches == {
+        "app/collection1:1": {
+            "base_change_id": 0,  # the lowest change id
+            "changed": {"value": "updated"},
+            "removed": [],
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_unchanged_element_ids(element_cache):
+    element_cache.cache_provider.full_data = {
+        "app/collection1:1": '{"id": 1, "value": "old"}',
+        "app/collection1:2": '{"id": 2, "value": "old"}',
+    }
+
+    result = await element_cache.get_unchanged_element_ids(
+        {
+            "app/collection1:1": {"id": 1, "value": "old"},
+            "app/collection1:2": {"id": 2, "value": "new"},
+            "app/collection1:3": {"id": 3, "value": "new"},
+        }
+    )
+
+    assert result == {"app/collection1:1"}
+
+
+@pytest.mark.asyncio
+@patch("openslides.utils.cache.AUTOUPDATE_SNAPSHOT_INTERVAL", 10)
+async def test_get_all_data_list_with_snapshot(element_cache):
+    result = await element_cache.get_all_data_list_with_snapshot(1, "1")
+
+    assert result == (0, await element_cache.get_all_data_list(1))
+    change_id, snapshot = await element_cache.cache_provider.get_snapshot("1")
+    assert change_id == 0
+    assert sort_dict(json.loads(snapshot)) == sort_dict(
+        {
+            "app/collection1": [
+                {"id": 1, "value": "restricted_value1"},
+                {"id": 2, "value": "restricted_value2"},
+            ],
+            "app/collection2": [
+                {"id": 1, "key": "restricted_value1"},
+                {"id": 2, "key": "restricted_value2"},
+            ],
+        }
+    )
+
+
+@pytest.mark.asyncio
+@patch("openslides.utils.cache.AUTOUPDATE_SNAPSHOT_INTERVAL", 10)
+async def test_get_all_data_list_with_snapshot_and_changes(element_cache):
+    await element_cache.get_all_data_list_with_snapshot(1, "1")
+    await element_cache.change_elements(
+        {
+            "app/collection1:1": {"id": 1, "value": "updated"},
+            "app/collection1:3": {"id": 3, "value": "new"},
+            "app/collection2:2": None,
+        }
+    )
+
+    max_change_id, result = await element_cache.get_all_data_list_with_snapshot(2, "1")
+
+    assert max_change_id == 1
+    assert sort_dict(result) == sort_dict(await element_cache.get_all_data_list(2))
+    # The snapshot is not renewed within the interval.
+    change_id, _ = await element_cache.cache_provider.get_snapshot("1")
+    assert change_id == 0
@@ -0,0 +1,163 @@
+import asyncio
+import zlib
+from unittest.mock import patch
+
+import pytest
+
+from openslides.utils.stream import (
+    RedisStream,
+    decode_payload,
+    encode_payload,
+    get_lag,
+    merge_payloads,
+)
+
+
+def test_merge_payloads():
+    result = merge_payloads(
+        [
+            {
+                "elements": {"app/c:1": {"id": 1, "v": 1}, "app/c:2": None},
+                "change_id": 3,
+            },
+            {
+                "elements": {"app/c:1": {"id": 1, "v": 2}, "app/c:3": {"id": 3}},
+                "change_id": 4,
+            },
+        ]
+    )
+
+    assert result == {
+        "elements": {
+            "app/c:1": {"id": 1, "v": 2},
+            "app/c:2": None,
+            "app/c:3": {"id": 3},
+        },
+        "change_id": 4,
+    }
+
+
+def test_merge_payloads_with_patches():
+    result = merge_payloads(
+        [
+            {
+                "elements": {"app/c:1": {"id": 1, "a": 1, "b": 1}},
+                "patches": {
+                    "app/c:2": {
+                        "base_change_id": 1,
+                        "changed": {"a": 2},
+                        "removed": ["b"],
+                    }
+                },
+                "change_id": 3,
+            },
+            {
+                "elements": {},
+                "patches": {
+                    "app/c:1": {
+                        "base_change_id": 3,
+                        "changed": {"a": 3},
+                        "removed": [],
+                    },
+                    "app/c:2": {
+                        "base_change_id": 3,
+                        "changed": {"b": 3},
+                        "removed": ["a"],
+                    },
+                },
+                "change_id": 4,
+            },
+        ]
+    )
+
+    assert result == {
+        "elements": {"app/c:1": {"id": 1, "a": 3, "b": 1}},
+        "patches": {
+            "app/c:2": {"base_change_id": 1, "changed": {"b": 3}, "removed": ["a"]}
+        },
+        "change_id": 4,
+    }
+
+
+def test_merge_payloads_by_change_id():
+    result = merge_payloads(
+        [
+            {"elements": {"app/c:1": {"id": 1, "v": 2}}, "change_id": 4},
+            {"elements": {"app/c:1": {"id": 1, "v": 1}}, "change_id": 3},
+        ]
+    )
+
+    assert result == {"elements": {"app/c:1": {"id": 1, "v": 2}}, "change_id": 4}
+
+
+def test_merge_payloads_patch_after_deletion():
+    result = merge_payloads(
+        [
+            {"elements": {"app/c:1": None}, "patches": {}, "change_id": 3},
+            {
+                "elements": {},
+                "patches": {
+                    "app/c:1": {
+                        "base_change_id": 2,
+                        "changed": {"a": 2},
+                        "removed": [],
+                    }
+                },
+                "change_id": 4,
+            },
+        ]
+    )
+
+    assert result == {"elements": {"app/c:1": None}, "patches": {}, "change_id": 4}
+
+
+def test_encode_payload():
+    with patch("openslides.utils.stream.REDIS_STREAM_COMPRESSION_THRESHOLD", 100):
+        small = encode_payload({"value": "x"})
+        big = encode_payload({"value": "x" * 200})
+
+    assert small == {"content": b'{"value":"x"}'}
+    assert big["compression"] == b"zlib"
+    assert zlib.decompress(big["content"]) == b'{"value":"%s"}' % (b"x" * 200)
+    assert decode_payload({b"content": big["content"], b"compression": b"zlib"}) == {
+        "value": "x" * 200
+    }
+
+
+def test_get_lag():
+    assert get_lag(b"1500-3", b"1000-0") == 500
+    assert get_lag(b"1000-0", b"1000-0") == 0
+
+
+@pytest.mark.asyncio
+async def test_send_batch():
+    stream = RedisStream()
+    with patch("openslides.utils.stream.REDIS_STREAM_BATCH_DELAY", 0.01), patch.object(
+        stream, "write"
+    ) as write:
+        await asyncio.gather(
+            stream.send("autoupdate", {"change_id": 1}),
+            stream.send("autoupdate", {"change_id": 2}),
+        )
+
+    write.assert_called_once_with("autoupdate", [{"change_id": 1}, {"change_id": 2}])
+    assert stream.batches == {}
+
+
+@pytest.mark.asyncio
+async def test_send_batch_write_fails():
+    """
+    Tests that all senders of a batch get the error of the write.
+    """
+    stream = RedisStream()
+    with patch("openslides.utils.stream.REDIS_STREAM_BATCH_DELAY", 0.01), patch.object(
+        stream, "write", side_effect=RuntimeError("failed")
+    ):
+        results = await asyncio.gather(
+            stream.send("autoupdate", {"change_id": 1}),
+            stream.send("autoupdate", {"change_id": 2}),
+            return_exceptions=True,
+        )
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert stream.batches == {}